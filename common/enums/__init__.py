@@ -1,6 +1,13 @@
 from common.enums.currency_enum import CurrencyEnum
 from common.enums.feature_flags_enum import FeatureFlags
+from common.enums.income_write_status_enum import IncomeWriteStatus
 from common.enums.question_type_enum import QuestionType
 from common.enums.service_package_enum import ServicePackage
 
-__all__ = ["ServicePackage", "QuestionType", "CurrencyEnum", "FeatureFlags"]
+__all__ = [
+    "ServicePackage",
+    "QuestionType",
+    "CurrencyEnum",
+    "FeatureFlags",
+    "IncomeWriteStatus",
+]
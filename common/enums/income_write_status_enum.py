@@ -0,0 +1,12 @@
+from enum import Enum
+
+
+class IncomeWriteStatus(Enum):
+    """
+    Outcome of a buffered income write
+    """
+
+    INSERTED = "inserted"
+    DUPLICATE = "duplicate"
+    CHAT_NOT_FOUND = "chat_not_found"
+    BEFORE_REGISTRATION = "before_registration"
@@ -6,3 +6,4 @@ class QuestionType(Enum):
     AMOUNT_INPUT = "amount_input"
     WIFI_NAME_INPUT = "wifi_name_input"
     WIFI_PASSWORD_INPUT = "wifi_password_input"
+    WIFI_BULK_INPUT = "wifi_bulk_input"
@@ -1,9 +1,15 @@
+import asyncio
+import functools
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
-from typing import Any, Generator
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Generator, TypeVar
 
-from sqlalchemy import create_engine
+from sqlalchemy import Engine, create_engine, event, exc
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import Pool, QueuePool
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -15,9 +21,93 @@ DATABASE_URL = (
     f"@{os.getenv('DB_HOST')}/{os.getenv('DB_NAME')}"
 )
 
-engine = create_engine(
-    DATABASE_URL, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800
-)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+class PoolMetrics:
+    """Process-wide counters fed by the engine's pool events (see get_pool_stats)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.connects = 0
+            self.invalidations = 0
+            self.timeouts = 0
+            self.waits = 0  # checkouts over 1ms: waited for a free connection or opened one
+            self.wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.max_checked_out = 0
+            self.max_overflow = 0
+
+    def record_get(self, waited: float, timed_out: bool):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            if waited >= 0.001:
+                self.waits += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def record_checkout(self, pool: Pool):
+        with self._lock:
+            self.checkouts += 1
+            if isinstance(pool, QueuePool):
+                self.max_checked_out = max(self.max_checked_out, pool.checkedout())
+                self.max_overflow = max(self.max_overflow, pool.overflow())
+
+    def increment(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times how long each checkout waits for a free connection"""
+
+    def _do_get(self):
+        started = perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            pool_metrics.record_get(perf_counter() - started, timed_out)
+
+
+def create_db_engine(url: str, **kwargs) -> Engine:
+    """Engine with the configured, instrumented connection pool"""
+    options = dict(
+        poolclass=InstrumentedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    options.update(kwargs)
+    db_engine = create_engine(url, **options)
+
+    event.listen(db_engine, "connect", lambda *args: pool_metrics.increment("connects"))
+    event.listen(db_engine, "checkin", lambda *args: pool_metrics.increment("checkins"))
+    event.listen(db_engine, "invalidate", lambda *args: pool_metrics.increment("invalidations"))
+    event.listen(db_engine, "checkout", lambda *args: pool_metrics.record_checkout(db_engine.pool))
+    return db_engine
+
+
+engine = create_db_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -32,3 +122,57 @@ def get_db_session() -> Generator[Session, Any, Any]:
         yield db
     finally:
         db.close()
+
+
+def get_pool_stats() -> dict[str, Any]:
+    """Pool gauges of the engine SessionLocal is bound to, plus the event counters"""
+    pool = SessionLocal.kw["bind"].pool
+    stats: dict[str, Any] = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(0, pool.overflow()),
+        )
+    with pool_metrics._lock:
+        stats.update(
+            checkouts=pool_metrics.checkouts,
+            checkins=pool_metrics.checkins,
+            connects=pool_metrics.connects,
+            invalidations=pool_metrics.invalidations,
+            timeouts=pool_metrics.timeouts,
+            waits=pool_metrics.waits,
+            wait_seconds=round(pool_metrics.wait_seconds, 6),
+            max_wait_seconds=round(pool_metrics.max_wait_seconds, 6),
+            max_checked_out=pool_metrics.max_checked_out,
+            peak_overflow=max(0, pool_metrics.max_overflow),
+        )
+    return stats
+
+
+# Blocking mysql-connector calls run here instead of on the event loop.
+# One thread per pooled connection, so a worker never waits on the pool.
+_db_executor = ThreadPoolExecutor(
+    max_workers=DB_POOL_SIZE + DB_MAX_OVERFLOW, thread_name_prefix="db"
+)
+
+T = TypeVar("T")
+
+
+async def run_in_db_executor(func: Callable[..., T], *args, **kwargs) -> T:
+    """Run a blocking database function on the DB thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _db_executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+def db_executor(func: Callable[..., T]) -> Callable[..., Awaitable[T]]:
+    """Turn a blocking database function into a coroutine run on the DB thread pool"""
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs) -> T:
+        return await run_in_db_executor(func, *args, **kwargs)
+
+    return wrapper
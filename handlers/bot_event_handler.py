@@ -9,7 +9,8 @@ from helper import total_summary_report, daily_transaction_report, weekly_transa
 from helper.logger_utils import force_log
 from services import (
     ConversationService,
-    IncomeService,
+    IncomeSummaryService,
+    count_transactions,
     ChatService,
     GroupPackageService,
 )
@@ -20,7 +21,7 @@ class CommandHandler:
         self.chat_service = ChatService()
         self.group_package_service = GroupPackageService()
 
-    async def format_totals_message(self, incomes, report_date: datetime = None, requesting_user=None,
+    async def format_totals_message(self, aggregates, report_date: datetime = None, requesting_user=None,
                                     start_date: datetime = None, end_date: datetime = None,
                                     is_daily: bool = False, is_weekly: bool = False, is_monthly: bool = False):
         # Check if this is a daily report (contains "ថ្ងៃទី")
@@ -39,17 +40,17 @@ class CommandHandler:
                     telegram_username = requesting_user.first_name
                 # If user is anonymous, username will remain "Admin"
 
-            return daily_transaction_report(incomes, report_date, telegram_username)
+            return daily_transaction_report(aggregates, report_date, telegram_username)
         elif is_weekly and start_date and end_date:
             # This is a weekly report, use the new weekly format
-            return weekly_transaction_report(incomes, start_date, end_date)
+            return weekly_transaction_report(aggregates, start_date, end_date)
         elif is_monthly and start_date and end_date:
             # This is a monthly report, use the new monthly format
-            return monthly_transaction_report(incomes, start_date, end_date)
+            return monthly_transaction_report(aggregates, start_date, end_date)
         else:
             # Fallback only - shouldn't be any cases
             title = f"សរុបប្រតិបត្តិការ:"
-            return total_summary_report(incomes, title)
+            return total_summary_report(aggregates, title)
 
     async def handle_date_input_response(self, event, question):
         try:
@@ -109,22 +110,21 @@ class CommandHandler:
                     force_log(f"Date range query: {start_date} to {end_date} (exclusive)", "CommandHandler")
                     force_log(f"User input range: day {start_day} to {end_day}", "CommandHandler")
 
-                    income_service = IncomeService()
-                    incomes = await income_service.get_income_by_date_and_chat_id(
+                    aggregates = await IncomeSummaryService.get_aggregates_by_day(
                         chat_id=event.chat_id,
                         start_date=start_date,
                         end_date=end_date,
                     )
 
                     # Don't delete user's reply message
-                    if not incomes:
+                    if not aggregates:
                         await event.respond(
                             f"គ្មានប្រតិបត្តិការសម្រាប់ថ្ងៃទី {start_day} ដល់ {end_day} ទេ។"
                         )
                         return
 
                     message = await self.format_totals_message(
-                        incomes=incomes,
+                        aggregates=aggregates,
                         report_date=start_date,
                         requesting_user=event.sender,
                         start_date=start_date,
@@ -132,7 +132,7 @@ class CommandHandler:
                         is_weekly=True
                     )
                     force_log(
-                        f"Sending message for date range {start_day}-{end_day}, found {len(incomes)} transactions",
+                        f"Sending message for date range {start_day}-{end_day}, found {count_transactions(aggregates)} transactions",
                         "CommandHandler")
                     await event.client.send_message(event.chat_id, message, parse_mode='html')
 
@@ -155,21 +155,20 @@ class CommandHandler:
                         chat_id=event.chat_id, thread_id=question.thread_id, message_id=question.message_id
                     )
 
-                    income_service = IncomeService()
-                    incomes = await income_service.get_income_by_specific_date_and_chat_id(
+                    aggregates = await IncomeSummaryService.get_aggregates_for_date(
                         chat_id=event.chat_id,
                         target_date=selected_date
                     )
 
                     # Don't delete user's reply message
-                    if not incomes:
+                    if not aggregates:
                         await event.respond(
                             f"គ្មានប្រតិបត្តិការសម្រាប់ថ្ងៃទី {selected_date.strftime('%d %b %Y')} ទេ។"
                         )
                         return
 
                     message = await self.format_totals_message(
-                        incomes=incomes,
+                        aggregates=aggregates,
                         report_date=selected_date,
                         requesting_user=event.sender,
                         is_daily=True
@@ -195,15 +194,14 @@ class CommandHandler:
         group_package = await self.group_package_service.get_package_by_chat_id(chat_id)
 
         try:
-            income_service = IncomeService()
-            incomes = await income_service.get_income_by_specific_date_and_chat_id(
+            aggregates = await IncomeSummaryService.get_aggregates_for_date(
                 chat_id=chat_id,
                 target_date=today,
             )
 
             await event.delete()
 
-            if not incomes:
+            if not aggregates:
                 await event.client.send_message(
                     chat_id,
                     f"គ្មានប្រតិបត្តិការសម្រាប់ថ្ងៃទី {today.strftime('%d %b %Y')} ទេ។",
@@ -211,13 +209,13 @@ class CommandHandler:
                 return
 
             # Check package limits
-            if group_package and group_package.package == ServicePackage.FREE and len(incomes) > 10:
+            if group_package and group_package.package == ServicePackage.FREE and count_transactions(aggregates) > 10:
                 contact_message = "អ្នកមានទិន្នន័យច្រើនជាង 10 ប្រតិបត្តិការ។ \nសម្រាប់មើលទិន្នន័យពេញលេញ \nសូមប្រើប្រាស់កញ្ចប់ Pay version.សូមទាក់ទងទៅAdmin \n\n https://t.me/HK_688"
                 await event.client.send_message(chat_id, contact_message)
                 return
 
             message = await self.format_totals_message(
-                incomes=incomes,
+                aggregates=aggregates,
                 report_date=today,
                 requesting_user=event.sender,
                 is_daily=True
@@ -331,8 +329,7 @@ class CommandHandler:
 
         try:
             selected_date = datetime.strptime(date_str, "%Y-%m-%d")
-            income_service = IncomeService()
-            incomes = await income_service.get_income_by_date_and_chat_id(
+            aggregates = await IncomeSummaryService.get_aggregates_by_day(
                 chat_id=chat_id,
                 start_date=selected_date,
                 end_date=selected_date + timedelta(days=1),
@@ -342,7 +339,7 @@ class CommandHandler:
                 f"Fetching data for {selected_date.strftime('%d %b %Y')}"
             )
             await event.delete()
-            if not incomes:
+            if not aggregates:
                 await event.client.send_message(
                     chat_id,
                     f"គ្មានប្រតិបត្តិការសម្រាប់ថ្ងៃទី {selected_date.strftime('%d %b %Y')} ទេ។",
@@ -350,7 +347,7 @@ class CommandHandler:
                 return
 
             message = await self.format_totals_message(
-                incomes=incomes,
+                aggregates=aggregates,
                 report_date=selected_date,
                 requesting_user=event.sender,
                 is_daily=True
@@ -385,12 +382,11 @@ class CommandHandler:
             await event.answer(f"Fetching data for {period_text}")
 
             await event.delete()
-            income_service = IncomeService()
-            incomes = await income_service.get_income_by_date_and_chat_id(
+            aggregates = await IncomeSummaryService.get_aggregates_by_day(
                 chat_id=chat_id, start_date=start_date, end_date=end_date
             )
 
-            if not incomes:
+            if not aggregates:
                 await event.client.send_message(
                     chat_id, f"គ្មានប្រតិបត្តិការសម្រាប់ {period_text} ទេ។"
                 )
@@ -400,7 +396,7 @@ class CommandHandler:
             is_weekly = data.startswith("summary_week_")
             is_monthly = data.startswith("summary_month_")
             message = await self.format_totals_message(
-                incomes=incomes,
+                aggregates=aggregates,
                 requesting_user=event.sender,
                 start_date=start_date,
                 end_date=end_date,
@@ -7,6 +7,7 @@ from models import User
 from services.chat_service import ChatService
 from services.group_package_service import GroupPackageService
 from services.income_balance_service import IncomeService
+from services.income_summary_service import IncomeSummaryService
 from services.shift_configuration_service import ShiftConfigurationService
 from services.shift_service import ShiftService
 from services.user_service import UserService
@@ -809,13 +810,13 @@ Telegram: https://t.me/HK_688
             end_date = datetime(year, month, end_day, 23, 59, 59)
             
             # Get income data for the week
-            incomes = await self.income_service.get_income_by_date_and_chat_id(
+            aggregates = await IncomeSummaryService.get_aggregates_by_day(
                 chat_id=chat_id,
                 start_date=start_date,
                 end_date=end_date,
             )
             
-            if not incomes:
+            if not aggregates:
                 message = f"""
 📆 របាយការណ៍សប្តាហ៍ {week_number} ({start_day}-{end_day} {start_date.strftime('%B %Y')})
 
@@ -824,7 +825,7 @@ Telegram: https://t.me/HK_688
             else:
                 # Use weekly report format similar to telegram bot service
                 from helper import weekly_transaction_report
-                message = weekly_transaction_report(incomes, start_date, end_date)
+                message = weekly_transaction_report(aggregates, start_date, end_date)
             
             await event.delete()
             await event.respond(message, parse_mode='HTML')
@@ -852,19 +853,19 @@ Telegram: https://t.me/HK_688
             end_date = start_date.replace(day=last_day, hour=23, minute=59, second=59)
             
             # Get income data for the month
-            incomes = await self.income_service.get_income_by_date_and_chat_id(
+            aggregates = await IncomeSummaryService.get_aggregates_by_day(
                 chat_id=chat_id,
                 start_date=start_date,
                 end_date=end_date,
             )
             
-            if not incomes:
+            if not aggregates:
                 period_text = start_date.strftime("%B %Y")
                 message = f"គ្មានប្រតិបត្តិការសម្រាប់ {period_text} ទេ។"
             else:
                 # Use monthly report format similar to telegram bot service
                 from helper import monthly_transaction_report
-                message = monthly_transaction_report(incomes, start_date, end_date)
+                message = monthly_transaction_report(aggregates, start_date, end_date)
             
             await event.delete()
             await event.respond(message, parse_mode='HTML')
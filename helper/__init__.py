@@ -1,8 +1,13 @@
 from .credential_loader import CredentialLoader
 from .daily_report_helper import daily_transaction_report
 from .dateutils import DateUtils
-from .logger_utils import force_log
-from .message_parser import extract_amount_and_currency, extract_trx_id, extract_s7pos_amount_and_currency
+from .logger_utils import force_log, flush_logs
+from .message_parser import (
+    extract_amount_and_currency,
+    extract_trx_id,
+    extract_s7pos_amount_and_currency,
+    parse_bank_message,
+)
 from .monthly_report_helper import monthly_transaction_report
 from .shift_report_helper import shift_report, shift_report_format, current_shift_report_format
 from .total_summary_report_helper import total_summary_report
@@ -13,6 +18,7 @@ __all__ = [
     "extract_amount_and_currency",
     "extract_trx_id",
     "extract_s7pos_amount_and_currency",
+    "parse_bank_message",
     "total_summary_report",
     "daily_transaction_report",
     "weekly_transaction_report",
@@ -22,4 +28,5 @@ __all__ = [
     "current_shift_report_format",
     "DateUtils",
     "force_log",
+    "flush_logs",
 ]
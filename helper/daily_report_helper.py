@@ -18,8 +18,8 @@ def format_time_12hour(dt: datetime) -> str:
     return dt.strftime("%I:%M%p").replace("AM", "AM").replace("PM", "PM")
 
 
-def daily_transaction_report(incomes, report_date: datetime, telegram_username: str = "Admin", group_name: str = None) -> str:
-    """Generate daily transaction report in the new format"""
+def daily_transaction_report(aggregates, report_date: datetime, telegram_username: str = "Admin", group_name: str = None) -> str:
+    """Generate daily transaction report in the new format from IncomeAggregate or IncomeRow rows"""
     
     # Calculate totals and transaction counts
     totals = {"KHR": 0, "USD": 0}
@@ -27,12 +27,12 @@ def daily_transaction_report(incomes, report_date: datetime, telegram_username:
     
     transaction_times = []
     
-    for income in incomes:
-        currency = income.currency
+    for aggregate in aggregates:
+        currency = aggregate.currency
         if currency in totals:
-            totals[currency] += income.amount
-            transaction_counts[currency] += 1
-            transaction_times.append(income.income_date)
+            totals[currency] += aggregate.total
+            transaction_counts[currency] += aggregate.count
+            transaction_times.extend((aggregate.first_at, aggregate.last_at))
     
     # Get working hours from actual transaction times (first to last transaction)
     working_hours = ""
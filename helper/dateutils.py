@@ -42,6 +42,20 @@ class DateUtils:
         tz = DateUtils.get_timezone()
         return datetime.combine(date, time.max, tzinfo=tz)
     
+    @staticmethod
+    def local_day_range(value):
+        """
+        Get [start, end) naive datetimes covering one calendar day, for filtering
+        columns stored as naive local time (income_date, end_time) without DATE().
+        Aware datetimes are converted to the configured timezone first.
+        """
+        if isinstance(value, datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(DateUtils.get_timezone())
+            value = value.date()
+        start = datetime.combine(value, time.min)
+        return start, start + timedelta(days=1)
+    
     @staticmethod
     def start_of_yesterday():
         """Get the start of yesterday in the configured timezone"""
@@ -1,31 +1,164 @@
+import atexit
 import datetime
+import json
 import os
+import queue
+import threading
+import time
 
+LOG_LEVELS = {
+    "DEBUG": 10,
+    "INFO": 20,
+    "WARNING": 30,
+    "ERROR": 40,
+}
 
-def force_log(message, component="System"):
-    """Write logs with hourly rotation"""
-    try:
-        # Ensure logs directory exists
-        logs_dir = "logs"
-        if not os.path.exists(logs_dir):
-            os.makedirs(logs_dir)
-
-        # Generate filename with current hour for rotation
-        now = datetime.datetime.now()
-        filename = f"logs/telegram_bot_{now.strftime('%Y%m%d_%H')}.log"
-
-        # Write to the hourly log file
-        with open(filename, "a", encoding="utf-8") as f:
-            timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
-            f.write(f"{timestamp} - {component} - {message}\n")
-            f.flush()
-    except Exception as e:
+LOGS_DIR = "logs"
+FALLBACK_LOG_FILE = "telegram_bot_fallback.log"
+
+
+class BufferedLogWriter:
+    """
+    Writes log records from a background thread.
+
+    Callers only push a tuple onto a queue; the writer thread drains it in
+    batches, keeps the current hourly file open (logs/telegram_bot_YYYYMMDD_HH.log)
+    and flushes once per batch instead of once per line.
+    """
+
+    def __init__(
+        self,
+        min_level: str = "INFO",
+        json_lines: bool = False,
+        flush_interval: float = 0.5,
+        max_batch_size: int = 1000,
+    ):
+        self.min_level = LOG_LEVELS.get(min_level.upper(), LOG_LEVELS["INFO"])
+        self.json_lines = json_lines
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+        self._file = None
+        self._file_hour: str | None = None
+
+    def log(self, message, component: str, level: str):
+        if LOG_LEVELS.get(level, LOG_LEVELS["INFO"]) < self.min_level:
+            return
+        if self._thread is None:
+            self._start()
+        self._queue.put((time.time(), level, component, message))
+
+    def flush(self, timeout: float = 5.0):
+        """Block until everything logged so far has been written"""
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+    def _start(self):
+        with self._thread_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="log-writer", daemon=True
+                )
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            waiters = []
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if len(batch) >= self.max_batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _write_batch(self, batch: list[tuple]):
+        try:
+            for created, level, component, message in batch:
+                now = datetime.datetime.fromtimestamp(created)
+                self._get_file(now.strftime("%Y%m%d_%H")).write(
+                    self._format(now, level, component, message)
+                )
+            self._file.flush()
+        except Exception as e:
+            self._write_fallback(batch, e)
+
+    def _format(self, now: datetime.datetime, level: str, component: str, message) -> str:
+        timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+        if self.json_lines:
+            record = {
+                "timestamp": timestamp,
+                "level": level,
+                "component": component,
+                "message": str(message),
+            }
+            return json.dumps(record, ensure_ascii=False) + "\n"
+        return f"{timestamp} - {component} - {message}\n"
+
+    def _get_file(self, hour: str):
+        """Open the hourly log file, rotating when the hour changes"""
+        if self._file is None or self._file_hour != hour:
+            if self._file is not None:
+                self._file.close()
+            os.makedirs(LOGS_DIR, exist_ok=True)
+            self._file = open(
+                f"{LOGS_DIR}/telegram_bot_{hour}.log", "a", encoding="utf-8"
+            )
+            self._file_hour = hour
+        return self._file
+
+    def _write_fallback(self, batch: list[tuple], error: Exception):
         # Fallback to simple file if anything goes wrong
+        # Drop the hourly file that failed; it is reopened on the next flush
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+            self._file = None
         try:
-            with open("telegram_bot_fallback.log", "a") as f:
+            with open(FALLBACK_LOG_FILE, "a", encoding="utf-8") as f:
                 timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                f.write(f"{timestamp} - {component} - LOGGER_ERROR: {e}\n")
-                f.write(f"{timestamp} - {component} - {message}\n")
-                f.flush()
-        except:
+                f.write(f"{timestamp} - System - LOGGER_ERROR: {error}\n")
+                for created, level, component, message in batch:
+                    now = datetime.datetime.fromtimestamp(created)
+                    f.write(f"{now.strftime('%Y-%m-%d %H:%M:%S')} - {component} - {message}\n")
+        except Exception:
             pass
+
+
+_writer = BufferedLogWriter(
+    min_level=os.getenv("LOG_LEVEL", "INFO"),
+    json_lines=os.getenv("LOG_FORMAT", "").lower() == "json",
+)
+atexit.register(_writer.flush)
+
+
+def force_log(message, component="System", level="INFO"):
+    """Queue a log line for the background writer (hourly rotation)"""
+    _writer.log(message, component, level)
+
+
+def flush_logs(timeout: float = 5.0):
+    """Wait until queued log lines are written, e.g. before shutdown"""
+    _writer.flush(timeout)
@@ -1,190 +1,294 @@
 import re
+from typing import NamedTuple
+
+# Amount / currency patterns, compiled once at import time
+_NUMBER = r'[\d,]+(?:\.\d+)?'
+_KHMER_RIEL_PATTERN = re.compile(rf'\s({_NUMBER})\s+រៀល')
+_KHMER_DOLLAR_PATTERN = re.compile(rf'\s({_NUMBER})\s+ដុល្លារ')
+_SYMBOL_AMOUNT_PATTERN = re.compile(rf'([៛$])\s?({_NUMBER})')
+_AMOUNT_CODE_PATTERN = re.compile(rf'({_NUMBER})\s+(USD|KHR)', re.IGNORECASE)
+_CODE_AMOUNT_PATTERN = re.compile(rf'(USD|KHR)\s+({_NUMBER})', re.IGNORECASE)
+_S7POS_FINAL_PATTERN = re.compile(rf'សរុបចុងក្រោយ:\s*({_NUMBER})\s*\$')
+
+# Transaction ID patterns, compiled once at import time
+_TRX_ID_PATTERN = re.compile(r'Trx\. ID:\s*([0-9]+)')
+_HASH_PAREN_PATTERN = re.compile(r'\(Hash\.\s*([a-f0-9]+)\)?', re.IGNORECASE)
+_KHMER_REFERENCE_PATTERN = re.compile(r'លេខយោង\s+([0-9]+)')
+_KHMER_TRANSACTION_PATTERN = re.compile(r'លេខប្រតិបត្តិការ:\s*([0-9]+)')
+_TXN_HASH_PATTERN = re.compile(r'Txn Hash:\s*([a-f0-9]+)', re.IGNORECASE)
+_TRANSACTION_HASH_PATTERN = re.compile(r'Transaction Hash:\s*([a-f0-9]+)', re.IGNORECASE)
+_REF_ID_PATTERN = re.compile(r'Ref\.ID:\s*([0-9]+)')
+_TRANSACTION_ID_PATTERN = re.compile(r'Transaction ID:\s*([a-zA-Z0-9]+)')
+
+CURRENCY_CODE_SYMBOLS = {
+    'USD': '$',
+    'KHR': '៛',
+}
+
+
+class ParsedMessage(NamedTuple):
+    """Result of parsing a bank notification"""
+    currency: str | None
+    amount: int | float | None
+    trx_id: str | None
+
+
+def _to_number(amount_str: str) -> int | float | None:
+    amount_str = amount_str.replace(',', '')
+    try:
+        return float(amount_str) if '.' in amount_str else int(amount_str)
+    except ValueError:
+        return None
+
+
+def _to_float(amount_str: str) -> float | None:
+    try:
+        return float(amount_str.replace(',', ''))
+    except ValueError:
+        return None
+
+
+def _match_khmer_riel(text: str, lowered: str):
+    if 'រៀល' not in text:
+        return None
+    amount = extract_khmer_money_amount(text)
+    return ('៛', amount) if amount is not None else None
+
+
+def _match_khmer_dollar(text: str, lowered: str):
+    if 'ដុល្លារ' not in text:
+        return None
+    amount = extract_khmer_dollar_amount(text)
+    return ('$', amount) if amount is not None else None
+
+
+def _match_symbol_amount(text: str, lowered: str):
+    if '$' not in text and '៛' not in text:
+        return None
+    match = _SYMBOL_AMOUNT_PATTERN.search(text)
+    if not match:
+        return None
+    return match.group(1), _to_number(match.group(2))
+
+
+def _match_amount_code(text: str, lowered: str):
+    if 'usd' not in lowered and 'khr' not in lowered:
+        return None
+    match = _AMOUNT_CODE_PATTERN.search(text)
+    if not match:
+        return None
+    return CURRENCY_CODE_SYMBOLS[match.group(2).upper()], _to_number(match.group(1))
+
+
+def _match_code_amount(text: str, lowered: str):
+    if 'usd' not in lowered and 'khr' not in lowered:
+        return None
+    match = _CODE_AMOUNT_PATTERN.search(text)
+    if not match:
+        return None
+    return CURRENCY_CODE_SYMBOLS[match.group(1).upper()], _to_number(match.group(2))
+
+
+def _match_s7pos_final(text: str, lowered: str):
+    amount = extract_s7pos_final_amount(text)
+    return ('$', amount) if amount is not None else None
+
+
+# Each trx rule is (literal that must be present, pattern, search lowered text for the literal)
+_TRX_RULES = {
+    'trx_id': ('Trx. ID:', _TRX_ID_PATTERN, False),
+    'hash_paren': ('(hash.', _HASH_PAREN_PATTERN, True),
+    'khmer_reference': ('លេខយោង', _KHMER_REFERENCE_PATTERN, False),
+    'khmer_transaction': ('លេខប្រតិបត្តិការ:', _KHMER_TRANSACTION_PATTERN, False),
+    'txn_hash': ('txn hash:', _TXN_HASH_PATTERN, True),
+    'transaction_hash': ('transaction hash:', _TRANSACTION_HASH_PATTERN, True),
+    'ref_id': ('Ref.ID:', _REF_ID_PATTERN, False),
+    'transaction_id': ('Transaction ID:', _TRANSACTION_ID_PATTERN, False),
+}
+
+_AMOUNT_RULES = {
+    'khmer_riel': _match_khmer_riel,
+    'khmer_dollar': _match_khmer_dollar,
+    'symbol_amount': _match_symbol_amount,
+    'amount_code': _match_amount_code,
+    'code_amount': _match_code_amount,
+    's7pos_final': _match_s7pos_final,
+}
+
+
+class BankProfile(NamedTuple):
+    """
+    Ordered parser rules for one bank bot.
+
+    Rules keep the order of the default cascade so a profile never picks a
+    different match than extract_amount_and_currency / extract_trx_id would.
+    Amount rules are a prefix of the default ones; trx rules only leave out
+    markers the bank never sends. If a profile finds nothing and
+    ``fallback`` is set, the default cascade is tried so an unexpected
+    message format is never silently dropped.
+    """
+    amount_rules: tuple[str, ...]
+    trx_rules: tuple[str, ...]
+    fallback: bool = True
+
+
+DEFAULT_PROFILE = BankProfile(
+    amount_rules=('khmer_riel', 'khmer_dollar', 'symbol_amount', 'amount_code', 'code_amount'),
+    trx_rules=tuple(_TRX_RULES),
+)
+
+BANK_PROFILES: dict[str, BankProfile] = {
+    'ACLEDABankBot': BankProfile(
+        amount_rules=('khmer_riel', 'khmer_dollar', 'symbol_amount', 'amount_code'),
+        trx_rules=('khmer_reference', 'ref_id'),
+    ),
+    'PayWayByABA_bot': BankProfile(
+        amount_rules=('khmer_riel', 'khmer_dollar', 'symbol_amount', 'amount_code'),
+        trx_rules=('trx_id', 'khmer_transaction', 'txn_hash'),
+    ),
+    'CanadiaMerchant_bot': BankProfile(
+        amount_rules=('khmer_riel', 'khmer_dollar', 'symbol_amount', 'amount_code'),
+        trx_rules=('hash_paren', 'txn_hash'),
+    ),
+    'vattanac_bank_merchant_prod_bot': BankProfile(
+        amount_rules=DEFAULT_PROFILE.amount_rules,
+        trx_rules=('trx_id',),
+    ),
+    'SathapanaBank_bot': BankProfile(
+        amount_rules=('khmer_riel', 'khmer_dollar', 'symbol_amount', 'amount_code'),
+        trx_rules=('transaction_id',),
+    ),
+    's7pos_bot': BankProfile(
+        amount_rules=('s7pos_final',),
+        trx_rules=DEFAULT_PROFILE.trx_rules,
+        fallback=False,
+    ),
+}
+
+
+def get_bank_profile(sender_username: str | None) -> BankProfile:
+    """Get the parser profile for a sender bot, or the default cascade"""
+    if not sender_username:
+        return DEFAULT_PROFILE
+    return BANK_PROFILES.get(sender_username, DEFAULT_PROFILE)
+
+
+def _run_amount_rules(rules: tuple[str, ...], text: str, lowered: str):
+    for name in rules:
+        result = _AMOUNT_RULES[name](text, lowered)
+        if result is not None:
+            currency, amount = result
+            if amount is None:
+                return None, None
+            return currency, amount
+    return None
+
+
+def _run_trx_rules(rules: tuple[str, ...], text: str, lowered: str) -> str | None:
+    for name in rules:
+        literal, pattern, use_lowered = _TRX_RULES[name]
+        if literal not in (lowered if use_lowered else text):
+            continue
+        match = pattern.search(text)
+        if match:
+            return match.group(1)
+    return None
+
+
+def parse_bank_message(text: str, sender_username: str | None = None) -> ParsedMessage:
+    """
+    Extract currency, amount and transaction ID from a bank notification.
+
+    Only the rules of the sender's bank profile run; unknown senders use the
+    full default cascade (same results as extract_amount_and_currency and
+    extract_trx_id).
+    """
+    if not text:
+        return ParsedMessage(None, None, None)
+
+    profile = get_bank_profile(sender_username)
+    lowered = text.lower()
+
+    amount_result = _run_amount_rules(profile.amount_rules, text, lowered)
+    if amount_result is None and profile.fallback and profile is not DEFAULT_PROFILE:
+        amount_result = _run_amount_rules(DEFAULT_PROFILE.amount_rules, text, lowered)
+    currency, amount = amount_result if amount_result is not None else (None, None)
+
+    trx_id = _run_trx_rules(profile.trx_rules, text, lowered)
+    if trx_id is None and profile.fallback and profile is not DEFAULT_PROFILE:
+        trx_id = _run_trx_rules(DEFAULT_PROFILE.trx_rules, text, lowered)
+
+    return ParsedMessage(currency, amount, trx_id)
+
 
 def extract_amount_and_currency(text: str):
-    # Pattern 1: Khmer payment notification format (e.g., "ចំនួន 11,500 រៀល")
-    khmer_amount = extract_khmer_money_amount(text)
-    if khmer_amount is not None:
-        return '៛', khmer_amount
-    
-    # Pattern 1b: Khmer dollar format (e.g., "23.25 ដុល្លារ")
-    khmer_dollar_amount = extract_khmer_dollar_amount(text)
-    if khmer_dollar_amount is not None:
-        return '$', khmer_dollar_amount
-    
-    # Pattern 2: Currency symbol before amount (e.g., "$100", "៛50.25")
-    match = re.search(r'([៛$])\s?([\d,]+(?:\.\d+)?)', text)
-    if match:
-        currency = match.group(1)
-        amount_str = match.group(2).replace(',', '')
-        try:
-            amount = float(amount_str) if '.' in amount_str else int(amount_str)
-        except ValueError:
-            return None, None
-        return currency, amount
-    
-    # Pattern 3: Amount before currency code (e.g., "65.00 USD", "100.50 KHR")
-    match = re.search(r'([\d,]+(?:\.\d+)?)\s+(USD|KHR)', text, re.IGNORECASE)
-    if match:
-        amount_str = match.group(1).replace(',', '')
-        currency_code = match.group(2).upper()
-        
-        # Convert currency codes to symbols
-        currency_map = {
-            'USD': '$',
-            'KHR': '៛'
-        }
-        currency = currency_map.get(currency_code, currency_code)
-        
-        try:
-            amount = float(amount_str) if '.' in amount_str else int(amount_str)
-        except ValueError:
-            return None, None
-        return currency, amount
-    
-    # Pattern 4: Currency code before amount (e.g., "USD 16.00", "KHR 100.50")
-    match = re.search(r'(USD|KHR)\s+([\d,]+(?:\.\d+)?)', text, re.IGNORECASE)
-    if match:
-        currency_code = match.group(1).upper()
-        amount_str = match.group(2).replace(',', '')
-        
-        # Convert currency codes to symbols
-        currency_map = {
-            'USD': '$',
-            'KHR': '៛'
-        }
-        currency = currency_map.get(currency_code, currency_code)
-        
-        try:
-            amount = float(amount_str) if '.' in amount_str else int(amount_str)
-        except ValueError:
-            return None, None
-        return currency, amount
-    
-    return None, None
+    result = _run_amount_rules(DEFAULT_PROFILE.amount_rules, text, text.lower())
+    return result if result is not None else (None, None)
+
 
 def extract_khmer_money_amount(text: str) -> float | None:
     """
     Extract money amount from Khmer payment notification text.
-    
+
     Looks for pattern: [number រៀល] regardless of what comes before
-    
-    Example inputs: 
+
+    Example inputs:
     - "លោកអ្នកបានទទួលប្រាក់ចំនួន 11,500 រៀល ពីឈ្មោះ SAREACH YUN..."
     - "បានទទួល 5,000 រៀល ពី 096 7772 667 SIN MONOREA..."
     Returns: 11500.0 or 5000.0
     """
     # Pattern: [space number រៀល] - matches space, number, space, then រៀល
-    pattern = r'\s([\d,]+(?:\.\d+)?)\s+រៀល'
-    match = re.search(pattern, text)
-    
+    match = _KHMER_RIEL_PATTERN.search(text)
     if match:
-        amount_str = match.group(1).replace(',', '')
-        try:
-            amount = float(amount_str) if '.' in amount_str else float(amount_str)
-            return amount
-        except ValueError:
-            return None
-    
+        return _to_float(match.group(1))
     return None
 
+
 def extract_khmer_dollar_amount(text: str) -> float | None:
     """
     Extract dollar amount from Khmer payment notification text.
-    
+
     Looks for pattern: [number ដុល្លារ] regardless of what comes before
-    
-    Example inputs: 
+
+    Example inputs:
     - "លោកអ្នកបានទទួលប្រាក់ចំនួន 23.25 ដុល្លារ ពីឈ្មោះ PANH BORA..."
     Returns: 23.25
     """
     # Pattern: [space number ដុល្លារ] - matches space, number, space, then ដុល្លារ
-    pattern = r'\s([\d,]+(?:\.\d+)?)\s+ដុល្លារ'
-    match = re.search(pattern, text)
-    
+    match = _KHMER_DOLLAR_PATTERN.search(text)
     if match:
-        amount_str = match.group(1).replace(',', '')
-        try:
-            amount = float(amount_str) if '.' in amount_str else float(amount_str)
-            return amount
-        except ValueError:
-            return None
-    
+        return _to_float(match.group(1))
     return None
 
+
 def extract_s7pos_final_amount(text: str) -> float | None:
     """
     Extract final amount from s7pos_bot message format.
-    
+
     Looks for pattern: សរុបចុងក្រោយ: [amount] $
-    
+
     Example input:
     - "សរុបចុងក្រោយ: 63.00 $"
     Returns: 63.0
     """
-    pattern = r'សរុបចុងក្រោយ:\s*([\d,]+(?:\.\d+)?)\s*\$'
-    match = re.search(pattern, text)
-    
+    match = _S7POS_FINAL_PATTERN.search(text)
     if match:
-        amount_str = match.group(1).replace(',', '')
-        try:
-            amount = float(amount_str) if '.' in amount_str else float(amount_str)
-            return amount
-        except ValueError:
-            return None
-    
+        return _to_float(match.group(1))
     return None
 
+
 def extract_s7pos_amount_and_currency(text: str):
     """
     Extract amount and currency specifically for s7pos_bot messages.
-    
+
     Returns tuple (currency, amount) or (None, None) if not found.
     """
     amount = extract_s7pos_final_amount(text)
     if amount is not None:
         return '$', amount
-    
+
     return None, None
 
+
 def extract_trx_id(message_text: str) -> str | None:
-    # Pattern 1: Traditional format "Trx. ID: 123456"
-    match = re.search(r'Trx\. ID:\s*([0-9]+)', message_text)
-    if match:
-        return match.group(1)
-    
-    # Pattern 2: Hash format "(Hash. abc123def)" or "(Hash. abc123def" (missing closing parenthesis)
-    match = re.search(r'\(Hash\.\s*([a-f0-9]+)\)?', message_text, re.IGNORECASE)
-    if match:
-        return match.group(1)
-    
-    # Pattern 3: Khmer format "លេខយោង [reference_number]"
-    match = re.search(r'លេខយោង\s+([0-9]+)', message_text)
-    if match:
-        return match.group(1)
-    
-    # Pattern 4: Khmer transaction format "លេខប្រតិបត្តិការ: 123456"
-    match = re.search(r'លេខប្រតិបត្តិការ:\s*([0-9]+)', message_text)
-    if match:
-        return match.group(1)
-    
-    # Pattern 5: Advanced Bank of Asia "Txn Hash: abc123def"
-    match = re.search(r'Txn Hash:\s*([a-f0-9]+)', message_text, re.IGNORECASE)
-    if match:
-        return match.group(1)
-    
-    # Pattern 6: QRPay "Transaction Hash: XXXXXXXX" format
-    match = re.search(r'Transaction Hash:\s*([a-f0-9]+)', message_text, re.IGNORECASE)
-    if match:
-        return match.group(1)
-    
-    # Pattern 7: Reference ID format "Ref.ID: 123456"
-    match = re.search(r'Ref\.ID:\s*([0-9]+)', message_text)
-    if match:
-        return match.group(1)
-    
-    # Pattern 8: Transaction ID format "Transaction ID: 099QORT252080682"
-    match = re.search(r'Transaction ID:\s*([a-zA-Z0-9]+)', message_text)
-    if match:
-        return match.group(1)
-    
-    return None
\ No newline at end of file
+    return _run_trx_rules(DEFAULT_PROFILE.trx_rules, message_text, message_text.lower())
@@ -0,0 +1,351 @@
+"""
+In-process metrics exposed in the Prometheus text format
+
+Counters and histograms are updated where things happen (listener, batch
+writer, schedulers, rate limiters); gauges, and counters kept by other
+components (DB pool, caches, outbound dispatchers), are read from callbacks
+when /metrics is scraped. start_metrics_server() serves them on a local port
+from the running event loop, so no extra dependency or thread is needed.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Callable, Iterable
+
+from helper.logger_utils import force_log
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+COUNT_BUCKETS = (0, 1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(str(labels.get(name, "")) for name in self.labelnames), 0)
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: dict[tuple[str, ...], list] = {}  # key -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(tuple(str(labels.get(name, "")) for name in self.labelnames))
+        return series[2] if series else 0
+
+    def collect(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(key, (list(series[0]), series[1], series[2])) for key, series in self._series.items()]
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+
+class GaugeCallback:
+    """Gauges read at scrape time: callback returns [(labels dict, value), ...]"""
+
+    metric_type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], list[tuple[dict[str, str], float]]],
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+
+    def collect(self) -> Iterable[str]:
+        try:
+            samples = self.callback()
+        except Exception as e:
+            force_log(f"Metrics gauge {self.name} failed: {e}", "Metrics", "WARNING")
+            return
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.metric_type}"
+        for labels, value in samples:
+            names = tuple(labels)
+            yield f"{self.name}{_format_labels(names, tuple(labels[name] for name in names))} {_format_value(value)}"
+
+
+class CounterCallback(GaugeCallback):
+    """Monotonic totals kept elsewhere, read at scrape time like GaugeCallback"""
+
+    metric_type = "counter"
+
+
+_registry: dict[str, Counter | Histogram | GaugeCallback] = {}
+
+
+def _register(metric):
+    # Keep the first registration so module reloads do not reset counters
+    return _registry.setdefault(metric.name, metric)
+
+
+def counter(name: str, documentation: str, labelnames: tuple[str, ...] = ()) -> Counter:
+    return _register(Counter(name, documentation, labelnames))
+
+
+def histogram(
+    name: str,
+    documentation: str,
+    labelnames: tuple[str, ...] = (),
+    buckets: tuple[float, ...] = LATENCY_BUCKETS,
+) -> Histogram:
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def gauge_callback(
+    name: str, documentation: str, callback: Callable[[], list[tuple[dict[str, str], float]]]
+) -> GaugeCallback:
+    return _register(GaugeCallback(name, documentation, callback))
+
+
+def counter_callback(
+    name: str, documentation: str, callback: Callable[[], list[tuple[dict[str, str], float]]]
+) -> CounterCallback:
+    return _register(CounterCallback(name, documentation, callback))
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+    for metric in list(_registry.values()):
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+# Ingestion
+MESSAGES_RECEIVED = counter(
+    "autosum_messages_received_total", "Bank bot notifications received by the listener", ("bot",)
+)
+PARSE_FAILURES = counter(
+    "autosum_parse_failures_total", "Bank bot notifications without a currency and amount", ("bot",)
+)
+INCOME_WRITES = counter(
+    "autosum_income_writes_total",
+    "Income write outcomes (inserted, duplicate, chat_not_found, before_registration)",
+    ("source", "status"),
+)
+INSERT_LATENCY = histogram(
+    "autosum_income_insert_seconds", "Time to write one income batch to the database"
+)
+END_TO_END_LATENCY = histogram(
+    "autosum_ingest_latency_seconds", "Telegram message date to database commit"
+)
+
+# Schedulers
+SCHEDULER_RUN = histogram(
+    "autosum_scheduler_run_seconds", "Duration of one scheduler run", ("scheduler",)
+)
+CHATS_VERIFIED = histogram(
+    "autosum_verification_chats", "Chats checked per message verification run", ("account",), COUNT_BUCKETS
+)
+
+# Telegram API
+FLOOD_WAIT_SECONDS = counter(
+    "autosum_flood_wait_seconds_total", "Seconds paused after Telegram flood limits (FloodWait / RetryAfter)", ("limiter",)
+)
+
+
+# Live values and high-water marks; everything else below only ever grows
+POOL_GAUGES = ("size", "checked_in", "checked_out", "overflow", "max_checked_out", "peak_overflow", "max_wait_seconds")
+POOL_EVENTS = ("checkouts", "checkins", "connects", "invalidations", "timeouts", "waits")
+OUTBOUND_OUTCOMES = ("sent", "failed", "retry_after")
+
+
+def _pool_stats():
+    from config import get_pool_stats
+
+    return get_pool_stats()
+
+
+def _pool_samples():
+    stats = _pool_stats()
+    return [({"stat": key}, stats[key]) for key in POOL_GAUGES if key in stats]
+
+
+def _pool_event_samples():
+    stats = _pool_stats()
+    return [({"event": key}, stats[key]) for key in POOL_EVENTS]
+
+
+def _pool_wait_samples():
+    return [({}, _pool_stats()["wait_seconds"])]
+
+
+def _dispatcher_lane_samples(keys: dict[str, str]):
+    """One sample per bot, lane and counter in keys (counter name -> label value)"""
+    from services.outbound_dispatcher import get_dispatcher_stats
+
+    samples = []
+    for stats in get_dispatcher_stats():
+        for lane, counters in stats["lanes"].items():
+            for key, outcome in keys.items():
+                labels = {"bot": stats["name"], "lane": lane}
+                if outcome:
+                    labels["outcome"] = outcome
+                samples.append((labels, counters[key]))
+    return samples
+
+
+def _dispatcher_pending_samples():
+    from services.outbound_dispatcher import get_dispatcher_stats
+
+    return [({"bot": stats["name"]}, stats["limiter"]["pending"]) for stats in get_dispatcher_stats()]
+
+
+def _cache_stats():
+    from services import get_registry_cache_stats
+    from services.report_cache import report_cache
+
+    return [*get_registry_cache_stats(), report_cache.stats()]
+
+
+def _cache_samples():
+    return [({"cache": stats["name"]}, stats["size"]) for stats in _cache_stats()]
+
+
+def _cache_lookup_samples():
+    samples = []
+    for stats in _cache_stats():
+        samples.append(({"cache": stats["name"], "result": "hit"}, stats["hits"]))
+        samples.append(({"cache": stats["name"], "result": "miss"}, stats["misses"]))
+    return samples
+
+
+gauge_callback("autosum_db_pool", "SQLAlchemy connection pool size, connections in use and peaks", _pool_samples)
+counter_callback("autosum_db_pool_events_total", "SQLAlchemy connection pool events", _pool_event_samples)
+counter_callback(
+    "autosum_db_pool_wait_seconds_total", "Time spent waiting for a pooled connection", _pool_wait_samples
+)
+gauge_callback("autosum_cache_entries", "Entries in the in-process caches", _cache_samples)
+counter_callback("autosum_cache_lookups_total", "In-process cache hits and misses", _cache_lookup_samples)
+counter_callback(
+    "autosum_outbound_messages_total",
+    "Outbound dispatcher requests per bot, lane and outcome",
+    lambda: _dispatcher_lane_samples({outcome: outcome for outcome in OUTBOUND_OUTCOMES}),
+)
+counter_callback(
+    "autosum_outbound_wait_seconds_total",
+    "Time outbound requests waited for the rate limits",
+    lambda: _dispatcher_lane_samples({"wait_seconds": ""}),
+)
+gauge_callback(
+    "autosum_outbound_max_wait_seconds",
+    "Longest rate limit wait of an outbound request",
+    lambda: _dispatcher_lane_samples({"max_wait_seconds": ""}),
+)
+gauge_callback("autosum_outbound_pending", "Outbound requests waiting for a global token", _dispatcher_pending_samples)
+
+
+async def _handle_request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+        # Drain the headers; the request has no body
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+            status, content_type, body = "200 OK", "text/plain; version=0.0.4; charset=utf-8", render_metrics()
+        else:
+            status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", "Not Found\n"
+
+        payload = body.encode()
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode()
+            + payload
+        )
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(default_port: int) -> asyncio.AbstractServer | None:
+    """
+    Serve GET /metrics on METRICS_HOST:METRICS_PORT (default 127.0.0.1 and
+    default_port); METRICS_PORT=0 disables it.
+    """
+    port = int(os.getenv("METRICS_PORT", str(default_port)))
+    if port == 0:
+        return None
+    host = os.getenv("METRICS_HOST", "127.0.0.1")
+    try:
+        server = await asyncio.start_server(_handle_request, host, port)
+    except OSError as e:
+        force_log(f"Metrics endpoint not started on {host}:{port}: {e}", "Metrics", "WARNING")
+        return None
+    force_log(f"Metrics endpoint listening on http://{host}:{port}/metrics", "Metrics")
+    return server
@@ -3,23 +3,24 @@ from datetime import datetime
 from .daily_report_helper import get_khmer_month_name
 
 
-def monthly_transaction_report(incomes, start_date: datetime, end_date: datetime) -> str:
-    """Generate monthly transaction report in format similar to weekly report"""
+def monthly_transaction_report(aggregates, start_date: datetime, end_date: datetime) -> str:
+    """Generate monthly transaction report in format similar to weekly report from per-day IncomeAggregate or IncomeRow rows"""
     from datetime import date
 
     # Group transactions by date
     daily_data = {}
     transaction_times = []
     
-    for income in incomes:
-        income_date = income.income_date.date()
+    for aggregate in aggregates:
+        income_date = aggregate.bucket
         if income_date not in daily_data:
             daily_data[income_date] = {"KHR": 0, "USD": 0, "count": 0}
         
-        currency = income.currency
-        daily_data[income_date][currency] += income.amount
-        daily_data[income_date]["count"] += 1
-        transaction_times.append(income.income_date)
+        currency = aggregate.currency
+        if currency in daily_data[income_date]:
+            daily_data[income_date][currency] += aggregate.total
+        daily_data[income_date]["count"] += aggregate.count
+        transaction_times.extend((aggregate.first_at, aggregate.last_at))
     
     # Calculate totals
     total_khr = sum(day_data["KHR"] for day_data in daily_data.values())
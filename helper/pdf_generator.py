@@ -1,4 +1,5 @@
 import io
+from typing import Iterable
 
 from PIL import Image
 from reportlab.lib.pagesizes import letter
@@ -25,50 +26,95 @@ class PDFGenerator:
         Returns:
             BytesIO buffer containing the PDF data
         """
-        try:
-            force_log(f"Creating PDF for QR image, size: {qr_image.size}", self.logger_name)
+        qr_buffer = io.BytesIO()
+        qr_image.save(qr_buffer, format='PNG')
+        return self.create_qr_pdf_from_png(qr_buffer.getvalue(), filename_prefix)
+    
+    def create_qr_pdf_from_png(self, png_bytes: bytes, filename_prefix: str = "QR") -> io.BytesIO:
+        """
+        Create a PDF with an already encoded QR code PNG centered on the page
+        
+        The bytes go to ReportLab as they are, so the image is not decoded and
+        re-encoded through Pillow first.
+        
+        Args:
+            png_bytes: PNG encoded QR code image
+            filename_prefix: Prefix for the filename (default: "QR")
             
-            # Create PDF buffer
+        Returns:
+            BytesIO buffer containing the PDF data
+        """
+        try:
             pdf_buffer = io.BytesIO()
             c = canvas.Canvas(pdf_buffer, pagesize=letter)
-            width, height = letter
-            
-            # Convert QR image to buffer for ReportLab
-            qr_buffer = io.BytesIO()
-            qr_image.save(qr_buffer, format='PNG')
-            qr_buffer.seek(0)
+            self._draw_centered_png(c, png_bytes)
             
-            # Calculate positioning to center the QR code
-            qr_width, qr_height = qr_image.size
-            
-            # Scale to fit page nicely (max 80% of page width/height)
-            max_width = width * 0.8
-            max_height = height * 0.8
-            scale_factor = min(max_width / qr_width, max_height / qr_height)
-            
-            scaled_width = qr_width * scale_factor
-            scaled_height = qr_height * scale_factor
+            # Save and finalize PDF
+            c.save()
+            pdf_buffer.seek(0)
             
-            # Center on page
-            x_pos = (width - scaled_width) / 2
-            y_pos = (height - scaled_height) / 2
+            force_log(f"PDF created successfully, size: {len(pdf_buffer.getvalue())} bytes", self.logger_name)
+            return pdf_buffer
             
-            force_log(f"PDF layout: page={width}x{height}, QR scaled to {scaled_width}x{scaled_height} at ({x_pos}, {y_pos})", self.logger_name)
+        except Exception as e:
+            force_log(f"Error creating PDF: {e}", self.logger_name)
+            raise e
+    
+    def create_multi_page_qr_pdf(self, pages: Iterable[bytes]) -> io.BytesIO:
+        """
+        Create a PDF with one QR code PNG centered on each page
+        
+        Pages are drawn one at a time as the iterable yields them, so only
+        the current page's image is decoded at any moment.
+        
+        Args:
+            pages: PNG encoded QR code images, in page order
             
-            # Draw the exact QR image
-            c.drawImage(ImageReader(qr_buffer), x_pos, y_pos, scaled_width, scaled_height)
+        Returns:
+            BytesIO buffer containing the PDF data
+        """
+        try:
+            pdf_buffer = io.BytesIO()
+            c = canvas.Canvas(pdf_buffer, pagesize=letter)
+            page_count = 0
+            for png_bytes in pages:
+                self._draw_centered_png(c, png_bytes)
+                c.showPage()
+                page_count += 1
             
-            # Save and finalize PDF
             c.save()
             pdf_buffer.seek(0)
             
-            force_log(f"PDF created successfully, size: {len(pdf_buffer.getvalue())} bytes", self.logger_name)
+            force_log(f"PDF created successfully, {page_count} pages, size: {len(pdf_buffer.getvalue())} bytes", self.logger_name)
             return pdf_buffer
             
         except Exception as e:
-            force_log(f"Error creating PDF: {e}", self.logger_name)
+            force_log(f"Error creating multi-page PDF: {e}", self.logger_name)
             raise e
     
+    def _draw_centered_png(self, c: canvas.Canvas, png_bytes: bytes):
+        """Draw a PNG scaled to at most 80% of the page and centered on it"""
+        qr_reader = ImageReader(io.BytesIO(png_bytes))
+        qr_width, qr_height = qr_reader.getSize()
+        width, height = letter
+        
+        # Scale to fit page nicely (max 80% of page width/height)
+        max_width = width * 0.8
+        max_height = height * 0.8
+        scale_factor = min(max_width / qr_width, max_height / qr_height)
+        
+        scaled_width = qr_width * scale_factor
+        scaled_height = qr_height * scale_factor
+        
+        # Center on page
+        x_pos = (width - scaled_width) / 2
+        y_pos = (height - scaled_height) / 2
+        
+        force_log(f"PDF layout: page={width}x{height}, QR {qr_width}x{qr_height} scaled to {scaled_width}x{scaled_height} at ({x_pos}, {y_pos})", self.logger_name, "DEBUG")
+        
+        # Draw the exact QR image
+        c.drawImage(qr_reader, x_pos, y_pos, scaled_width, scaled_height)
+    
     def create_wifi_qr_pdf(self, qr_image: Image.Image, wifi_name: str) -> io.BytesIO:
         """
         Create a PDF specifically for Wifi QR codes
@@ -88,6 +134,25 @@ class PDFGenerator:
             force_log(f"Error creating Wifi QR PDF: {e}", self.logger_name)
             raise e
     
+    def create_wifi_qr_pdf_from_png(self, png_bytes: bytes, wifi_name: str) -> io.BytesIO:
+        """
+        Create a Wifi QR PDF from the PNG the QR generator produced
+        
+        Args:
+            png_bytes: PNG encoded Wifi QR code image
+            wifi_name: Wifi network name for filename
+            
+        Returns:
+            BytesIO buffer containing the PDF data
+        """
+        try:
+            force_log(f"Creating Wifi QR PDF for network: {wifi_name}", self.logger_name)
+            return self.create_qr_pdf_from_png(png_bytes, f"Wifi-QR-{wifi_name}")
+            
+        except Exception as e:
+            force_log(f"Error creating Wifi QR PDF: {e}", self.logger_name)
+            raise e
+    
     def get_pdf_filename(self, wifi_name: str) -> str:
         """
         Generate a clean filename for the Wifi QR PDF
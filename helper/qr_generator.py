@@ -3,14 +3,74 @@ import io
 import qrcode
 from PIL import Image, ImageDraw, ImageFont
 
+from functools import lru_cache
+from typing import NamedTuple
+
 from helper.logger_utils import force_log
 
+LOGGER_NAME = "QRGenerator"
+
+# Height of the text area below the QR code
+TEXT_AREA_HEIGHT = 330
+
+# Text positioning within the text area, with space for the larger fonts
+TEXT_START_Y = 20  # Space between QR and text
+LINE_HEIGHT = 56
+
+FONT_PATHS = (
+    # Ubuntu/Debian fonts
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    "/usr/share/fonts/truetype/ubuntu/Ubuntu-Regular.ttf",
+    "/usr/share/fonts/truetype/ubuntu/Ubuntu-Bold.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/LiberationSans-Regular.ttf",
+    # macOS fonts
+    "/System/Library/Fonts/Helvetica.ttc",
+    "/System/Library/Fonts/HelveticaNeue.ttc",
+    "/System/Library/Fonts/Geneva.ttf",
+    # Generic fallbacks
+    "DejaVuSans.ttf",
+    "LiberationSans-Regular.ttf",
+    "Arial.ttf",
+)
+
+
+@lru_cache(maxsize=None)
+def load_font(actual_size: int) -> ImageFont.FreeTypeFont | ImageFont.ImageFont:
+    """First available TrueType font at the given pixel size, loaded once per process"""
+    for path in FONT_PATHS:
+        try:
+            font = ImageFont.truetype(path, actual_size)
+            force_log(f"Successfully loaded font: {path}, size: {actual_size}", LOGGER_NAME)
+            return font
+        except (OSError, IOError) as e:
+            force_log(f"Failed to load font {path}: {e}", LOGGER_NAME, "DEBUG")
+            continue
+
+    force_log("Using default font fallback", LOGGER_NAME, "WARNING")
+    return ImageFont.load_default()
+
+
+class TextLayout(NamedTuple):
+    """Text area for one QR width: the static lines pre-drawn, the fonts and rows of the variable ones"""
+
+    template: Image.Image
+    font: ImageFont.FreeTypeFont | ImageFont.ImageFont
+    name_y: int
+    password_y: int
+
 
 class QRGenerator:
     """Utility class for generating QR codes with text overlay"""
     
+    # Bump when the rendered card changes so cached renders are not reused
+    LAYOUT_VERSION = 2
+    
     def __init__(self):
-        self.logger_name = "QRGenerator"
+        self.logger_name = LOGGER_NAME
     
     def generate_wifi_qr_with_text(self, wifi_name: str, wifi_password: str) -> Image.Image:
         """
@@ -42,7 +102,7 @@ class QRGenerator:
             raise e
     
     def _create_qr_code(self, data: str) -> Image.Image:
-        """Create basic QR code image"""
+        """Create basic QR code image (1-bit; it is only widened in the final composite)"""
         try:
             qr = qrcode.QRCode(
                 version=1,
@@ -53,14 +113,10 @@ class QRGenerator:
             qr.add_data(data)
             qr.make(fit=True)
             
-            # Create QR code image and convert to proper PIL Image
-            qr_img = qr.make_image(fill_color="black", back_color="white")
-            
-            # Convert to RGB PIL Image to ensure compatibility
-            if qr_img.mode != 'RGB':
-                qr_img = qr_img.convert('RGB')
+            # Black on white keeps the plain PIL image in mode "1"
+            qr_img = qr.make_image(fill_color="black", back_color="white").get_image()
             
-            force_log(f"QR code created successfully, size: {qr_img.size}, mode: {qr_img.mode}", self.logger_name)
+            force_log(f"QR code created successfully, size: {qr_img.size}, mode: {qr_img.mode}", self.logger_name, "DEBUG")
             return qr_img
             
         except Exception as e:
@@ -72,16 +128,14 @@ class QRGenerator:
         try:
             # Get QR code dimensions
             qr_width, qr_height = qr_img.size
-            force_log(f"QR image size: {qr_width}x{qr_height}", self.logger_name)
+            force_log(f"QR image size: {qr_width}x{qr_height}", self.logger_name, "DEBUG")
             
-            # Create new image with space for text (reduced to 350px)
-            text_area_height = 330  # Reduced from 390 to 350
-            total_height = qr_height + text_area_height
-            final_img = Image.new('RGB', (qr_width, total_height), 'white')
+            # Grayscale is enough for black text and keeps its anti-aliasing
+            final_img = Image.new('L', (qr_width, qr_height + TEXT_AREA_HEIGHT), 255)
             
-            # Paste QR code at top
+            # Paste QR code at top and the prepared text area below it
             final_img.paste(qr_img, (0, 0))
-            force_log("QR code pasted to final image", self.logger_name)
+            final_img.paste(self._get_text_layout(qr_width).template, (0, qr_height))
             
             # Add text
             self._draw_text_lines(final_img, qr_width, qr_height, wifi_name, wifi_password)
@@ -93,114 +147,76 @@ class QRGenerator:
             raise e
     
     def _draw_text_lines(self, img: Image.Image, qr_width: int, qr_height: int, wifi_name: str, wifi_password: str):
-        """Draw text lines below QR code"""
+        """Draw the Wifi name and password lines below QR code"""
         try:
             draw = ImageDraw.Draw(img)
+            layout = self._get_text_layout(qr_width)
             
-            # Load fonts with larger base sizes
-            font = self._load_font(20)  # Increased from 12 to 20
-            font_small = self._load_font(16)  # Increased from 10 to 16
-            
-            # Text content
             lines = [
-                f"Wifi name: {wifi_name}",
-                f"Password: {wifi_password}",
-                "- - - - - - -- - - - - - -",
-                "QR generated by AutoSum"
+                (f"Wifi name: {wifi_name}", layout.name_y),
+                (f"Password: {wifi_password}", layout.password_y),
             ]
             
-            # Text positioning with more space for larger fonts
-            start_y = qr_height + 20  # More space between QR and text
-            line_height = 56  # Reduced from 80 to 56 (30% reduction)
-            
-            # Draw each line with custom spacing
-            for i, line in enumerate(lines):
-                if i == 0:  # Wifi Name
-                    y_pos = start_y
-                    current_font = font
-                elif i == 1:  # Password - add extra space after Wifi Name
-                    y_pos = start_y + line_height + 20  # Extra 20px space between Wifi Name and Password
-                    current_font = font
-                elif i == 2:  # Separator - add extra space
-                    y_pos = start_y + (2 * line_height) + 35  # Account for extra space above
-                    current_font = font_small
-                else:  # Footer - smaller font and size
-                    y_pos = start_y + (3 * line_height) + 35  # Maintain spacing
-                    current_font = self._load_font(12)  # Increased footer font size
-                
+            for i, (line, y_offset) in enumerate(lines):
                 # Center the text
-                x_pos = self._get_centered_x_position(draw, line, current_font, qr_width)
+                x_pos = self._get_centered_x_position(draw, line, layout.font, qr_width)
+                y_pos = qr_height + y_offset
                 
                 # Draw text with anti-aliasing for better quality
-                draw.text((x_pos, y_pos), line, fill="black", font=current_font)
-                force_log(f"Drew line {i+1}: '{line}' at ({x_pos}, {y_pos})", self.logger_name)
+                draw.text((x_pos, y_pos), line, fill=0, font=layout.font)
+                force_log(f"Drew line {i+1}: '{line}' at ({x_pos}, {y_pos})", self.logger_name, "DEBUG")
                 
         except Exception as e:
             force_log(f"Error drawing text lines: {e}", self.logger_name)
             raise e
     
-    def _load_font(self, size: int) -> ImageFont.FreeTypeFont:
-        """Load font with much larger size"""
-        try:
-            # Use moderate font sizes
-            actual_size = size * 2  # Reduced from 2.5x to 2x
-            
-            # Try different font paths for various systems
-            font_paths = [
-                # Ubuntu/Debian fonts
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-                "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-                "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
-                "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
-                "/usr/share/fonts/truetype/ubuntu/Ubuntu-Regular.ttf",
-                "/usr/share/fonts/truetype/ubuntu/Ubuntu-Bold.ttf",
-                "/usr/share/fonts/TTF/DejaVuSans.ttf",
-                "/usr/share/fonts/TTF/LiberationSans-Regular.ttf",
-                # macOS fonts
-                "/System/Library/Fonts/Helvetica.ttc",
-                "/System/Library/Fonts/HelveticaNeue.ttc", 
-                "/System/Library/Fonts/Geneva.ttf",
-                # Generic fallbacks
-                "DejaVuSans.ttf",
-                "LiberationSans-Regular.ttf",
-                "Arial.ttf"
-            ]
-            
-            for path in font_paths:
-                try:
-                    font = ImageFont.truetype(path, actual_size)
-                    force_log(f"Successfully loaded font: {path}, size: {actual_size}", self.logger_name)
-                    return font
-                except (OSError, IOError) as e:
-                    force_log(f"Failed to load font {path}: {e}", self.logger_name)
-                    continue
-            
-            # Fallback - try to use default font with larger size
-            try:
-                font = ImageFont.load_default()
-                force_log(f"Using default font fallback", self.logger_name)
-                return font
-            except Exception:
-                force_log("All font loading failed, using basic default", self.logger_name)
-                return ImageFont.load_default()
-            
-        except Exception as e:
-            force_log(f"Error in _load_font: {e}", self.logger_name)
-            return ImageFont.load_default()
+    @staticmethod
+    @lru_cache(maxsize=8)
+    def _get_text_layout(qr_width: int) -> TextLayout:
+        """
+        Text area for QR codes of this width (one per QR version), with the
+        separator and footer - the same on every card - already drawn
+        """
+        template = Image.new('L', (qr_width, TEXT_AREA_HEIGHT), 255)
+        draw = ImageDraw.Draw(template)
+        
+        # Separator below the password, then the footer
+        static_lines = [
+            ("- - - - - - -- - - - - - -", TEXT_START_Y + (2 * LINE_HEIGHT) + 35, QRGenerator._load_font(16)),
+            ("QR generated by AutoSum", TEXT_START_Y + (3 * LINE_HEIGHT) + 35, QRGenerator._load_font(12)),
+        ]
+        for line, y_pos, font in static_lines:
+            x_pos = QRGenerator._get_centered_x_position(draw, line, font, qr_width)
+            draw.text((x_pos, y_pos), line, fill=0, font=font)
+        
+        force_log(f"Text layout prepared for QR width {qr_width}", LOGGER_NAME)
+        return TextLayout(
+            template=template,
+            font=QRGenerator._load_font(20),
+            name_y=TEXT_START_Y,
+            # Extra 20px space between Wifi Name and Password
+            password_y=TEXT_START_Y + LINE_HEIGHT + 20,
+        )
+    
+    @staticmethod
+    def _load_font(size: int) -> ImageFont.FreeTypeFont:
+        """Load font at twice the nominal size (cached per process)"""
+        return load_font(size * 2)
     
-    def _get_centered_x_position(self, draw: ImageDraw.ImageDraw, text: str, font: ImageFont.FreeTypeFont, img_width: int) -> int:
+    @staticmethod
+    def _get_centered_x_position(draw: ImageDraw.ImageDraw, text: str, font: ImageFont.FreeTypeFont, img_width: int) -> int:
         """Get x position to center text"""
         try:
             # Try modern method first
             try:
                 bbox = draw.textbbox((0, 0), text, font=font)
                 text_width = bbox[2] - bbox[0]
-                force_log(f"Text width calculated using textbbox: {text_width}", self.logger_name)
+                force_log(f"Text width calculated using textbbox: {text_width}", LOGGER_NAME, "DEBUG")
             except Exception:
                 # Fallback to older method
                 try:
                     text_width = draw.textsize(text, font=font)[0]
-                    force_log(f"Text width calculated using textsize: {text_width}", self.logger_name)
+                    force_log(f"Text width calculated using textsize: {text_width}", LOGGER_NAME, "DEBUG")
                 except Exception:
                     # Final fallback: estimate (adjusted based on font size)
                     # Check if this is likely a smaller font (footer text)
@@ -208,13 +224,13 @@ class QRGenerator:
                         text_width = len(text) * 20  # Smaller multiplier for footer
                     else:
                         text_width = len(text) * 28  # Normal size for main text
-                    force_log(f"Text width estimated: {text_width}", self.logger_name)
+                    force_log(f"Text width estimated: {text_width}", LOGGER_NAME)
             
             x_pos = max(0, (img_width - text_width) // 2)
             return x_pos
             
         except Exception as e:
-            force_log(f"Error calculating text position: {e}, using fallback", self.logger_name)
+            force_log(f"Error calculating text position: {e}, using fallback", LOGGER_NAME)
             return 10  # Fallback to left margin
     
     def image_to_bytes(self, img: Image.Image, format: str = 'PNG') -> io.BytesIO:
@@ -223,7 +239,7 @@ class QRGenerator:
             bio = io.BytesIO()
             img.save(bio, format=format)
             bio.seek(0)
-            force_log(f"Image converted to bytes, format: {format}", self.logger_name)
+            force_log(f"Image converted to bytes, format: {format}", self.logger_name, "DEBUG")
             return bio
         except Exception as e:
             force_log(f"Error converting image to bytes: {e}", self.logger_name)
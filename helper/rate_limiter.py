@@ -0,0 +1,279 @@
+import asyncio
+import heapq
+import os
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+from telethon.errors import FloodWaitError
+
+from helper.logger_utils import force_log
+from helper.metrics import FLOOD_WAIT_SECONDS
+
+T = TypeVar("T")
+
+
+class _PriorityLock:
+    """asyncio.Lock that wakes the waiter with the lowest priority number first (FIFO within a priority)"""
+
+    def __init__(self):
+        self._locked = False
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._waiter_seq = 0
+
+    async def acquire(self, priority: int = 0):
+        if not self._locked:
+            self._locked = True
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiter_seq += 1
+        heapq.heappush(self._waiters, (priority, self._waiter_seq, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Cancelled right after the lock was handed over: pass it on
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        """Hand the lock to the most urgent waiter, if any"""
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._locked = False
+
+
+class TokenBucketRateLimiter:
+    """
+    Async token bucket shared by everything that calls one Telegram account.
+
+    The rate adapts: a FloodWaitError pauses the bucket for the requested time
+    and halves the rate, every successful call nudges it back up towards
+    ``max_rate``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = 5.0,
+        capacity: float = 10.0,
+        min_rate: float = 0.5,
+        max_rate: float | None = None,
+        recovery_step: float = 0.05,
+        max_flood_retries: int = 3,
+    ):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.recovery_step = recovery_step
+        self.max_flood_retries = max_flood_retries
+        self.flood_waits = 0
+        self.calls = 0
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock: _PriorityLock | None = None
+
+    async def acquire(self, priority: int = 0):
+        """Wait for a token; waiters with a lower priority number are served first"""
+        if self._lock is None:
+            self._lock = _PriorityLock()
+
+        await self._lock.acquire(priority)
+        try:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.calls += 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+        finally:
+            self._lock.release()
+
+    def on_flood_wait(self, seconds: float):
+        """Pause the bucket and back off after Telegram asked us to wait"""
+        self.flood_waits += 1
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+        self.rate = max(self.min_rate, self.rate / 2)
+        force_log(
+            f"Rate limiter {self.name}: FloodWait {seconds}s, rate lowered to {self.rate:.2f}/s",
+            "RateLimiter",
+            "WARNING",
+        )
+
+    def on_success(self):
+        if self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.recovery_step)
+
+    async def call(self, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """
+        Run one Telegram API call under the limiter.
+
+        FloodWaitError is retried after the requested wait, up to
+        max_flood_retries times, then re-raised.
+        """
+        attempt = 0
+        while True:
+            await self.acquire()
+            try:
+                result = await func(*args, **kwargs)
+            except FloodWaitError as e:
+                seconds = e.seconds + 1
+                FLOOD_WAIT_SECONDS.inc(seconds, limiter=self.name)
+                self.on_flood_wait(seconds)
+                attempt += 1
+                if attempt > self.max_flood_retries:
+                    raise
+                continue
+            self.on_success()
+            return result
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "rate": self.rate,
+            "calls": self.calls,
+            "flood_waits": self.flood_waits,
+        }
+
+
+class BotApiRateLimiter:
+    """
+    Bot API send limits: one bucket for the whole bot token plus one per chat.
+
+    Telegram allows a bot roughly 30 messages per second overall and about
+    one per second (20 per minute in groups) to the same chat. acquire(chat_id)
+    waits for the chat's bucket first, so a busy chat never holds up the
+    global bucket for everyone else. Chat and global tokens both go to the
+    waiter with the lowest priority number first (FIFO within a priority),
+    so interactive replies overtake queued broadcasts.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float = 25.0,
+        capacity: float = 25.0,
+        chat_rate: float = 1.0,
+        chat_capacity: float = 3.0,
+        max_chats: int = 4096,
+    ):
+        self.name = name
+        self.chat_rate = chat_rate
+        self.chat_capacity = chat_capacity
+        self.max_chats = max_chats
+        self.global_bucket = TokenBucketRateLimiter(name, rate=rate, capacity=capacity)
+        self._chat_buckets: dict[int, TokenBucketRateLimiter] = {}
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []
+        self._waiter_seq = 0
+        self._granter: asyncio.Task | None = None
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucketRateLimiter:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= self.max_chats:
+                self._prune_idle()
+            bucket = TokenBucketRateLimiter(
+                f"{self.name}:{chat_id}", rate=self.chat_rate, capacity=self.chat_capacity
+            )
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune_idle(self):
+        """Forget chat buckets that have refilled completely"""
+        now = time.monotonic()
+        for chat_id, bucket in list(self._chat_buckets.items()):
+            refilled = bucket._tokens + (now - bucket._updated_at) * bucket.rate
+            if refilled >= bucket.capacity and now >= bucket._paused_until:
+                del self._chat_buckets[chat_id]
+
+    async def acquire(self, chat_id: int | None, priority: int = 0):
+        """Wait until one more request may be sent to chat_id (None: no chat limit)"""
+        if chat_id is not None:
+            await self._chat_bucket(chat_id).acquire(priority)
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiter_seq += 1
+        heapq.heappush(self._waiters, (priority, self._waiter_seq, future))
+        if self._granter is None or self._granter.done():
+            self._granter = asyncio.create_task(self._grant_tokens())
+        await future
+
+    async def _grant_tokens(self):
+        """Hand each global token to the most urgent waiter"""
+        while self._waiters:
+            await self.global_bucket.acquire()
+            while self._waiters:
+                _, _, future = heapq.heappop(self._waiters)
+                if not future.done():
+                    future.set_result(None)
+                    break
+
+    def pending(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
+
+    def on_retry_after(self, chat_id: int | None, seconds: float, global_limit: bool = False):
+        """
+        Telegram answered 429: pause the chat, or the whole token when the
+        limit is not tied to one chat (no chat_id, or global_limit)
+        """
+        FLOOD_WAIT_SECONDS.inc(seconds, limiter=self.name)
+        if chat_id is not None:
+            self._chat_bucket(chat_id).on_flood_wait(seconds)
+        if chat_id is None or global_limit:
+            self.global_bucket.on_flood_wait(seconds)
+
+    def stats(self) -> dict[str, Any]:
+        return {**self.global_bucket.stats(), "chats": len(self._chat_buckets), "pending": self.pending()}
+
+
+_telethon_rate_limiters: dict[str, TokenBucketRateLimiter] = {}
+
+
+def get_telethon_rate_limiter(account: str) -> TokenBucketRateLimiter:
+    """Get the shared rate limiter for one Telethon account (phone number)"""
+    limiter = _telethon_rate_limiters.get(account)
+    if limiter is None:
+        rate = float(os.getenv("TELETHON_API_RATE", "5"))
+        limiter = TokenBucketRateLimiter(
+            name=account,
+            rate=rate,
+            capacity=float(os.getenv("TELETHON_API_BURST", "10")),
+            max_rate=float(os.getenv("TELETHON_API_MAX_RATE", str(rate * 2))),
+        )
+        _telethon_rate_limiters[account] = limiter
+    return limiter
+
+
+_bot_api_rate_limiters: dict[str, BotApiRateLimiter] = {}
+
+
+def get_bot_api_rate_limiter(name: str) -> BotApiRateLimiter:
+    """Get the shared Bot API rate limiter for one bot"""
+    limiter = _bot_api_rate_limiters.get(name)
+    if limiter is None:
+        rate = float(os.getenv("BOT_API_RATE", "25"))
+        limiter = BotApiRateLimiter(
+            name=name,
+            rate=rate,
+            capacity=rate,
+            chat_rate=float(os.getenv("BOT_API_CHAT_RATE", "1")),
+            chat_capacity=float(os.getenv("BOT_API_CHAT_BURST", "3")),
+        )
+        _bot_api_rate_limiters[name] = limiter
+    return limiter
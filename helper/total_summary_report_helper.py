@@ -1,16 +1,16 @@
 from common.enums import CurrencyEnum
 
 
-def total_summary_report(incomes, summary_title: str) -> str:
+def total_summary_report(aggregates, summary_title: str) -> str:
     totals = {currency.name: 0 for currency in CurrencyEnum}
     transaction_counts = {"KHR": 0, "USD": 0}
 
-    for income in incomes:
-        if income.currency in totals:
-            transaction_counts[income.currency] += 1
-            totals[income.currency] += income.amount
+    for aggregate in aggregates:
+        if aggregate.currency in totals:
+            transaction_counts[aggregate.currency] += aggregate.count
+            totals[aggregate.currency] += aggregate.total
         else:
-            totals[income.currency] = income.amount
+            totals[aggregate.currency] = aggregate.total
 
     message = f"{summary_title}:\n\n"
     for currency in CurrencyEnum:
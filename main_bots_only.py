@@ -31,6 +31,7 @@ logger = logging.getLogger(__name__)
 
 # NOW import services after logging is configured
 from helper.credential_loader import CredentialLoader
+from helper.metrics import start_metrics_server
 from schedulers import AutoCloseScheduler
 from schedulers.package_expiry_scheduler import PackageExpiryScheduler
 from schedulers.trial_expiry_scheduler import TrialExpiryScheduler
@@ -38,6 +39,7 @@ from services.telegram_admin_bot_service import TelegramAdminBot
 from services.telegram_business_bot_service import AutosumBusinessBot
 from services.telegram_private_bot_service import TelegramPrivateBot
 from services.telegram_standard_bot_service import TelegramBotService
+from services.qr_render_service import qr_render_service
 from services.telegram_utils_bot_service import TelegramUtilsBot
 
 tasks: Set[asyncio.Task] = set()
@@ -61,6 +63,7 @@ async def shutdown(loop: asyncio.AbstractEventLoop) -> None:
             task.cancel()
         await asyncio.gather(*tasks_to_cancel, return_exceptions=True)
 
+    qr_render_service.shutdown()
     loop.stop()
 
 
@@ -89,6 +92,7 @@ async def main(loader: CredentialLoader) -> None:
 
         loop = asyncio.get_running_loop()
         handle_signals(loop)
+        await start_metrics_server(default_port=9102)
 
         # Start bot services only (no telethon client)
         service_tasks = [
@@ -5,6 +5,8 @@ from typing import Set
 
 from config import load_environment
 from helper.credential_loader import CredentialLoader
+from helper.metrics import start_metrics_server
+from services.income_batch_writer import income_batch_writer
 from services.telethon_client_service import TelethonClientService
 
 load_environment()
@@ -49,6 +51,8 @@ async def shutdown(loop: asyncio.AbstractEventLoop) -> None:
             task.cancel()
         await asyncio.gather(*tasks_to_cancel, return_exceptions=True)
 
+    # Write the incomes still buffered before the loop goes away
+    await income_batch_writer.stop()
     loop.stop()
 
 
@@ -62,6 +66,7 @@ async def main(loader: CredentialLoader) -> None:
 
         loop = asyncio.get_running_loop()
         handle_signals(loop)
+        await start_metrics_server(default_port=9101)
 
         # Support multiple phone numbers from environment variables
         phone_configs = []
@@ -0,0 +1,80 @@
+"""add unique message key to income_balance
+
+Adds origin_chat_id, the Telegram chat a message was received in, and makes
+(origin_chat_id, message_id) unique.
+
+Revision ID: a7c3e91d4b20
+Revises: 70055f5b9b3d
+Create Date: 2026-10-18 10:12:41.318204+07:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c3e91d4b20'
+down_revision: Union[str, Sequence[str], None] = '70055f5b9b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Telegram chat each message was received in; kept when a group migrates
+    op.add_column('income_balance', sa.Column('origin_chat_id', sa.BigInteger(), nullable=True))
+    op.execute("UPDATE income_balance SET origin_chat_id = chat_id")
+
+    # Rows double-inserted by the listener / verification scheduler race are
+    # the same notification stored twice. Copy them aside, then remove them,
+    # keeping the first one written for each (chat_id, message_id)
+    duplicates = """
+        FROM income_balance newer
+        JOIN income_balance older
+          ON newer.chat_id = older.chat_id
+         AND newer.message_id = older.message_id
+         AND newer.amount = older.amount
+         AND newer.currency = older.currency
+         AND newer.message = older.message
+         AND newer.id > older.id
+    """
+    op.execute(f"CREATE TABLE income_balance_duplicates_backup AS SELECT DISTINCT newer.* {duplicates}")
+    op.execute(f"DELETE newer {duplicates}")
+
+    # Different notifications under one (chat_id, message_id) come from groups
+    # migrated to a supergroup, where message ids restarted. The older rows
+    # were received in the old group, whose id was not recorded
+    op.execute(
+        """
+        UPDATE income_balance older
+        JOIN income_balance newer
+          ON newer.chat_id = older.chat_id
+         AND newer.message_id = older.message_id
+         AND newer.id > older.id
+        SET older.origin_chat_id = NULL
+        """
+    )
+
+    # A Telegram message can only be stored once per chat it was received in
+    op.create_unique_constraint(
+        'uq_income_origin_message',
+        'income_balance',
+        ['origin_chat_id', 'message_id']
+    )
+
+    # Lookup key for trx_id duplicate checks. Not unique: parsed trx_ids can
+    # repeat within a chat (short hashes, truncated Vattanac "Trx. ID" values)
+    op.create_index(
+        'idx_income_chat_trx',
+        'income_balance',
+        ['chat_id', 'trx_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_income_chat_trx', 'income_balance')
+    op.drop_constraint('uq_income_origin_message', 'income_balance', type_='unique')
+    op.drop_column('income_balance', 'origin_chat_id')
+    # income_balance_duplicates_backup is kept; restore from it by hand if needed
@@ -0,0 +1,28 @@
+"""add last_verified_message_id to chat_group
+
+Revision ID: b8d4f2a6c913
+Revises: a7c3e91d4b20
+Create Date: 2026-10-18 11:05:12.604117+07:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4f2a6c913'
+down_revision: Union[str, Sequence[str], None] = 'a7c3e91d4b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # High-water mark of the message verification scheduler for each chat
+    op.add_column('chat_group', sa.Column('last_verified_message_id', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('chat_group', 'last_verified_message_id')
@@ -0,0 +1,77 @@
+"""add income rollup tables
+
+Revision ID: c4e8a1f7d2b6
+Revises: b8d4f2a6c913
+Create Date: 2026-10-18 14:02:37.418925+07:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1f7d2b6'
+down_revision: Union[str, Sequence[str], None] = 'b8d4f2a6c913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Per chat / day / currency totals, maintained on every income insert
+    op.create_table(
+        'income_daily_rollup',
+        sa.Column('chat_id', sa.BigInteger(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('currency', sa.String(16), nullable=False),
+        sa.Column('total', sa.Double(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('first_at', sa.DateTime(), nullable=False),
+        sa.Column('last_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('(now())')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('(now())')),
+        sa.PrimaryKeyConstraint('chat_id', 'day', 'currency')
+    )
+
+    # Per shift / currency totals
+    op.create_table(
+        'income_shift_rollup',
+        sa.Column('shift_id', sa.Integer(), nullable=False),
+        sa.Column('currency', sa.String(16), nullable=False),
+        sa.Column('chat_id', sa.BigInteger(), nullable=False),
+        sa.Column('total', sa.Double(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('first_at', sa.DateTime(), nullable=False),
+        sa.Column('last_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('(now())')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('(now())')),
+        sa.PrimaryKeyConstraint('shift_id', 'currency')
+    )
+    op.create_index('ix_income_shift_rollup_chat_id', 'income_shift_rollup', ['chat_id'])
+
+    # Backfill from existing income; scripts/rebuild_income_rollups.py does the same later on
+    op.execute(
+        """
+        INSERT INTO income_daily_rollup (chat_id, day, currency, total, count, first_at, last_at)
+        SELECT chat_id, DATE(income_date), currency, SUM(amount), COUNT(id), MIN(income_date), MAX(income_date)
+        FROM income_balance
+        GROUP BY chat_id, DATE(income_date), currency
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO income_shift_rollup (shift_id, currency, chat_id, total, count, first_at, last_at)
+        SELECT shift_id, currency, MIN(chat_id), SUM(amount), COUNT(id), MIN(income_date), MAX(income_date)
+        FROM income_balance
+        WHERE shift_id IS NOT NULL
+        GROUP BY shift_id, currency
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_income_shift_rollup_chat_id', 'income_shift_rollup')
+    op.drop_table('income_shift_rollup')
+    op.drop_table('income_daily_rollup')
@@ -0,0 +1,70 @@
+"""add covering indexes for hot queries
+
+Revision ID: d5f9b2c8e3a7
+Revises: c4e8a1f7d2b6
+Create Date: 2026-10-18 15:21:08.902214+07:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5f9b2c8e3a7'
+down_revision: Union[str, Sequence[str], None] = 'c4e8a1f7d2b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # chat_id + income_date range reads (reports, rollup rebuilds); currency and
+    # amount are included so per-currency sums are answered from the index alone
+    op.create_index(
+        'idx_income_chat_date_amount',
+        'income_balance',
+        ['chat_id', 'income_date', 'currency', 'amount']
+    )
+
+    # Shift totals: shift_id, optionally narrowed by chat_id
+    op.create_index(
+        'idx_income_shift_chat',
+        'income_balance',
+        ['shift_id', 'chat_id', 'currency', 'amount']
+    )
+
+    # (origin_chat_id, message_id) and (chat_id, trx_id) are covered by
+    # uq_income_origin_message and idx_income_chat_trx; every chat_id index
+    # above starts with chat_id, so the single column chat_id index is redundant
+    op.drop_index('idx_income_chat_id', 'income_balance')
+
+    # Current open shift: chat_id + is_closed, newest start_time first
+    op.create_index(
+        'idx_shifts_chat_closed_start',
+        'shifts',
+        ['chat_id', 'is_closed', 'start_time']
+    )
+
+    # Closed shifts by end day / most recent first
+    op.create_index(
+        'idx_shifts_chat_end',
+        'shifts',
+        ['chat_id', 'end_time']
+    )
+
+    # Shifts of one day and next shift number
+    op.create_index(
+        'idx_shifts_chat_date_number',
+        'shifts',
+        ['chat_id', 'shift_date', 'number']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_shifts_chat_date_number', 'shifts')
+    op.drop_index('idx_shifts_chat_end', 'shifts')
+    op.drop_index('idx_shifts_chat_closed_start', 'shifts')
+    op.create_index('idx_income_chat_id', 'income_balance', ['chat_id'])
+    op.drop_index('idx_income_shift_chat', 'income_balance')
+    op.drop_index('idx_income_chat_date_amount', 'income_balance')
@@ -0,0 +1,28 @@
+"""drop functional income date index
+
+Revision ID: e6a0c3d9f4b8
+Revises: d5f9b2c8e3a7
+Create Date: 2026-10-18 16:04:51.227409+07:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6a0c3d9f4b8'
+down_revision: Union[str, Sequence[str], None] = 'd5f9b2c8e3a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # income_date is now filtered with half-open ranges, served by
+    # idx_income_chat_date_amount; no filter uses DATE(income_date) any more
+    op.execute('DROP INDEX idx_income_chat_date ON income_balance')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute('CREATE INDEX idx_income_chat_date ON income_balance (chat_id, (DATE(income_date)))')
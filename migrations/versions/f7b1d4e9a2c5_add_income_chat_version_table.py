@@ -0,0 +1,37 @@
+"""add income chat version table
+
+Revision ID: f7b1d4e9a2c5
+Revises: e6a0c3d9f4b8
+Create Date: 2026-10-18 18:21:09.530714+07:00
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b1d4e9a2c5'
+down_revision: Union[str, Sequence[str], None] = 'e6a0c3d9f4b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Bumped with every rollup change of a chat; the report cache of the bots
+    # process compares it to tell whether its snapshot is still current.
+    # Chats without a row are at version 0.
+    op.create_table(
+        'income_chat_version',
+        sa.Column('chat_id', sa.BigInteger(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('(now())')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('(now())')),
+        sa.PrimaryKeyConstraint('chat_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('income_chat_version')
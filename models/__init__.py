@@ -5,7 +5,8 @@ from models.group_package_model import GroupPackage
 from models.shift_model import Shift
 from models.user_model import User
 from models.base_model import BaseModel
-from models.income_balance_model import IncomeBalance
+from models.income_balance_model import IncomeBalance, IncomeRow
+from models.income_rollup_model import IncomeChatVersion, IncomeDailyRollup, IncomeShiftRollup
 from models.shift_configuration_model import ShiftConfiguration
 
 __all__ = [
@@ -17,4 +18,8 @@ __all__ = [
     "BotQuestion",
     "GroupPackage",
     "IncomeBalance",
+    "IncomeRow",
+    "IncomeDailyRollup",
+    "IncomeShiftRollup",
+    "IncomeChatVersion",
 ]
@@ -24,4 +24,5 @@ class Chat(BaseModel):
     enable_shift: Mapped[bool] = mapped_column(Boolean, nullable=True, default=False)
     registered_by: Mapped[str] = mapped_column(String(20), nullable=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=True)
+    last_verified_message_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     user: Mapped["User"] = relationship("User", back_populates="chats")
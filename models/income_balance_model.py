@@ -1,5 +1,6 @@
 import typing
-from datetime import datetime
+from datetime import date, datetime
+from typing import NamedTuple
 
 if typing.TYPE_CHECKING:
     from models.shift_model import Shift
@@ -12,6 +13,8 @@ from sqlalchemy import (
     BigInteger,
     Text,
     ForeignKey,
+    Index,
+    UniqueConstraint,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -21,6 +24,13 @@ from models.base_model import BaseModel
 
 class IncomeBalance(BaseModel):
     __tablename__ = "income_balance"
+    __table_args__ = (
+        UniqueConstraint("origin_chat_id", "message_id", name="uq_income_origin_message"),
+        Index("idx_income_chat_trx", "chat_id", "trx_id"),
+        Index("idx_income_chat_date_amount", "chat_id", "income_date", "currency", "amount"),
+        Index("idx_income_shift_chat", "shift_id", "chat_id", "currency", "amount"),
+        Index("idx_income_date", "income_date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     amount: Mapped[float] = mapped_column(Float, nullable=False)
@@ -31,7 +41,13 @@ class IncomeBalance(BaseModel):
         DateTime, default=lambda: DateUtils.now, nullable=False
     )
     message_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
-    message: Mapped[str] = mapped_column(Text, nullable=False)
+    # Telegram chat the message was received in. Unlike chat_id it is kept
+    # when a group migrates to a supergroup (message ids restart there), so
+    # message_id is only unique per origin_chat_id. NULL for rows of groups
+    # migrated before it was tracked.
+    origin_chat_id: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
+    # Full bank notification, only loaded when accessed
+    message: Mapped[str] = mapped_column(Text, nullable=False, deferred=True)
     shift_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("shifts.id"), nullable=True
     )
@@ -39,3 +55,48 @@ class IncomeBalance(BaseModel):
     trx_id: Mapped[str | None] = mapped_column(String(50), nullable=True)
     sent_by: Mapped[str | None] = mapped_column(String(50), nullable=True)
     note: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+
+class IncomeRow(NamedTuple):
+    """
+    Read-only projection of an income_balance row without message / note.
+
+    It also answers to the IncomeAggregate fields (bucket, total, count,
+    first_at, last_at) as an aggregate of one transaction, so the report
+    helpers accept either.
+    """
+
+    id: int
+    chat_id: int
+    amount: float
+    currency: str
+    income_date: datetime
+    message_id: int
+    shift_id: int | None
+    trx_id: str | None
+    sent_by: str | None
+
+    @property
+    def bucket(self) -> date:
+        return self.income_date.date()
+
+    @property
+    def total(self) -> float:
+        return self.amount
+
+    @property
+    def count(self) -> int:
+        return 1
+
+    @property
+    def first_at(self) -> datetime:
+        return self.income_date
+
+    @property
+    def last_at(self) -> datetime:
+        return self.income_date
+
+
+INCOME_ROW_COLUMNS = tuple(
+    getattr(IncomeBalance, field) for field in IncomeRow._fields
+)
@@ -0,0 +1,46 @@
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Date, DateTime, Double, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from models.base_model import BaseModel
+
+
+class IncomeDailyRollup(BaseModel):
+    """Running totals of income_balance per chat, day and currency"""
+
+    __tablename__ = "income_daily_rollup"
+
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    currency: Mapped[str] = mapped_column(String(16), primary_key=True)
+    total: Mapped[float] = mapped_column(Double, nullable=False, default=0)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    last_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class IncomeShiftRollup(BaseModel):
+    """Running totals of income_balance per shift and currency"""
+
+    __tablename__ = "income_shift_rollup"
+
+    shift_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    currency: Mapped[str] = mapped_column(String(16), primary_key=True)
+    chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False, index=True)
+    total: Mapped[float] = mapped_column(Double, nullable=False, default=0)
+    count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    first_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    last_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+
+class IncomeChatVersion(BaseModel):
+    """
+    Per chat counter bumped in every transaction that changes the chat's
+    rollups, so report caches in any process can tell their copy is stale
+    """
+
+    __tablename__ = "income_chat_version"
+
+    chat_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
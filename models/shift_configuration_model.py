@@ -13,7 +13,7 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm import Mapped, Session, mapped_column
 
-from config.database_config import SessionLocal
+from config.database_config import SessionLocal, db_executor
 from models.base_model import BaseModel
 
 
@@ -74,7 +74,8 @@ class ShiftConfigurationService:
         finally:
             db.close()
 
-    async def get_configuration(self, chat_id: int) -> Optional[ShiftConfiguration]:
+    @db_executor
+    def get_configuration(self, chat_id: int) -> Optional[ShiftConfiguration]:
         """Get configuration if exists"""
         with self._get_db() as db:
             config = (
@@ -85,18 +86,20 @@ class ShiftConfigurationService:
 
             return config
 
-    async def update_auto_close_settings(
+    @db_executor
+    def update_auto_close_settings(
         self, chat_id: int, enabled: bool, auto_close_times: Optional[List[str]] = None
     ) -> Optional[ShiftConfiguration]:
         """Update auto close settings for a chat"""
         with self._get_db() as db:
-            config = await self.get_configuration(chat_id)
+            config = (
+                db.query(ShiftConfiguration)
+                .filter(ShiftConfiguration.chat_id == chat_id)
+                .first()
+            )
             if not config:
                 return None
 
-            # Refresh the object in this session
-            config = db.merge(config)
-
             config.auto_close_enabled = enabled
 
             # Set multiple auto close times
@@ -132,7 +135,8 @@ class ShiftConfigurationService:
             db.refresh(config)
             return config
 
-    async def update_shift_preferences(
+    @db_executor
+    def update_shift_preferences(
         self,
         chat_id: int,
         shift_name_prefix: Optional[str] = None,
@@ -141,13 +145,14 @@ class ShiftConfigurationService:
     ) -> Optional[ShiftConfiguration]:
         """Update shift naming and numbering preferences"""
         with self._get_db() as db:
-            config = await self.get_configuration(chat_id)
+            config = (
+                db.query(ShiftConfiguration)
+                .filter(ShiftConfiguration.chat_id == chat_id)
+                .first()
+            )
             if not config:
                 return None
 
-            # Refresh the object in this session
-            config = db.merge(config)
-
             if shift_name_prefix is not None:
                 config.shift_name_prefix = shift_name_prefix
             if reset_numbering_daily is not None:
@@ -159,7 +164,8 @@ class ShiftConfigurationService:
             db.refresh(config)
             return config
 
-    async def update_last_job_run(self, chat_id: int, job_run_time) -> None:
+    @db_executor
+    def update_last_job_run(self, chat_id: int, job_run_time) -> None:
         """Update the last job run timestamp for a chat configuration"""
         with self._get_db() as db:
             config = (
@@ -5,6 +5,7 @@ from sqlalchemy import (
     DateTime,
     Date,
     BigInteger,
+    Index,
 )
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -14,6 +15,11 @@ from models.income_balance_model import IncomeBalance
 
 class Shift(BaseModel):
     __tablename__ = "shifts"
+    __table_args__ = (
+        Index("idx_shifts_chat_closed_start", "chat_id", "is_closed", "start_time"),
+        Index("idx_shifts_chat_end", "chat_id", "end_time"),
+        Index("idx_shifts_chat_date_number", "chat_id", "shift_date", "number"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
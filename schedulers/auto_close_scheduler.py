@@ -1,100 +1,364 @@
 import asyncio
+import heapq
+import os
+from datetime import datetime, time, timedelta
+from time import perf_counter
 
+from helper import DateUtils
 from helper.logger_utils import force_log
-from services import ShiftService
+from helper.metrics import SCHEDULER_RUN
+from services import IncomeSummaryService, ShiftService
+from services.outbound_dispatcher import Priority
+from services.shift_configuration_service import (
+    ShiftConfigurationService,
+    on_auto_close_settings_changed,
+)
 from services.telegram_business_bot_service import AutosumBusinessBot
 
 
+def parse_auto_close_times(time_strings: list[str]) -> list[time]:
+    """HH:MM[:SS] strings to sorted times (seconds ignored, like the shift checks)"""
+    times = set()
+    for time_str in time_strings:
+        try:
+            time_parts = time_str.split(":")
+            times.add(time(int(time_parts[0]), int(time_parts[1])))
+        except (ValueError, IndexError, AttributeError):
+            continue  # Skip invalid time formats
+    return sorted(times)
+
+
+def next_close_time(times: list[time], after: datetime) -> datetime | None:
+    """First configured close instant strictly after ``after`` (aware, configured timezone)"""
+    if not times:
+        return None
+    after = after.astimezone(DateUtils.get_timezone())
+    for day_offset in (0, 1):
+        day = after.date() + timedelta(days=day_offset)
+        for close_at in times:
+            candidate = DateUtils.localize_datetime(datetime.combine(day, close_at))
+            if candidate > after:
+                return candidate
+    return None
+
+
 class AutoCloseScheduler:
-    """Dedicated scheduler for auto-closing shifts that runs every minute"""
+    """
+    Closes shifts at each chat's configured auto-close times.
+
+    Every chat with auto-close enabled has one entry in a min-heap keyed by
+    its next close instant; the loop sleeps until the earliest one is due,
+    closes the shifts of all chats due at that instant in one transaction
+    and pushes their following close time (or, if closing failed, a retry
+    AUTO_CLOSE_RETRY_SECONDS later). Entries are only recomputed when
+    a chat's auto-close settings change (ShiftConfigurationService notifies
+    us) plus one cheap resync query every AUTO_CLOSE_RESYNC_SECONDS.
+    """
 
-    def __init__(self, bot_service: AutosumBusinessBot):
+    def __init__(
+        self,
+        bot_service: AutosumBusinessBot,
+        resync_interval: float | None = None,
+        retry_delay: float | None = None,
+    ):
         self.shift_service = ShiftService()
         self.bot_service = bot_service
         self.is_running = False
+        self.resync_interval = resync_interval or float(
+            os.getenv("AUTO_CLOSE_RESYNC_SECONDS", "3600")
+        )
+        self.retry_delay = retry_delay or float(os.getenv("AUTO_CLOSE_RETRY_SECONDS", "60"))
+        self._heap: list[tuple[datetime, int]] = []
+        # chat_id -> (next close instant, parsed close times); heap entries
+        # that no longer match this are stale and skipped when popped
+        self._entries: dict[int, tuple[datetime, list[time]]] = {}
+        # chat_id -> close instant whose closing failed and is being retried
+        self._retry_close_at: dict[int, datetime] = {}
+        self._changed_chats: set[int] = set()
+        self._wakeup: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._next_resync: datetime | None = None
 
     async def start_scheduler(self):
-        """Start the auto-close scheduler to run every minute"""
+        """Start the auto-close scheduler"""
         self.is_running = True
-        force_log("Auto-close scheduler started - will run every minute")
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        on_auto_close_settings_changed(self.reschedule_chat)
+        force_log("Auto-close scheduler started")
+
+        # Close whatever became due while the bot was not running
+        await self.check_auto_close_shifts()
 
         while self.is_running:
             try:
-                await self.check_auto_close_shifts()
-                # Wait 1 minute (60 seconds) before next run
-                await asyncio.sleep(60)
+                self._wakeup.clear()
+                now = DateUtils.now()
+                if self._next_resync is None or now >= self._next_resync:
+                    await self._resync(now)
+                if self._changed_chats:
+                    await self._apply_changes(now)
+
+                due_at, chat_ids = self._pop_due(now)
+                if chat_ids:
+                    await self._close_due(due_at, chat_ids)
+                    continue
+
+                await self._sleep_until_next(now)
             except Exception as e:
-                force_log(f"Error in auto-close scheduler loop: {e}")
-                # Wait 1 minute before retrying if there's an error
+                force_log(f"Error in auto-close scheduler loop: {e}", level="ERROR")
                 await asyncio.sleep(60)
 
     async def stop_scheduler(self):
         """Stop the auto-close scheduler"""
         self.is_running = False
+        if self._wakeup:
+            self._wakeup.set()
         force_log("Auto-close scheduler stopped")
 
+    def reschedule_chat(self, chat_id: int):
+        """Recompute a chat's next close time; safe to call from any thread"""
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._mark_changed, chat_id)
+
+    def _mark_changed(self, chat_id: int):
+        self._changed_chats.add(chat_id)
+        self._wakeup.set()
+
+    def _schedule(self, chat_id: int, times: list[time], after: datetime):
+        self._retry_close_at.pop(chat_id, None)
+        due_at = next_close_time(times, after)
+        if due_at is None:
+            self._entries.pop(chat_id, None)
+            return
+        self._entries[chat_id] = (due_at, times)
+        heapq.heappush(self._heap, (due_at, chat_id))
+
+    async def _resync(self, now: datetime):
+        """Reload every enabled chat's close times (one query)"""
+        times_by_chat = await ShiftConfigurationService.get_auto_close_times_by_chat()
+        for chat_id in list(self._entries):
+            if chat_id not in times_by_chat:
+                del self._entries[chat_id]
+        for chat_id, time_strings in times_by_chat.items():
+            times = parse_auto_close_times(time_strings)
+            entry = self._entries.get(chat_id)
+            # Keep the pending instant when nothing changed so a close due
+            # right now is not skipped
+            if entry and entry[1] == times:
+                continue
+            self._schedule(chat_id, times, now)
+
+        # Drop stale heap entries in bulk now and then
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(due_at, chat_id) for chat_id, (due_at, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+        self._next_resync = now + timedelta(seconds=self.resync_interval)
+        force_log(f"Auto-close schedule loaded for {len(self._entries)} chats", level="DEBUG")
+
+    async def _apply_changes(self, now: datetime):
+        chat_ids = list(self._changed_chats)
+        self._changed_chats.clear()
+        times_by_chat = await ShiftConfigurationService.get_auto_close_times_by_chat(chat_ids)
+        for chat_id in chat_ids:
+            if chat_id in times_by_chat:
+                self._schedule(chat_id, parse_auto_close_times(times_by_chat[chat_id]), now)
+            else:
+                self._entries.pop(chat_id, None)
+            force_log(f"Auto-close schedule updated for chat {chat_id}", level="DEBUG")
+
+    def _pop_due(self, now: datetime) -> tuple[datetime | None, list[int]]:
+        """Pop every chat due at the earliest instant, if that instant has passed"""
+        while self._heap:
+            due_at, chat_id = self._heap[0]
+            entry = self._entries.get(chat_id)
+            if entry is None or entry[0] != due_at:
+                heapq.heappop(self._heap)  # stale
+                continue
+            if due_at > now:
+                return None, []
+            break
+        else:
+            return None, []
+
+        due_at = self._heap[0][0]
+        chat_ids = []
+        while self._heap and self._heap[0][0] == due_at:
+            _, chat_id = heapq.heappop(self._heap)
+            entry = self._entries.get(chat_id)
+            if entry is not None and entry[0] == due_at:
+                chat_ids.append(chat_id)
+        return due_at, chat_ids
+
+    async def _sleep_until_next(self, now: datetime):
+        wake_at = self._next_resync
+        if self._heap and self._heap[0][0] < wake_at:
+            wake_at = self._heap[0][0]
+        timeout = max(0.0, (wake_at - now).total_seconds())
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _close_due(self, due_at: datetime, chat_ids: list[int]):
+        """Close the shifts of every chat due at due_at and schedule their next close"""
+        # Retried chats still close at the instant that failed
+        chats_by_close_at: dict[datetime, list[int]] = {}
+        for chat_id in chat_ids:
+            chats_by_close_at.setdefault(self._retry_close_at.get(chat_id, due_at), []).append(chat_id)
+        for close_at, close_chat_ids in chats_by_close_at.items():
+            await self._close_chats(close_at, close_chat_ids)
+
+    async def _close_chats(self, close_at: datetime, chat_ids: list[int]):
+        force_log(f"Auto-close due at {close_at.strftime('%Y-%m-%d %H:%M')} for {len(chat_ids)} chats")
+        started = perf_counter()
+        try:
+            closed_shifts = await self.shift_service.auto_close_shifts_for_chats(chat_ids, close_at)
+        except Exception as e:
+            # Keep the chats on this close instant and try again shortly
+            retry_at = DateUtils.now() + timedelta(seconds=self.retry_delay)
+            force_log(
+                f"Error auto-closing shifts due at {close_at.strftime('%Y-%m-%d %H:%M')}, "
+                f"retrying at {retry_at.strftime('%H:%M:%S')}: {e}",
+                level="ERROR",
+            )
+            for chat_id in chat_ids:
+                entry = self._entries.get(chat_id)
+                if entry is not None:
+                    self._entries[chat_id] = (retry_at, entry[1])
+                    self._retry_close_at[chat_id] = close_at
+                    heapq.heappush(self._heap, (retry_at, chat_id))
+            return
+
+        for chat_id in chat_ids:
+            entry = self._entries.get(chat_id)
+            if entry is not None:
+                self._schedule(chat_id, entry[1], close_at)
+            else:
+                self._retry_close_at.pop(chat_id, None)
+
+        await self._handle_closed_shifts(closed_shifts)
+        SCHEDULER_RUN.observe(perf_counter() - started, scheduler="auto_close")
+
+    async def _handle_closed_shifts(self, closed_shifts: list[dict]):
+        if closed_shifts:
+            force_log(
+                f"Auto-closed {len(closed_shifts)} shifts: {[shift['id'] for shift in closed_shifts]}"
+            )
+
+            # Send shift summaries to chats if bot service is available
+            if self.bot_service:
+                await self._send_shift_summaries(closed_shifts)
+        else:
+            force_log("No shifts needed auto-closing")
+
     async def check_auto_close_shifts(self):
         """Check and auto-close shifts based on configuration"""
         force_log("Starting auto-close shift check...")
+        started = perf_counter()
 
         try:
             # Use the existing method from ShiftService to check and auto-close all shifts
             closed_shifts = await self.shift_service.check_and_auto_close_shifts()
-
-            if closed_shifts:
-                force_log(
-                    f"Auto-closed {len(closed_shifts)} shifts: {[shift['id'] for shift in closed_shifts]}"
-                )
-
-                # Send shift summaries to chats
-                for shift in closed_shifts:
-                    force_log(
-                        f"Auto-closed shift {shift['id']} for chat {shift['chat_id']}"
-                    )
-
-                    # Send shift summary to chat if bot service is available
-                    if self.bot_service:
-                        await self._send_shift_summary(shift)
-            else:
-                force_log("No shifts needed auto-closing")
+            await self._handle_closed_shifts(closed_shifts)
 
         except Exception as e:
             force_log(f"Error in auto-close shift check: {e}")
             import traceback
 
             force_log(f"Traceback: {traceback.format_exc()}")
+        finally:
+            SCHEDULER_RUN.observe(perf_counter() - started, scheduler="auto_close")
 
-    async def _send_shift_summary(self, shift_info: dict):
-        """Send shift summary to the chat"""
+    async def _send_shift_summaries(self, closed_shifts: list[dict]):
+        """
+        Summarise and send every closed shift of one batch.
+
+        The shifts and their income totals are read with one query each, then
+        the messages go out concurrently in the broadcast lane of the bot's
+        outbound dispatcher, which keeps them within Telegram's limits.
+        """
+        started = perf_counter()
+        shift_ids = [shift_info["id"] for shift_info in closed_shifts]
         try:
-            chat_id = shift_info["chat_id"]
-            shift_id = shift_info["id"]
-            shift_number = shift_info["number"]
+            shifts = await self.shift_service.get_shifts_by_ids(shift_ids)
+            aggregates_by_shift: dict[int, list] = {}
+            for aggregate in await IncomeSummaryService.get_aggregates_by_shift(shift_ids):
+                aggregates_by_shift.setdefault(aggregate.bucket, []).append(aggregate)
+        except Exception as e:
+            force_log(f"Error loading shift summaries for {shift_ids}: {e}", level="ERROR")
+            return
+        loaded = perf_counter()
 
-            # Get shift details for timing information
-            shift = await self.shift_service.get_shift_by_id(shift_id)
-            
-            # Get shift summary
-            summary = await self.shift_service.get_shift_income_summary(
-                shift_id, chat_id
+        messages = []
+        for shift_info in closed_shifts:
+            shift = shifts.get(shift_info["id"])
+            if shift is None:
+                force_log(f"Shift {shift_info['id']} not found for summary", level="WARNING")
+                continue
+            summary = ShiftService.build_shift_income_summary(
+                aggregates_by_shift.get(shift.id, [])
             )
+            messages.append((shift_info, self._format_shift_summary(shift_info, shift, summary)))
+
+        results = await asyncio.gather(
+            *(self._send_shift_summary(shift_info, message) for shift_info, message in messages)
+        )
 
-            # Format the summary message
-            if summary["transaction_count"] > 0:
-                # Format currency breakdown
-                currency_details = []
-                for currency, data in summary['currencies'].items():
-                    if currency == 'USD':
-                        currency_details.append(f"• {currency}: ${data['amount']:,.2f} ({data['count']} ប្រតិបត្តិការ)")
-                    elif currency == 'KHR':
-                        khr_amount = int(data['amount'])
-                        currency_details.append(f"• {currency}: ៛{khr_amount:,} ({data['count']} ប្រតិបត្តិការ)")
-                    else:
-                        currency_details.append(f"• {currency}: {data['amount']:,.2f} ({data['count']} ប្រតិបត្តិការ)")
-                
-                currency_text = "\n".join(currency_details)
-
-                message = f"""
+        latencies = sorted(latency for _, latency in results)
+        sent = sum(1 for success, _ in results if success)
+        total = perf_counter() - started
+        p50 = latencies[len(latencies) // 2] if latencies else 0.0
+        p_max = latencies[-1] if latencies else 0.0
+        force_log(
+            f"Shift summary batch: sent {sent}/{len(closed_shifts)} in {total:.2f}s "
+            f"(load {loaded - started:.2f}s, send p50 {p50:.2f}s, max {p_max:.2f}s, "
+            f"dispatcher {self.bot_service.dispatcher.stats()['limiter']})"
+        )
+
+    async def _send_shift_summary(self, shift_info: dict, message: str) -> tuple[bool, float]:
+        """Send one shift summary; returns (success, seconds spent waiting and sending)"""
+        chat_id = shift_info["chat_id"]
+        shift_id = shift_info["id"]
+        started = perf_counter()
+        try:
+            success = await self.bot_service.send_message(
+                chat_id, message, priority=Priority.BROADCAST
+            )
+        except Exception as e:
+            force_log(f"Error sending shift summary for shift {shift_id}: {e}", level="ERROR")
+            success = False
+
+        if success:
+            force_log(f"Sent shift summary for shift {shift_id} to chat {chat_id}")
+        else:
+            force_log(
+                f"Failed to send shift summary for shift {shift_id} to chat {chat_id}"
+            )
+        return success, perf_counter() - started
+
+    @staticmethod
+    def _format_shift_summary(shift_info: dict, shift, summary: dict) -> str:
+        shift_number = shift_info["number"]
+
+        # Format the summary message
+        if summary["transaction_count"] > 0:
+            # Format currency breakdown
+            currency_details = []
+            for currency, data in summary['currencies'].items():
+                if currency == 'USD':
+                    currency_details.append(f"• {currency}: ${data['amount']:,.2f} ({data['count']} ប្រតិបត្តិការ)")
+                elif currency == 'KHR':
+                    khr_amount = int(data['amount'])
+                    currency_details.append(f"• {currency}: ៛{khr_amount:,} ({data['count']} ប្រតិបត្តិការ)")
+                else:
+                    currency_details.append(f"• {currency}: {data['amount']:,.2f} ({data['count']} ប្រតិបត្តិការ)")
+            
+            currency_text = "\n".join(currency_details)
+
+            message = f"""
 🔒 វេន #{shift_number} បានបិទដោយស្វ័យប្រវត្តិ
 
 📊 សរុបចំណូល:
@@ -105,9 +369,9 @@ class AutoCloseScheduler:
 • ពេលបញ្ចប់វេន: {shift.end_time.strftime('%I:%M:%S %p')}
 
 ⚡ បិទដោយ: ការកំណត់ពេលវេលាស្វ័យប្រវត្តិ
-                """.strip()
-            else:
-                message = f"""
+            """.strip()
+        else:
+            message = f"""
 🔒 វេន #{shift_number} បានបិទដោយស្វ័យប្រវត្តិ
 
 📊 សរុបចំណូល:
@@ -118,21 +382,6 @@ class AutoCloseScheduler:
 • ពេលបញ្ចប់វេន: {shift.end_time.strftime('%I:%M:%S %p')}
 
 ⚡ បិទដោយ: ការកំណត់ពេលវេលាស្វ័យប្រវត្តិ
-                """.strip()
-
-            # Send message
-            success = await self.bot_service.send_message(chat_id, message)
-            if success:
-                force_log(f"Sent shift summary for shift {shift_id} to chat {chat_id}")
-            else:
-                force_log(
-                    f"Failed to send shift summary for shift {shift_id} to chat {chat_id}"
-                )
-
-        except Exception as e:
-            force_log(
-                f"Error sending shift summary for shift {shift_info.get('id', 'unknown')}: {e}"
-            )
-            import traceback
+            """.strip()
 
-            force_log(f"Shift summary error traceback: {traceback.format_exc()}")
+        return message
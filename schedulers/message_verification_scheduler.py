@@ -1,6 +1,8 @@
 import asyncio
 import datetime
+import os
 from datetime import timedelta
+from time import perf_counter
 from typing import List
 
 import pytz
@@ -9,15 +11,29 @@ from telethon.errors import FloodWaitError, RPCError
 from telethon.tl.types import Message
 
 from common.enums import ServicePackage
-from helper import extract_amount_and_currency, extract_trx_id
+from helper import DateUtils, parse_bank_message
 from helper.logger_utils import force_log
-from services import ChatService, IncomeService, ShiftService, GroupPackageService
+from helper.metrics import CHATS_VERIFIED, SCHEDULER_RUN
+from helper.rate_limiter import TokenBucketRateLimiter, get_telethon_rate_limiter
+from services import ChatService, IncomeService, ShiftService, GroupPackageService, get_registry_cache_stats
+from services.sender_cache import VERIFIED_BANK_BOTS, sender_cache
 
 
 class MessageVerificationScheduler:
-    def __init__(self, telethon_client: TelegramClient, mobile_number: str | None = None):
+    # Cap on messages read from one chat per run; the rest are picked up next run
+    MAX_MESSAGES_PER_CHAT = 500
+
+    def __init__(
+        self,
+        telethon_client: TelegramClient,
+        mobile_number: str | None = None,
+        rate_limiter: TokenBucketRateLimiter | None = None,
+        concurrency: int | None = None,
+    ):
         self.client = telethon_client
         self.mobile_number = mobile_number
+        self.rate_limiter = rate_limiter or get_telethon_rate_limiter(mobile_number or "primary")
+        self.concurrency = concurrency or int(os.getenv("VERIFY_CONCURRENCY", "5"))
         self.chat_service = ChatService()
         self.income_service = IncomeService()
         self.shift_service = ShiftService()
@@ -47,6 +63,7 @@ class MessageVerificationScheduler:
     async def verify_messages(self):
         """Main verification method that reads messages from last 20 minutes"""
         force_log("Starting message verification job...")
+        started = perf_counter()
 
         try:
             # Get chat IDs based on which telethon client this is
@@ -64,69 +81,135 @@ class MessageVerificationScheduler:
             thirty_minutes_ago = now - datetime.timedelta(minutes=30)
             force_log(f"Checking messages from {thirty_minutes_ago} to {now}")
 
-            verification_count = 0
-            new_messages_found = 0
+            # Verify several chats at once; every Telegram call still goes
+            # through this account's shared rate limiter
+            semaphore = asyncio.Semaphore(self.concurrency)
 
-            for i, chat_id in enumerate(chat_ids):
-                try:
-                    # Get chat info to check if it's active
-                    chat = await self.chat_service.get_chat_by_chat_id(chat_id)
-                    if not chat or not chat.is_active:
-                        force_log(f"Skipping inactive chat {chat_id}")
-                        continue
+            async def verify_with_limit(chat_id: int) -> tuple[int, int, int]:
+                async with semaphore:
+                    return await self._verify_chat(chat_id, thirty_minutes_ago, now)
 
-                    force_log(
-                        f"Verifying messages for chat {chat_id} ({chat.group_name})"
-                    )
-
-                    # Read messages from the chat within the time range
-                    messages = await self._get_bot_messages_in_timeframe(
-                        chat_id, thirty_minutes_ago, now
-                    )
-
-                    verification_count += len(messages)
-
-                    for message in messages:
-                        await self._verify_and_store_message(chat, message)
-                        new_messages_found += 1
-
-                    # Rate limiting: Add delay between chats to prevent Telegram API rate limits
-                    # 200ms delay between chats, longer delay every 20 chats
-                    if i < len(chat_ids) - 1:  # Don't delay after the last chat
-                        if (i + 1) % 20 == 0:
-                            force_log(
-                                f"Processed {i + 1} chats, taking longer break to prevent rate limits..."
-                            )
-                            await asyncio.sleep(2)  # 2 seconds break every 20 chats
-                        else:
-                            await asyncio.sleep(0.2)  # 200ms between each chat
-
-                except Exception as chat_error:
-                    force_log(f"Error processing chat {chat_id}: {chat_error}")
-                    continue
+            results = await asyncio.gather(
+                *(verify_with_limit(chat_id) for chat_id in chat_ids)
+            )
+            verification_count = sum(checked for checked, _, _ in results)
+            new_messages_found = sum(processed for _, processed, _ in results)
+            failed_messages = sum(failed for _, _, failed in results)
 
             force_log(
-                f"Verification job completed. Checked {verification_count} messages, processed {new_messages_found} new messages"
+                f"Verification job completed. Checked {verification_count} messages, processed {new_messages_found} new messages, "
+                f"{failed_messages} failed (retried next run)"
             )
+            force_log(f"Registry cache stats: {get_registry_cache_stats()}")
+            force_log(f"Rate limiter stats: {self.rate_limiter.stats()}")
+            force_log(f"Sender cache stats: {sender_cache.stats()}")
+            CHATS_VERIFIED.observe(len(chat_ids), account=self.mobile_number or "primary")
 
         except Exception as e:
-            force_log(f"Error in verify_messages: {e}")
+            force_log(f"Error in verify_messages: {e}", level="ERROR")
             import traceback
 
-            force_log(f"Traceback: {traceback.format_exc()}")
+            force_log(f"Traceback: {traceback.format_exc()}", level="ERROR")
+        finally:
+            SCHEDULER_RUN.observe(perf_counter() - started, scheduler="message_verification")
 
-    async def _get_bot_messages_in_timeframe(
+    async def _verify_chat(
         self, chat_id: int, start_time: datetime.datetime, end_time: datetime.datetime
-    ) -> List[Message]:
-        """Get bot messages from a specific chat within the given timeframe"""
+    ) -> tuple[int, int, int]:
+        """Verify one chat, returns (messages checked, new messages processed, messages that failed)"""
+        try:
+            # Get chat info to check if it's active
+            chat = await self.chat_service.get_chat_by_chat_id(chat_id)
+            if not chat or not chat.is_active:
+                force_log(f"Skipping inactive chat {chat_id}")
+                return 0, 0, 0
+
+            force_log(
+                f"Verifying messages for chat {chat_id} ({chat.group_name})", level="DEBUG"
+            )
+
+            # Read only messages newer than the chat's high-water mark
+            # (the time range is used until a chat has one)
+            messages, highest_message_id = await self._get_new_bot_messages(
+                chat_id, chat.last_verified_message_id, start_time, end_time
+            )
+
+            # Drop messages from before the chat was registered, then find the
+            # ones not stored yet with one query for the whole chat
+            messages = [message for message in messages if self._is_after_registration(chat, message)]
+            missing_ids = await self.income_service.get_missing_message_ids(
+                chat_id, [message.id for message in messages]
+            )
+            force_log(
+                f"Chat {chat_id}: {len(messages)} bot messages read, {len(missing_ids)} not stored yet", level="DEBUG"
+            )
+
+            processed = 0
+            failed = 0
+            if missing_ids:
+                # Package and shift are the same for every message of this chat
+                shift_id, enable_shift = await self._resolve_income_shift(chat)
+                for message in messages:
+                    if message.id not in missing_ids:
+                        continue
+                    if await self._verify_and_store_message(chat, message, shift_id, enable_shift):
+                        processed += 1
+                    else:
+                        # Retry this message on the next run
+                        highest_message_id = min(highest_message_id, message.id - 1)
+                        failed += 1
+
+            if highest_message_id and highest_message_id > (chat.last_verified_message_id or 0):
+                await self.chat_service.update_last_verified_message_id(
+                    chat_id, highest_message_id
+                )
+
+            return len(messages), processed, failed
+
+        except Exception as chat_error:
+            force_log(f"Error processing chat {chat_id}: {chat_error}", level="ERROR")
+            return 0, 0, 0
+
+    async def _get_new_bot_messages(
+        self,
+        chat_id: int,
+        last_message_id: int | None,
+        start_time: datetime.datetime,
+        end_time: datetime.datetime,
+    ) -> tuple[List[Message], int | None]:
+        """
+        Get allowed bot messages the scheduler has not seen yet.
+
+        With a high-water mark only messages after it are requested; otherwise
+        the messages within the given timeframe. Also returns the highest
+        message id checked, which becomes the chat's new high-water mark:
+        reading stops at a message whose sender could not be resolved, so
+        it is read again next run.
+        """
         messages = []
+        highest_message_id = None
 
         try:
-            # Get messages from the chat starting from 30 minutes ago
-            all_messages = await self.client.get_messages(
-                chat_id, offset_date=start_time, reverse=True, limit=100, wait_time=0.5
-            )
-            force_log(f"Found {len(all_messages)} messages from {chat_id}")
+            if last_message_id:
+                all_messages = await self.rate_limiter.call(
+                    self.client.get_messages,
+                    chat_id,
+                    min_id=last_message_id,
+                    reverse=True,
+                    limit=self.MAX_MESSAGES_PER_CHAT,
+                    wait_time=0.5,
+                )
+            else:
+                # Get messages from the chat starting from 30 minutes ago
+                all_messages = await self.rate_limiter.call(
+                    self.client.get_messages,
+                    chat_id,
+                    offset_date=start_time,
+                    reverse=True,
+                    limit=100,
+                    wait_time=0.5,
+                )
+            force_log(f"Found {len(all_messages)} messages from {chat_id}", level="DEBUG")
 
             for message in all_messages:
                 # Check if message is within our time range
@@ -134,49 +217,41 @@ class MessageVerificationScheduler:
                 if message_time.tzinfo is None:
                     message_time = pytz.UTC.localize(message_time)
 
-                if message_time < start_time:
+                if not last_message_id and message_time < start_time:
                     # We've gone too far back in time
                     break
+                if not last_message_id and message_time > end_time:
+                    # Arrived during this run, left for the next one
+                    break
+
+                if not message.text:
+                    highest_message_id = max(highest_message_id or 0, message.id)
+                    continue
 
-                if start_time <= message_time <= end_time:
-                    # Check if message is from a bot
-                    sender = await message.get_sender()
-                    is_bot = getattr(sender, "bot", False)
-
-                    if is_bot and message.text:
-
-                        username = getattr(sender, "username", "")
-
-                        # Only process messages from allowed payment bots
-                        allowed_bots = {
-                            "ACLEDABankBot",
-                            "PayWayByABA_bot",
-                            "PLBITBot",
-                            "CanadiaMerchant_bot",
-                            "HLBCAM_Bot",
-                            "vattanac_bank_merchant_prod_bot",
-                            "CPBankBot",
-                            "SathapanaBank_bot",
-                            "chipmongbankpaymentbot",
-                            "prasac_merchant_payment_bot",
-                            "s7pos_bot"
-                        }
-                        
-                        if username not in allowed_bots:
-                            force_log(f"Message from bot '{username}' not in allowed list, ignoring in scheduler")
-                            continue
-                            
-                        messages.append(message)
+                # Only process messages from allowed payment bots
+                allowed = sender_cache.is_allowed(message.sender_id, VERIFIED_BANK_BOTS)
+                if allowed is None:
+                    try:
+                        allowed = await sender_cache.resolve_username(message) in VERIFIED_BANK_BOTS
+                    except Exception as e:
                         force_log(
-                            f"Found bot message in timeframe: {message.id} from {message_time}"
+                            f"Could not resolve sender of message {message.id} in chat {chat_id}, "
+                            f"checking from it next run: {e}",
+                            level="WARNING",
                         )
+                        break
+                highest_message_id = max(highest_message_id or 0, message.id)
+                if not allowed:
+                    force_log(f"Message from sender {message.sender_id} not in allowed list, ignoring in scheduler", level="DEBUG")
+                    continue
+
+                messages.append(message)
+                force_log(
+                    f"Found bot message in timeframe: {message.id} from {message_time}", level="DEBUG"
+                )
         except FloodWaitError as e:
-            force_log(f"FloodWaitError for chat {chat_id}: waiting {e.seconds} seconds")
-            await asyncio.sleep(e.seconds + 1)
-            # Recursively retry after waiting
-            return await self._get_bot_messages_in_timeframe(
-                chat_id, start_time, end_time
-            )
+            # The rate limiter already waited and retried; try again next run
+            force_log(f"FloodWaitError for chat {chat_id} persisted ({e.seconds}s), skipping this run", level="WARNING")
         except RPCError as e:
             force_log(f"RPCError for chat {chat_id}: {e}")
             force_log(
@@ -203,99 +278,85 @@ class MessageVerificationScheduler:
                 except Exception as db_error:
                     force_log(f"Failed to mark chat {chat_id} as inactive: {db_error}")
 
-        return messages
+        return messages, highest_message_id
+
+    def _is_after_registration(self, chat, message: Message) -> bool:
+        """Check message timestamp vs chat registration"""
+        message_time = message.date
+        if message_time.tzinfo is None:
+            message_time = pytz.UTC.localize(message_time)
+
+        # Convert chat created_at to UTC for comparison
+        chat_created = chat.created_at
+        if chat_created.tzinfo is None:
+            chat_created = DateUtils.localize_datetime(chat_created)
+        chat_created_utc = chat_created.astimezone(pytz.UTC)
 
-    async def _verify_and_store_message(self, chat, message: Message):
-        """Verify if message exists in database, if not then store it"""
+        # Add a 5-minute buffer to handle any timestamp precision issues
+        chat_created_with_buffer = chat_created_utc - timedelta(minutes=5)
+
+        if message_time < chat_created_with_buffer:
+            force_log(
+                f"Message {message.id} timestamp {message_time} is before chat registration buffer {chat_created_with_buffer}, skipping", level="DEBUG"
+            )
+            return False
+        return True
+
+    async def _resolve_income_shift(self, chat) -> tuple[int, bool]:
+        """Get (shift_id, enable_shift) to store this chat's incomes with"""
+        chat_id = chat.chat_id
+        enable_shift = bool(chat.enable_shift)
+
+        # Check if chat has BUSINESS package to get current shift ID
+        package = await self.group_package_service.get_package_by_chat_id(chat_id)
+        if package and package.package == ServicePackage.BUSINESS:
+            enable_shift = True
+
+        if not enable_shift:
+            return 0, False
+
+        current_shift = await self.shift_service.get_current_shift(chat_id)
+        if current_shift:
+            force_log(f"Chat {chat_id} using current shift ID: {current_shift.id}", level="DEBUG")
+            return current_shift.id, True
+
+        # No current shift exists, create one
+        new_shift = await self.shift_service.create_shift(chat_id)
+        force_log(f"Chat {chat_id} had no open shift, created new shift ID: {new_shift.id}")
+        return new_shift.id, True
+
+    async def _verify_and_store_message(
+        self, chat, message: Message, shift_id: int, enable_shift: bool
+    ) -> bool:
+        """
+        Parse a message that is not stored yet and store it.
+
+        Returns False only when the message could not be processed and should
+        be retried on the next run.
+        """
         try:
             chat_id = message.chat_id or chat.chat_id
             message_id = message.id
             message_text = message.text
 
-            force_log(f"Verifying message {message_id} from chat {chat_id}")
-
-            # Check message timestamp vs chat registration
-            message_time = message.date
-            if message_time.tzinfo is None:
-                message_time = pytz.UTC.localize(message_time)
-
-            # Convert chat created_at to UTC for comparison
-            from helper import DateUtils
-
-            chat_created = chat.created_at
-            if chat_created.tzinfo is None:
-                chat_created = DateUtils.localize_datetime(chat_created)
-            chat_created_utc = chat_created.astimezone(pytz.UTC)
-
-            # Add a 5-minute buffer to handle any timestamp precision issues
-            chat_created_with_buffer = chat_created_utc - timedelta(minutes=5)
-
-            if message_time < chat_created_with_buffer:
-                force_log(
-                    f"Message {message_id} timestamp {message_time} is before chat registration buffer {chat_created_with_buffer}, skipping"
-                )
-                return
+            force_log(f"Verifying message {message_id} from chat {chat_id}", level="DEBUG")
 
-            # Check if this message already exists in database (using both chat_id and message_id)
-            exists = await self.income_service.get_income_by_chat_and_message_id(
-                chat_id, message_id
-            )
-            if exists:
-                force_log(
-                    f"Message {message_id} from chat {chat_id} already exists in database, skipping"
-                )
-                return
+            # Get sender username
+            username = await sender_cache.resolve_username(message)
 
-            # Extract currency and amount from message
-            currency, amount = extract_amount_and_currency(message_text)
+            # Extract currency, amount and transaction ID with the sender bot's profile
+            currency, amount, trx_id = parse_bank_message(message_text, username)
             if not (currency and amount):
                 force_log(
-                    f"No valid currency/amount found in message {message_id}, skipping"
+                    f"No valid currency/amount found in message {message_id}, skipping", level="DEBUG"
                 )
-                return
-
-            # Extract transaction ID
-            trx_id = extract_trx_id(message_text)
+                return True
 
+            # Store the message as income
             force_log(
-                f"Processing new message {message_id}: currency={currency}, amount={amount}, trx_id={trx_id}"
+                f"Storing income for message {message_id}: currency={currency}, amount={amount}, trx_id={trx_id}, shift_id={shift_id}", level="DEBUG"
             )
-
-            # Check for duplicates using comprehensive check
-            # Not check for now, suppose chat_id + message_id is unique
-            # is_duplicate = await self.income_service.check_duplicate_transaction(
-            #     chat_id, trx_id, message_id
-            # )
-            # if is_duplicate:
-            #     force_log(f"Duplicate transaction found for message {message_id}, skipping")
-            #     return
-
-            # Get sender username
-            sender = await message.get_sender()
-            username = getattr(sender, "username", "") or ""
-            
-            # Check if chat has BUSINESS package to get current shift ID
-            shift_id_for_income = 0  # Default: no shift or auto-create
-            enable_shift_for_income = chat.enable_shift
-            
-            package = await self.group_package_service.get_package_by_chat_id(chat_id)
-            if package and package.package == ServicePackage.BUSINESS:
-                # For business packages, get the current shift ID
-                current_shift = await self.shift_service.get_current_shift(chat_id)
-                if current_shift:
-                    shift_id_for_income = current_shift.id
-                    enable_shift_for_income = True
-                    force_log(f"Chat {chat_id} has BUSINESS package, using current shift ID: {shift_id_for_income}")
-                else:
-                    # No current shift exists, create one
-                    new_shift = await self.shift_service.create_shift(chat_id)
-                    shift_id_for_income = new_shift.id
-                    enable_shift_for_income = True
-                    force_log(f"Chat {chat_id} has BUSINESS package, created new shift ID: {shift_id_for_income}")
-            
-            # Store the message as income
-            force_log(f"Storing income for message {message_id} with shift_id={shift_id_for_income}, enable_shift={enable_shift_for_income}")
-            result = await self.income_service.insert_income(
+            result = await self.income_service.insert_ignore(
                 chat_id,
                 amount,
                 currency,
@@ -303,17 +364,25 @@ class MessageVerificationScheduler:
                 message_id,
                 message_text,
                 trx_id,
-                shift_id_for_income,  # actual shift ID
-                enable_shift_for_income,  # enable_shift
+                shift_id,  # actual shift ID
+                enable_shift,  # enable_shift
                 username,  # sent_by
             )
 
+            if result is None:
+                force_log(
+                    f"Message {message_id} from chat {chat_id} was stored concurrently, skipping"
+                )
+                return True
+
             force_log(
                 f"Successfully stored income record with id={result.id} for message {message_id}"
             )
+            return True
 
         except Exception as e:
-            force_log(f"Error verifying/storing message {message.id}: {e}")
+            force_log(f"Error verifying/storing message {message.id}: {e}", level="ERROR")
             import traceback
 
-            force_log(f"Traceback: {traceback.format_exc()}")
+            force_log(f"Traceback: {traceback.format_exc()}", level="ERROR")
+            return False
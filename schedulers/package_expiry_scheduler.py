@@ -1,15 +1,19 @@
 import asyncio
 from datetime import timedelta
+from time import perf_counter
 
 import pytz
 import schedule
 from sqlalchemy import and_
+from sqlalchemy.orm import contains_eager
 
 from common.enums.service_package_enum import ServicePackage
-from config import get_db_session
+from config import get_db_session, db_executor
 from helper import force_log, DateUtils
+from helper.metrics import SCHEDULER_RUN
 from models.chat_model import Chat
 from models.group_package_model import GroupPackage
+from services.outbound_dispatcher import Priority
 from services.telegram_standard_bot_service import TelegramBotService
 
 
@@ -25,97 +29,106 @@ class PackageExpiryScheduler:
         Find groups with packages expiring in 3 days and send notifications to the groups.
         """
         force_log("Package Expiry Scheduler - Checking for packages expiring in 3 days", "package_expiry_scheduler")
+        started = perf_counter()
         try:
-            with get_db_session() as session:
-                # Calculate the date 3 days from now in Cambodia timezone
-                three_days_from_now = DateUtils.now() + timedelta(days=3)
-                # Get start and end of that day for comparison
-                expiry_date_start = three_days_from_now.replace(hour=0, minute=0, second=0, microsecond=0)
-                expiry_date_end = three_days_from_now.replace(hour=23, minute=59, second=59, microsecond=999999)
+            expiring_packages = await self._get_expiring_packages()
 
-                # Find packages that expire in exactly 3 days (paid packages only)
-                expiring_packages = session.query(GroupPackage).join(Chat).filter(
-                    and_(
-                        GroupPackage.is_paid == True,
-                        GroupPackage.package_end_date >= expiry_date_start,
-                        GroupPackage.package_end_date <= expiry_date_end,
-                        GroupPackage.package.in_([
-                            ServicePackage.BASIC,
-                            ServicePackage.STANDARD,
-                            ServicePackage.BUSINESS
-                        ])
-                    )
-                ).all()
+            # Temporarily disable user group notifications
+            # notification_count = 0
+            # for group_package in expiring_packages:
+            #     try:
+            #         chat_group = group_package.chat_group
+            #         if not chat_group:
+            #             force_log(f"No chat group found for package ID {group_package.id}")
+            #             continue
+            #
+            #         # Format the expiry date for display
+            #         expiry_date_str = group_package.package_end_date.strftime("%Y-%m-%d %H:%M")
+            #
+            #         # Create notification message
+            #         message = (
+            #             f"⚠️ **Package Expiry Notice** ⚠️\n\n"
+            #             f"Dear members,\n\n"
+            #             f"Your {group_package.package.value} package is about to expire!\n"
+            #             f"📅 **Expiry Date:** {expiry_date_str} (Cambodia Time)\n"
+            #             f"⏰ **Time Remaining:** 3 days\n\n"
+            #             f"Please renew your package to continue enjoying our services without interruption.\n\n"
+            #             f"Contact support for renewal assistance."
+            #         )
+            #
+            #         # Choose the appropriate bot service based on package type
+            #         if group_package.package == ServicePackage.BUSINESS:
+            #             # Use business bot for BUSINESS packages
+            #             if self.business_bot_service:
+            #                 success = await self.business_bot_service.send_message(chat_group.chat_id, message)
+            #                 if success:
+            #                     notification_count += 1
+            #                     force_log(
+            #                         f"Sent expiry notification via business bot to group {chat_group.chat_id} "
+            #                         f"(Package: {group_package.package.value}, "
+            #                         f"Expires: {expiry_date_str})",
+            #                         "package_expiry_scheduler"
+            #                     )
+            #                 else:
+            #                     force_log(
+            #                         f"Failed to send notification via business bot to group {chat_group.chat_id}",
+            #                         "package_expiry_scheduler"
+            #                     )
+            #             else:
+            #                 force_log("Business bot service not available for BUSINESS package notification", "package_expiry_scheduler")
+            #         else:
+            #             # Use standard bot for BASIC and STANDARD packages
+            #             await self.standard_bot_service.send_message_to_chat(chat_group.chat_id, message)
+            #             notification_count += 1
+            #             force_log(
+            #                 f"Sent expiry notification via standard bot to group {chat_group.chat_id} "
+            #                 f"(Package: {group_package.package.value}, "
+            #                 f"Expires: {expiry_date_str})",
+            #                 "package_expiry_scheduler"
+            #             )
+            #
+            #     except Exception as e:
+            #         force_log(
+            #             f"Failed to send expiry notification to group {group_package.chat_group_id}: {str(e)}",
+            #             "package_expiry_scheduler"
+            #         )
 
-                # Temporarily disable user group notifications
-                # notification_count = 0
-                # for group_package in expiring_packages:
-                #     try:
-                #         chat_group = group_package.chat_group
-                #         if not chat_group:
-                #             force_log(f"No chat group found for package ID {group_package.id}")
-                #             continue
-                #
-                #         # Format the expiry date for display
-                #         expiry_date_str = group_package.package_end_date.strftime("%Y-%m-%d %H:%M")
-                #
-                #         # Create notification message
-                #         message = (
-                #             f"⚠️ **Package Expiry Notice** ⚠️\n\n"
-                #             f"Dear members,\n\n"
-                #             f"Your {group_package.package.value} package is about to expire!\n"
-                #             f"📅 **Expiry Date:** {expiry_date_str} (Cambodia Time)\n"
-                #             f"⏰ **Time Remaining:** 3 days\n\n"
-                #             f"Please renew your package to continue enjoying our services without interruption.\n\n"
-                #             f"Contact support for renewal assistance."
-                #         )
-                #
-                #         # Choose the appropriate bot service based on package type
-                #         if group_package.package == ServicePackage.BUSINESS:
-                #             # Use business bot for BUSINESS packages
-                #             if self.business_bot_service:
-                #                 success = await self.business_bot_service.send_message(chat_group.chat_id, message)
-                #                 if success:
-                #                     notification_count += 1
-                #                     force_log(
-                #                         f"Sent expiry notification via business bot to group {chat_group.chat_id} "
-                #                         f"(Package: {group_package.package.value}, "
-                #                         f"Expires: {expiry_date_str})",
-                #                         "package_expiry_scheduler"
-                #                     )
-                #                 else:
-                #                     force_log(
-                #                         f"Failed to send notification via business bot to group {chat_group.chat_id}",
-                #                         "package_expiry_scheduler"
-                #                     )
-                #             else:
-                #                 force_log("Business bot service not available for BUSINESS package notification", "package_expiry_scheduler")
-                #         else:
-                #             # Use standard bot for BASIC and STANDARD packages
-                #             await self.standard_bot_service.send_message_to_chat(chat_group.chat_id, message)
-                #             notification_count += 1
-                #             force_log(
-                #                 f"Sent expiry notification via standard bot to group {chat_group.chat_id} "
-                #                 f"(Package: {group_package.package.value}, "
-                #                 f"Expires: {expiry_date_str})",
-                #                 "package_expiry_scheduler"
-                #             )
-                #
-                #     except Exception as e:
-                #         force_log(
-                #             f"Failed to send expiry notification to group {group_package.chat_group_id}: {str(e)}",
-                #             "package_expiry_scheduler"
-                #         )
-
-                if expiring_packages:
-                    force_log(f"Found {len(expiring_packages)} packages expiring in 3 days")
-                    # Send admin alert only
-                    await self.send_admin_alert(expiring_packages)
-                else:
-                    force_log("No packages found expiring in 3 days")
+            if expiring_packages:
+                force_log(f"Found {len(expiring_packages)} packages expiring in 3 days")
+                # Send admin alert only
+                await self.send_admin_alert(expiring_packages)
+            else:
+                force_log("No packages found expiring in 3 days")
 
         except Exception as e:
             force_log(f"Error in notify_expiring_packages: {str(e)}", "package_expiry_scheduler")
+        finally:
+            SCHEDULER_RUN.observe(perf_counter() - started, scheduler="package_expiry")
+
+    @staticmethod
+    @db_executor
+    def _get_expiring_packages() -> list[GroupPackage]:
+        """Paid packages ending 3 days from now, with their chat group loaded"""
+        with get_db_session() as session:
+            # Calculate the date 3 days from now in Cambodia timezone
+            three_days_from_now = DateUtils.now() + timedelta(days=3)
+            # Get start and end of that day for comparison
+            expiry_date_start = three_days_from_now.replace(hour=0, minute=0, second=0, microsecond=0)
+            expiry_date_end = three_days_from_now.replace(hour=23, minute=59, second=59, microsecond=999999)
+
+            # Find packages that expire in exactly 3 days (paid packages only)
+            return session.query(GroupPackage).join(Chat).filter(
+                and_(
+                    GroupPackage.is_paid == True,
+                    GroupPackage.package_end_date >= expiry_date_start,
+                    GroupPackage.package_end_date <= expiry_date_end,
+                    GroupPackage.package.in_([
+                        ServicePackage.BASIC,
+                        ServicePackage.STANDARD,
+                        ServicePackage.BUSINESS
+                    ])
+                )
+            ).options(contains_eager(GroupPackage.chat_group)).all()
 
     async def send_admin_alert(self, expiring_packages):
         """
@@ -159,7 +172,9 @@ class PackageExpiryScheduler:
             admin_message += "📊 Generated by Package Expiry Scheduler"
             
             # Send admin alert
-            success = await self.admin_bot_service.send_message(self.admin_group_id, admin_message)
+            success = await self.admin_bot_service.send_message(
+                self.admin_group_id, admin_message, priority=Priority.BROADCAST
+            )
             
             if success:
                 force_log(f"Successfully sent admin alert for {len(expiring_packages)} expiring packages", "package_expiry_scheduler")
@@ -1,15 +1,18 @@
 import asyncio
 from datetime import timedelta
+from time import perf_counter
 
 import pytz
 import schedule
 from sqlalchemy import and_
 
 from common.enums.service_package_enum import ServicePackage
-from config import get_db_session
+from config import get_db_session, db_executor
 from helper import force_log, DateUtils
+from helper.metrics import SCHEDULER_RUN
 from models.group_package_model import GroupPackage
 from services.group_package_service import GroupPackageService
+from services.registry_cache import group_package_cache
 
 
 class TrialExpiryScheduler:
@@ -17,12 +20,14 @@ class TrialExpiryScheduler:
         self.group_package_service = GroupPackageService()
 
     @staticmethod
+    @db_executor
     def convert_expired_trials_to_free():
         """
         Find groups with trial packages that have expired (7+ days) without payment
         and convert them to free packages.
         """
         force_log("Trial Expiry Scheduler - Converting expired trials to free packages", "trial_expiry_scheduler")
+        started = perf_counter()
         try:
             with get_db_session() as session:
                 # Calculate the cutoff date (7 days ago) in Cambodia timezone
@@ -61,12 +66,15 @@ class TrialExpiryScheduler:
                         )
 
                 if converted_count > 0:
+                    group_package_cache.clear()
                     force_log(f"Successfully converted {converted_count} expired trial groups to FREE packages")
                 else:
                     force_log("No expired trial groups found to convert")
 
         except Exception as e:
             force_log(f"Error in convert_expired_trials_to_free: {str(e)}")
+        finally:
+            SCHEDULER_RUN.observe(perf_counter() - started, scheduler="trial_expiry")
 
     async def start_scheduler(self):
         """
@@ -74,10 +82,12 @@ class TrialExpiryScheduler:
         """
         # Schedule the job to run daily at 1:00 AM Cambodia time
         cambodia_tz = pytz.timezone('Asia/Phnom_Penh')
-        schedule.every().day.at("01:00", cambodia_tz).do(self.convert_expired_trials_to_free)
+        schedule.every().day.at("01:00", cambodia_tz).do(
+            lambda: asyncio.create_task(self.convert_expired_trials_to_free())
+        )
 
         # For testing purposes, you can also run it every minute:
-        # schedule.every().minute.do(self.convert_expired_trials_to_free)
+        # schedule.every().minute.do(lambda: asyncio.create_task(self.convert_expired_trials_to_free()))
 
         force_log("Trial expiry scheduler started. Job will run daily at 9:00 AM Cambodia time (Asia/Phnom_Penh)")
 
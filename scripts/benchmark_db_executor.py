@@ -0,0 +1,96 @@
+"""
+Event-loop lag benchmark for blocking database calls
+
+Runs N concurrent "queries" while a ticker task measures how late the event
+loop wakes it up, first with the query called inline (the old behaviour of
+the async service methods) and then through run_in_db_executor.
+
+Usage:
+    python scripts/benchmark_db_executor.py                 # SELECT SLEEP() against DATABASE_URL
+    python scripts/benchmark_db_executor.py --simulate      # time.sleep() instead of a database
+    python scripts/benchmark_db_executor.py --queries 50 --query-time 0.02
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from config import get_db_session, run_in_db_executor
+
+TICK_INTERVAL = 0.001
+
+
+def make_query(query_time: float, simulate: bool):
+    def query():
+        if simulate:
+            time.sleep(query_time)
+            return
+        with get_db_session() as db:
+            db.execute(text("SELECT SLEEP(:s)"), {"s": query_time})
+
+    return query
+
+
+async def ticker(stop: asyncio.Event, lags: list[float]):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + TICK_INTERVAL
+        await asyncio.sleep(TICK_INTERVAL)
+        lags.append(max(0.0, loop.time() - expected))
+
+
+async def run(mode: str, query, queries: int) -> tuple[float, list[float]]:
+    stop = asyncio.Event()
+    lags: list[float] = []
+    ticker_task = asyncio.create_task(ticker(stop, lags))
+    await asyncio.sleep(0)
+
+    async def inline():
+        query()
+
+    async def offloaded():
+        await run_in_db_executor(query)
+
+    worker = inline if mode == "inline" else offloaded
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(queries)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker_task
+    return elapsed, lags
+
+
+def report(mode: str, elapsed: float, lags: list[float]):
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    p99 = lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))]
+    print(
+        f"{mode:>9}: wall {elapsed:7.3f}s | ticks {len(lags):5d} | "
+        f"loop lag mean {statistics.mean(lags_ms):8.2f}ms "
+        f"p99 {p99:8.2f}ms max {lags_ms[-1]:8.2f}ms"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--query-time", type=float, default=0.05, help="seconds per query")
+    parser.add_argument("--simulate", action="store_true", help="use time.sleep instead of the database")
+    args = parser.parse_args()
+
+    query = make_query(args.query_time, args.simulate)
+    print(f"{args.queries} concurrent queries of {args.query_time * 1000:.0f}ms each")
+    for mode in ("inline", "executor"):
+        elapsed, lags = await run(mode, query, args.queries)
+        report(mode, elapsed, lags)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
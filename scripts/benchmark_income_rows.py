@@ -0,0 +1,87 @@
+"""
+Memory / time benchmark: full IncomeBalance objects vs projected IncomeRow tuples
+
+Fills an in-memory SQLite database with N income rows carrying a realistic
+bank notification body, then loads them the old way (whole ORM objects, with
+message undeferred) and the new way (INCOME_ROW_COLUMNS projection), and
+reports peak memory and wall time for each.
+
+Usage:
+    python scripts/benchmark_income_rows.py
+    python scripts/benchmark_income_rows.py --rows 50000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session, undefer
+
+from models import IncomeBalance, IncomeRow
+from models.income_balance_model import INCOME_ROW_COLUMNS
+
+MESSAGE = (
+    "Received 12.50 USD from JOHN DOE, ABA Bank, 012 345 678 on 18-Oct-2025 10:15AM. "
+    "Trx. ID: 123456789012, APV: 654321. Merchant: Example Coffee Shop (Branch 2). "
+) * 3
+
+
+def measure(label: str, load):
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = load()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} rows={len(rows):<7} time={elapsed * 1000:8.1f}ms  peak={peak / 1024 / 1024:7.2f}MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://")
+    IncomeBalance.__table__.create(engine)
+    start = datetime(2025, 10, 1)
+    with Session(engine) as db:
+        db.execute(
+            insert(IncomeBalance),
+            [
+                {
+                    "chat_id": 1,
+                    "amount": 12.5,
+                    "currency": "USD",
+                    "original_amount": 12.5,
+                    "income_date": start + timedelta(seconds=i * 60),
+                    "message_id": i,
+                    "origin_chat_id": 1,
+                    "message": MESSAGE,
+                    "created_at": start,
+                    "updated_at": start,
+                }
+                for i in range(args.rows)
+            ],
+        )
+        db.commit()
+
+    def load_orm():
+        with Session(engine) as db:
+            return db.query(IncomeBalance).options(undefer(IncomeBalance.message)).all()
+
+    def load_rows():
+        with Session(engine) as db:
+            return [IncomeRow(*row) for row in db.query(*INCOME_ROW_COLUMNS).all()]
+
+    measure("IncomeBalance (full)", load_orm)
+    measure("IncomeRow (projected)", load_rows)
+
+
+if __name__ == "__main__":
+    main()
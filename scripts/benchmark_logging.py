@@ -0,0 +1,73 @@
+"""
+Call-site overhead of force_log
+
+Compares the previous implementation (open/write/flush on the calling
+thread for every line) with the buffered background writer.
+
+Usage:
+    python scripts/benchmark_logging.py
+    python scripts/benchmark_logging.py --calls 50000
+"""
+
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper.logger_utils import BufferedLogWriter
+
+
+def inline_force_log(message, component="System"):
+    """The previous force_log: one open/write/flush per call"""
+    logs_dir = "logs"
+    if not os.path.exists(logs_dir):
+        os.makedirs(logs_dir)
+    now = datetime.datetime.now()
+    filename = f"logs/telegram_bot_{now.strftime('%Y%m%d_%H')}.log"
+    with open(filename, "a", encoding="utf-8") as f:
+        timestamp = now.strftime("%Y-%m-%d %H:%M:%S")
+        f.write(f"{timestamp} - {component} - {message}\n")
+        f.flush()
+
+
+def measure(name: str, log, calls: int, drain=None):
+    start = time.perf_counter()
+    for i in range(calls):
+        log(f"Processing message {i} from chat -100123456789", "Benchmark")
+    call_time = time.perf_counter() - start
+    drain_time = 0.0
+    if drain:
+        drain_start = time.perf_counter()
+        drain()
+        drain_time = time.perf_counter() - drain_start
+    print(
+        f"{name:>16}: {call_time / calls * 1e6:7.2f} us/call"
+        + (f" (background drain {drain_time:.3f}s)" if drain else "")
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        print(f"{args.calls} log calls")
+        measure("inline", inline_force_log, args.calls)
+
+        text_writer = BufferedLogWriter()
+        measure("buffered", lambda m, c: text_writer.log(m, c, "INFO"), args.calls, lambda: text_writer.flush(60))
+
+        json_writer = BufferedLogWriter(json_lines=True)
+        measure("buffered json", lambda m, c: json_writer.log(m, c, "INFO"), args.calls, lambda: json_writer.flush(60))
+
+        measure("debug filtered", lambda m, c: text_writer.log(m, c, "DEBUG"), args.calls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Wifi QR render benchmark
+
+First times the stages of one render in this process (QR matrix and
+image, text overlay, PNG encoding) and the size of the images involved.
+Then measures what the Utils bot gets out of QRRenderService: renders per
+second done inline on the event loop (the old path) against the process
+pool, answers per second from the cache, and how long the event loop is
+blocked meanwhile - a heartbeat task measures its own lateness, which is
+the delay every other bot on the loop would see.
+
+Usage:
+    python scripts/benchmark_qr_render.py
+    python scripts/benchmark_qr_render.py --renders 64 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper.qr_generator import QRGenerator
+from services.qr_render_service import QRRenderService, render_wifi_pdf, render_wifi_png
+
+
+def measure_stages(networks: list[tuple[str, str]]):
+    """Per-stage cost of QRGenerator.generate_wifi_qr_with_text plus PNG encoding"""
+    qr_generator = QRGenerator()
+    qr_generator.generate_wifi_qr_with_text("warmup", "warmup")  # load fonts / layout template
+
+    totals = {"qr code": 0.0, "text overlay": 0.0, "png encode": 0.0}
+    for name, password in networks:
+        started = time.perf_counter()
+        qr_img = qr_generator._create_qr_code(f"WIFI:T:WPA;S:{name};P:{password};;")
+        totals["qr code"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        final_img = qr_generator._add_text_overlay(qr_img, name, password)
+        totals["text overlay"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        png_bytes = qr_generator.image_to_bytes(final_img).getvalue()
+        totals["png encode"] += time.perf_counter() - started
+
+    for stage, total in totals.items():
+        print(f"{stage:<28} {total * 1000 / len(networks):>7.2f}ms")
+    print(
+        f"{'render total':<28} {sum(totals.values()) * 1000 / len(networks):>7.2f}ms   "
+        f"QR {qr_img.mode} {qr_img.size[0]}x{qr_img.size[1]}, card {final_img.mode} "
+        f"{final_img.size[0]}x{final_img.size[1]} ({len(final_img.getbands()) * final_img.size[0] * final_img.size[1] // 1024} KB raw, "
+        f"{len(png_bytes) // 1024} KB PNG)"
+    )
+
+
+async def heartbeat(stop: asyncio.Event, lags: list[float], interval: float = 0.01):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - started - interval)
+
+
+async def measure(label: str, work, count: int):
+    stop = asyncio.Event()
+    lags: list[float] = []
+    beat = asyncio.create_task(heartbeat(stop, lags))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await work()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+    max_lag = max(lags, default=0.0) * 1000
+    print(f"{label:<28} {count / elapsed:>9.1f}/s   {elapsed * 1000 / count:>7.2f}ms each   loop lag max {max_lag:.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=32, help="distinct networks to render")
+    parser.add_argument("--workers", type=int, default=None, help="pool size (default QR_RENDER_WORKERS)")
+    args = parser.parse_args()
+
+    networks = [(f"Office-{n}", f"password-{n}") for n in range(args.renders)]
+    service = QRRenderService(max_workers=args.workers)
+    print(f"{args.renders} networks, {service.max_workers} workers, {os.cpu_count()} CPUs")
+    measure_stages(networks)
+
+    async def inline_png():
+        for name, password in networks:
+            render_wifi_png(name, password)
+
+    async def inline_pdf():
+        for name, password in networks:
+            render_wifi_pdf(name, render_wifi_png(name, password))
+
+    async def pool_png():
+        await asyncio.gather(*(service.render_wifi_png(name, password) for name, password in networks))
+
+    async def pool_pdf():
+        pngs = await asyncio.gather(*(service.render_wifi_png(name, password) for name, password in networks))
+        await asyncio.gather(*(service.render_wifi_pdf(name, png) for (name, _), png in zip(networks, pngs)))
+
+    # Start the workers outside the timings
+    await service.render_wifi_png("warmup", "warmup")
+
+    await measure("inline PNG", inline_png, args.renders)
+    await measure("pool PNG", pool_png, args.renders)
+    await measure("cached PNG", pool_png, args.renders)
+    await measure("inline PNG + PDF", inline_pdf, args.renders)
+    await measure("pool PDF (PNG cached)", pool_pdf, args.renders)
+    await measure("cached PDF", pool_pdf, args.renders)
+    print(service.stats())
+    service.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+"""
+Backfill / repair income_daily_rollup and income_shift_rollup
+
+Recomputes the rollup tables from income_balance. Run it after restoring or
+editing income rows by hand, or whenever a report looks out of step with
+the raw transactions.
+
+Usage:
+    python scripts/rebuild_income_rollups.py                              # every chat, all days
+    python scripts/rebuild_income_rollups.py --chat-id -1001234567890
+    python scripts/rebuild_income_rollups.py --chat-id -1001234567890 --from 2025-07-01 --to 2025-07-31
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.income_rollup_service import IncomeRollupService
+
+
+def parse_day(value: str):
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chat-id", type=int, default=None, help="only rebuild this chat")
+    parser.add_argument("--from", dest="start_day", type=parse_day, default=None, help="first day (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="end_day", type=parse_day, default=None, help="last day, inclusive (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    end_day = args.end_day + timedelta(days=1) if args.end_day else None
+    daily_rows, shift_rows = await IncomeRollupService.rebuild_all(
+        chat_id=args.chat_id, start_day=args.start_day, end_day=end_day
+    )
+    print(f"income_daily_rollup: {daily_rows} rows rebuilt")
+    print(f"income_shift_rollup: {shift_rows} rows rebuilt")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,17 +1,23 @@
 from .user_service import UserService
 from .income_balance_service import IncomeService
+from .income_summary_service import IncomeAggregate, IncomeSummaryService, count_transactions
 from .chat_service import ChatService
 from .group_package_service import GroupPackageService
 from .shift_service import ShiftService
 from .shift_configuration_service import ShiftConfigurationService
 from .conversation_service import ConversationService
+from .registry_cache import get_registry_cache_stats
 
 __all__ = [
     "UserService",
     "IncomeService",
+    "IncomeSummaryService",
+    "IncomeAggregate",
+    "count_transactions",
     "ChatService",
     "GroupPackageService",
     "ShiftService",
     "ShiftConfigurationService",
     "ConversationService",
+    "get_registry_cache_stats",
 ]
@@ -1,9 +1,11 @@
-from config import get_db_session
+from config import get_db_session, db_executor
 from helper.logger_utils import force_log
 from models import Chat
 from models import User, IncomeBalance
 from .group_package_service import GroupPackageService
 from .income_balance_service import IncomeService
+from .income_rollup_service import IncomeRollupService
+from .registry_cache import chat_cache, group_package_cache
 from .shift_service import ShiftService
 
 
@@ -14,7 +16,8 @@ class ChatService:
         self.group_package_service = GroupPackageService()
 
     @staticmethod
-    async def register_chat_id(chat_id, group_name, user: User | None, registered_by: str | None = None):
+    @db_executor
+    def register_chat_id(chat_id, group_name, user: User | None, registered_by: str | None = None):
         with get_db_session() as session:
             try:
                 new_chat = Chat(
@@ -25,6 +28,7 @@ class ChatService:
                 )
                 session.add(new_chat)
                 session.commit()
+                chat_cache.invalidate(chat_id)
                 return True, f"Chat ID {chat_id} registered successfully."
             except Exception as e:
                 session.rollback()
@@ -34,27 +38,32 @@ class ChatService:
                 session.close()
 
     async def update_chat_enable_shift(self, chat_id: int, enable_shift: bool):
-        with get_db_session() as session:
+        # Create a shift first if enabling shift
+        if enable_shift:
             try:
-                # Create a shift first if enabling shift
-                if enable_shift:
-                    try:
-                        # Only create shift if none exists
-                        current_shift = await self.shift_service.get_current_shift(
-                            chat_id
-                        )
-                        if not current_shift:
-                            await self.shift_service.create_shift(chat_id)
+                # Only create shift if none exists
+                current_shift = await self.shift_service.get_current_shift(chat_id)
+                if not current_shift:
+                    await self.shift_service.create_shift(chat_id)
+
+            except Exception as shift_error:
+                force_log(f"Error creating shift: {shift_error}")
+                force_log(f"Error updating chat enable_shift: {shift_error}")
+                return False
 
-                    except Exception as shift_error:
-                        force_log(f"Error creating shift: {shift_error}")
-                        raise shift_error
+        # Update the chat setting after shift creation succeeds
+        return await self._set_chat_enable_shift(chat_id, enable_shift)
 
-                # Update the chat setting after shift creation succeeds
+    @staticmethod
+    @db_executor
+    def _set_chat_enable_shift(chat_id: int, enable_shift: bool):
+        with get_db_session() as session:
+            try:
                 session.query(Chat).filter_by(chat_id=chat_id).update(
                     {"enable_shift": enable_shift}
                 )
                 session.commit()
+                chat_cache.invalidate(chat_id)
                 return True
             except Exception as e:
                 session.rollback()
@@ -64,13 +73,15 @@ class ChatService:
                 session.close()
 
     @staticmethod
-    async def update_chat_status(chat_id: int, status: bool):
+    @db_executor
+    def update_chat_status(chat_id: int, status: bool):
         with get_db_session() as session:
             try:
                 session.query(Chat).filter_by(chat_id=chat_id).update(
                     {"is_active": status}
                 )
                 session.commit()
+                chat_cache.invalidate(chat_id)
                 return True
             except Exception as e:
                 session.rollback()
@@ -80,13 +91,15 @@ class ChatService:
                 session.close()
 
     @staticmethod
-    async def update_chat_user_id(chat_id: int, user_id: int):
+    @db_executor
+    def update_chat_user_id(chat_id: int, user_id: int):
         with get_db_session() as session:
             try:
                 session.query(Chat).filter_by(chat_id=chat_id).update(
                     {"user_id": user_id}
                 )
                 session.commit()
+                chat_cache.invalidate(chat_id)
                 return True
             except Exception as e:
                 session.rollback()
@@ -95,8 +108,37 @@ class ChatService:
             finally:
                 session.close()
 
+    @staticmethod
+    @db_executor
+    def update_last_verified_message_id(chat_id: int, message_id: int):
+        """Move the verification scheduler's high-water mark for a chat"""
+        with get_db_session() as session:
+            try:
+                session.query(Chat).filter_by(chat_id=chat_id).update(
+                    {"last_verified_message_id": message_id}
+                )
+                session.commit()
+                chat_cache.invalidate(chat_id)
+                return True
+            except Exception as e:
+                session.rollback()
+                force_log(f"Error updating chat last_verified_message_id: {e}")
+                return False
+            finally:
+                session.close()
+
     @staticmethod
     async def get_chat_by_chat_id(chat_id: int) -> Chat | None:
+        chat = chat_cache.get(chat_id)
+        if chat is None:
+            chat = await ChatService._fetch_chat_by_chat_id(chat_id)
+            if chat:
+                chat_cache.set(chat_id, chat)
+        return chat
+
+    @staticmethod
+    @db_executor
+    def _fetch_chat_by_chat_id(chat_id: int) -> Chat | None:
         with get_db_session() as session:
             try:
                 chat = (
@@ -111,9 +153,9 @@ class ChatService:
             finally:
                 session.close()
 
-
     @staticmethod
-    async def search_chats_by_chat_id_or_name(search_term: str, limit: int = 5) -> list[Chat]:
+    @db_executor
+    def search_chats_by_chat_id_or_name(search_term: str, limit: int = 5) -> list[Chat]:
         """Search chats by chat_id or group_name, return up to 'limit' results"""
         with get_db_session() as session:
             try:
@@ -149,7 +191,8 @@ class ChatService:
                 session.close()
 
     @staticmethod
-    async def get_all_active_chat_ids():
+    @db_executor
+    def get_all_active_chat_ids():
         with get_db_session() as session:
             try:
                 chats = session.query(Chat.chat_id).filter_by(is_active=True).all()
@@ -161,7 +204,8 @@ class ChatService:
                 session.close()
 
     @staticmethod
-    async def get_all_active_chat_ids_excluding_free():
+    @db_executor
+    def get_all_active_chat_ids_excluding_free():
         """Get all active chat IDs excluding those with FREE packages"""
         from models.group_package_model import GroupPackage
         from common.enums import ServicePackage
@@ -184,7 +228,8 @@ class ChatService:
                 session.close()
 
     @staticmethod
-    async def get_active_chat_ids_by_registered_by(registered_by: str | None):
+    @db_executor
+    def get_active_chat_ids_by_registered_by(registered_by: str | None):
         """Get active chat IDs excluding FREE packages, filtered by registered_by field.
         
         Args:
@@ -220,7 +265,8 @@ class ChatService:
                 session.close()
 
     @staticmethod
-    async def chat_exists(chat_id: int) -> bool:
+    @db_executor
+    def chat_exists(chat_id: int) -> bool:
         """
         Check if a chat with the given chat_id exists.
         Much more efficient than fetching all chat IDs and checking if it's in the list.
@@ -246,23 +292,31 @@ class ChatService:
             return False
 
     @staticmethod
-    async def migrate_chat_id(old_chat_id: int, new_chat_id: int) -> bool:
+    @db_executor
+    def migrate_chat_id(old_chat_id: int, new_chat_id: int) -> bool:
         """Migrate chat_id from old to new (for group migrations)"""
         with get_db_session() as session:
             try:
                 chat_result = (
                     session.query(Chat)
                     .filter_by(chat_id=old_chat_id)
-                    .update({"chat_id": new_chat_id})
+                    # Message ids restart in the migrated supergroup
+                    .update({"chat_id": new_chat_id, "last_verified_message_id": None})
                 )
 
+                # origin_chat_id keeps the old id, so these rows cannot
+                # collide with the restarted message ids of the new group
                 income_result = (
                     session.query(IncomeBalance)
                     .filter_by(chat_id=old_chat_id)
                     .update({"chat_id": new_chat_id})
                 )
 
+                IncomeRollupService.merge_chat(session, old_chat_id, new_chat_id)
+
                 session.commit()
+                chat_cache.invalidate(old_chat_id, new_chat_id)
+                group_package_cache.invalidate(old_chat_id, new_chat_id)
                 if chat_result > 0 or income_result > 0:
                     force_log(
                         f"Successfully migrated chat_id from {old_chat_id} to {new_chat_id}"
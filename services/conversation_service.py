@@ -1,12 +1,13 @@
 from typing import Optional, Union
 
 from common.enums import QuestionType
-from config import get_db_session
+from config import get_db_session, db_executor
 from models import BotQuestion
 
 
 class ConversationService:
-    async def save_question(
+    @db_executor
+    def save_question(
         self,
         chat_id: int,
         thread_id: int,
@@ -34,7 +35,8 @@ class ConversationService:
             session.commit()  # Commit the transaction to save to database
             return new_question
 
-    async def mark_as_replied(
+    @db_executor
+    def mark_as_replied(
         self, chat_id: int, thread_id: int, message_id: int
     ) -> type[BotQuestion] | None:
         """
@@ -58,7 +60,8 @@ class ConversationService:
                 return question  # type: ignore
             return None
 
-    async def get_pending_question(
+    @db_executor
+    def get_pending_question(
         self, chat_id: int, thread_id: int, question_type: Optional[QuestionType] = None
     ) -> Optional[BotQuestion]:
         """
@@ -76,7 +79,8 @@ class ConversationService:
 
         return query.order_by(BotQuestion.created_at.desc()).first()
 
-    async def get_question_by_message_id(
+    @db_executor
+    def get_question_by_message_id(
         self, chat_id: int, thread_id: int, message_id: int
     ) -> Optional[BotQuestion]:
         """
@@ -93,7 +97,8 @@ class ConversationService:
                 .first()
             )
 
-    async def get_pending_question_by_type(
+    @db_executor
+    def get_pending_question_by_type(
         self, chat_id: int, question_type: QuestionType
     ) -> Optional[BotQuestion]:
         """
@@ -111,7 +116,8 @@ class ConversationService:
                 .first()
             )
 
-    async def get_pending_question_by_message_id_and_type(
+    @db_executor
+    def get_pending_question_by_message_id_and_type(
         self, chat_id: int, message_id: int, question_type: QuestionType
     ) -> Optional[BotQuestion]:
         """
@@ -129,7 +135,8 @@ class ConversationService:
                 .first()
             )
 
-    async def get_question_by_chat_and_message_id(
+    @db_executor
+    def get_question_by_chat_and_message_id(
         self, chat_id: int, message_id: int
     ) -> Optional[BotQuestion]:
         """
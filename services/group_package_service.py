@@ -1,25 +1,37 @@
 from datetime import datetime
 
 from common.enums import ServicePackage
-from config import get_db_session
+from config import get_db_session, db_executor
 from helper import DateUtils
 from models import GroupPackage
+from .registry_cache import chat_cache, group_package_cache
 
 
 class GroupPackageService:
-    async def _get_chat_group_id_by_chat_id(self, chat_id: int) -> int | None:
-        with get_db_session() as db:
-            from models.chat_model import Chat
+    @staticmethod
+    def _get_chat_group_id_by_chat_id(db, chat_id: int) -> int | None:
+        from models.chat_model import Chat
 
+        chat = chat_cache.get(chat_id)
+        if chat is None:
             chat = db.query(Chat).filter(Chat.chat_id == chat_id).first()
-            return chat.id if chat else None  # type: ignore
+        return chat.id if chat else None  # type: ignore
 
     async def get_package_by_chat_id(self, chat_id: int) -> GroupPackage | None:
-        chat_group_id = await self._get_chat_group_id_by_chat_id(chat_id)
-        if not chat_group_id:
-            return None
-
+        package = group_package_cache.get(chat_id)
+        if package is None:
+            package = await self._fetch_package_by_chat_id(chat_id)
+            if package:
+                group_package_cache.set(chat_id, package)
+        return package
+
+    @db_executor
+    def _fetch_package_by_chat_id(self, chat_id: int) -> GroupPackage | None:
         with get_db_session() as db:
+            chat_group_id = self._get_chat_group_id_by_chat_id(db, chat_id)
+            if not chat_group_id:
+                return None
+
             package = (
                 db.query(GroupPackage)
                 .filter(GroupPackage.chat_group_id == chat_group_id)
@@ -27,14 +39,15 @@ class GroupPackageService:
             )
             return package
 
-    async def create_group_package(
+    @db_executor
+    def create_group_package(
         self, chat_id: int, package: ServicePackage = ServicePackage.TRIAL
     ) -> GroupPackage:
-        chat_group_id = await self._get_chat_group_id_by_chat_id(chat_id)
-        if not chat_group_id:
-            raise ValueError(f"Chat with chat_id {chat_id} not found")
-
         with get_db_session() as db:
+            chat_group_id = self._get_chat_group_id_by_chat_id(db, chat_id)
+            if not chat_group_id:
+                raise ValueError(f"Chat with chat_id {chat_id} not found")
+
             group_package = GroupPackage(
                 chat_group_id=chat_group_id,
                 package=package,
@@ -48,12 +61,14 @@ class GroupPackageService:
                 db.add(group_package)
                 db.commit()
                 db.refresh(group_package)
+                group_package_cache.invalidate(chat_id)
                 return group_package
             except Exception as e:
                 db.rollback()
                 raise e
 
-    async def update_package(
+    @db_executor
+    def update_package(
         self,
         chat_id: int,
         package: ServicePackage,
@@ -63,11 +78,11 @@ class GroupPackageService:
         note: str | None = None,
         last_paid_date: datetime | None = None,
     ) -> GroupPackage | None:
-        chat_group_id = await self._get_chat_group_id_by_chat_id(chat_id)
-        if not chat_group_id:
-            return None
-
         with get_db_session() as db:
+            chat_group_id = self._get_chat_group_id_by_chat_id(db, chat_id)
+            if not chat_group_id:
+                return None
+
             group_package = (
                 db.query(GroupPackage)
                 .filter(GroupPackage.chat_group_id == chat_group_id)
@@ -93,6 +108,7 @@ class GroupPackageService:
 
                 db.commit()
                 db.refresh(group_package)
+                group_package_cache.invalidate(chat_id)
                 return group_package
             return None
 
@@ -102,15 +118,16 @@ class GroupPackageService:
             return existing
         return await self.create_group_package(chat_id, ServicePackage.TRIAL)
 
-    async def update_feature_flags(
+    @db_executor
+    def update_feature_flags(
         self, chat_id: int, feature_flags: dict[str, bool]
     ) -> GroupPackage | None:
         """Update feature flags for a group package"""
-        chat_group_id = await self._get_chat_group_id_by_chat_id(chat_id)
-        if not chat_group_id:
-            return None
-
         with get_db_session() as db:
+            chat_group_id = self._get_chat_group_id_by_chat_id(db, chat_id)
+            if not chat_group_id:
+                return None
+
             group_package = (
                 db.query(GroupPackage)
                 .filter(GroupPackage.chat_group_id == chat_group_id)
@@ -126,6 +143,7 @@ class GroupPackageService:
 
                 db.commit()
                 db.refresh(group_package)
+                group_package_cache.invalidate(chat_id)
                 return group_package
             return None
 
@@ -148,15 +166,16 @@ class GroupPackageService:
         """Check if a feature is enabled for a chat (convenience method)"""
         return await self.get_feature_flag(chat_id, key, False)
 
-    async def remove_feature_flag(
+    @db_executor
+    def remove_feature_flag(
         self, chat_id: int, key: str
     ) -> GroupPackage | None:
         """Remove a feature flag for a group package"""
-        chat_group_id = await self._get_chat_group_id_by_chat_id(chat_id)
-        if not chat_group_id:
-            return None
-
         with get_db_session() as db:
+            chat_group_id = self._get_chat_group_id_by_chat_id(db, chat_id)
+            if not chat_group_id:
+                return None
+
             group_package = (
                 db.query(GroupPackage)
                 .filter(GroupPackage.chat_group_id == chat_group_id)
@@ -169,6 +188,7 @@ class GroupPackageService:
                     group_package.updated_at = DateUtils.now()
                     db.commit()
                     db.refresh(group_package)
+                    group_package_cache.invalidate(chat_id)
                 return group_package
             return None
 
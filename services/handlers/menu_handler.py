@@ -6,7 +6,7 @@ from telegram.ext import ContextTypes, ConversationHandler
 from helper import DateUtils, daily_transaction_report, weekly_transaction_report, monthly_transaction_report, \
     shift_report
 from helper.logger_utils import force_log
-from services import ChatService, IncomeService, ShiftService
+from services import ChatService, IncomeSummaryService, ShiftService
 
 
 class MenuHandler:
@@ -85,14 +85,13 @@ class MenuHandler:
             current_date = DateUtils.now()
             
             # Use the same method as _handle_date_summary
-            from services import IncomeService
-            income_service = IncomeService()
-            incomes = await income_service.get_income_by_specific_date_and_chat_id(
+            from services import IncomeSummaryService
+            aggregates = await IncomeSummaryService.get_aggregates_for_date(
                 chat_id=chat_id,
                 target_date=current_date
             )
 
-            if not incomes:
+            if not aggregates:
                 message = (
                     f"គ្មានប្រតិបត្តិការសម្រាប់ថ្ងៃទី {current_date.strftime('%d %b %Y')} ទេ។"
                 )
@@ -110,7 +109,7 @@ class MenuHandler:
                 # Use daily report format for current date
                 from helper import daily_transaction_report
                 group_name = chat.group_name or f"Group {chat.chat_id}"
-                message = daily_transaction_report(incomes, current_date, telegram_username, group_name)
+                message = daily_transaction_report(aggregates, current_date, telegram_username, group_name)
 
             await query.edit_message_text(message, parse_mode='HTML')
             return True
@@ -257,13 +256,12 @@ class MenuHandler:
             date_str = callback_data.replace("summary_of_", "")
             selected_date = datetime.strptime(date_str, "%Y-%m-%d")
 
-            income_service = IncomeService()
-            incomes = await income_service.get_income_by_specific_date_and_chat_id(
+            aggregates = await IncomeSummaryService.get_aggregates_for_date(
                 chat_id=chat_id,
                 target_date=selected_date
             )
 
-            if not incomes:
+            if not aggregates:
                 message = (
                     f"គ្មានប្រតិបត្តិការសម្រាប់ថ្ងៃទី {selected_date.strftime('%d %b %Y')} ទេ។"
                 )
@@ -285,7 +283,7 @@ class MenuHandler:
                 # Use new daily report format
                 start_date = selected_date
                 end_date = selected_date + timedelta(days=1)
-                message = daily_transaction_report(incomes, selected_date, telegram_username, group_name)
+                message = daily_transaction_report(aggregates, selected_date, telegram_username, group_name)
 
             await query.edit_message_text(message, parse_mode='HTML')
             return True
@@ -461,7 +459,7 @@ class MenuHandler:
         """Handle week summary like normal bot"""
         try:
             from datetime import datetime
-            from services import IncomeService
+            from services import IncomeSummaryService
             from helper import weekly_transaction_report
             
             start_date = datetime.strptime(
@@ -469,19 +467,18 @@ class MenuHandler:
             )
             end_date = start_date + timedelta(days=7)
             
-            income_service = IncomeService()
-            incomes = await income_service.get_income_by_date_and_chat_id(
+            aggregates = await IncomeSummaryService.get_aggregates_by_day(
                 chat_id=chat_id,
                 start_date=start_date,
                 end_date=end_date,
             )
 
-            if not incomes:
+            if not aggregates:
                 period_text = f"{start_date.strftime('%d')} - {(end_date - timedelta(days=1)).strftime('%d %b %Y')}"
                 message = f"គ្មានប្រតិបត្តិការសម្រាប់ {period_text} ទេ។"
             else:
                 # Use weekly report format
-                message = weekly_transaction_report(incomes, start_date, end_date)
+                message = weekly_transaction_report(aggregates, start_date, end_date)
 
             await query.edit_message_text(message, parse_mode='HTML')
             return True
@@ -497,7 +494,7 @@ class MenuHandler:
         try:
             from datetime import datetime
             from calendar import monthrange
-            from services import IncomeService
+            from services import IncomeSummaryService
             from helper import monthly_transaction_report
             
             start_date = datetime.strptime(
@@ -507,19 +504,18 @@ class MenuHandler:
             _, last_day = monthrange(start_date.year, start_date.month)
             end_date = start_date.replace(day=last_day) + timedelta(days=1)
             
-            income_service = IncomeService()
-            incomes = await income_service.get_income_by_date_and_chat_id(
+            aggregates = await IncomeSummaryService.get_aggregates_by_day(
                 chat_id=chat_id,
                 start_date=start_date,
                 end_date=end_date,
             )
 
-            if not incomes:
+            if not aggregates:
                 period_text = start_date.strftime("%B %Y")
                 message = f"គ្មានប្រតិបត្តិការសម្រាប់ {period_text} ទេ។"
             else:
                 # Use monthly report format
-                message = monthly_transaction_report(incomes, start_date, end_date)
+                message = monthly_transaction_report(aggregates, start_date, end_date)
 
             await query.edit_message_text(message, parse_mode='HTML')
             return True
@@ -532,8 +528,6 @@ class MenuHandler:
     async def _generate_report(self, chat_id: int, report_type: str, requesting_user=None) -> str:
         """Generate report text by calling appropriate service methods"""
 
-        income_service = IncomeService()
-
         # Get current time using DateUtils for consistency
         now = DateUtils.now()
 
@@ -564,14 +558,14 @@ class MenuHandler:
             return "Invalid report type"
 
         # Get income data using the same method as normal bot
-        incomes = await income_service.get_income_by_date_and_chat_id(
+        aggregates = await IncomeSummaryService.get_aggregates_by_day(
             chat_id=chat_id,
             start_date=start_date,
             end_date=end_date,
         )
 
         # If no data found, return no data message
-        if not incomes:
+        if not aggregates:
             return f"គ្មានប្រតិបត្តិការសម្រាប់ {title} ទេ។"
 
         # For daily reports, use the new format
@@ -589,19 +583,19 @@ class MenuHandler:
             chat = await self.chat_service.get_chat_by_chat_id(chat_id)
             group_name = chat.group_name or f"Group {chat.chat_id}" if chat else None
             
-            return daily_transaction_report(incomes, now, telegram_username, group_name)
+            return daily_transaction_report(aggregates, now, telegram_username, group_name)
         elif report_type == "weekly":
             # Use the new weekly format
-            return weekly_transaction_report(incomes, start_date, end_date)
+            return weekly_transaction_report(aggregates, start_date, end_date)
         elif report_type == "monthly":
             # Use the new monthly format
-            return monthly_transaction_report(incomes, start_date, end_date)
+            return monthly_transaction_report(aggregates, start_date, end_date)
         
         # For other reports, use the old format
         from helper import total_summary_report
         period_text = title
         formatted_title = f"សរុបប្រតិបត្តិការ {period_text}"
-        return total_summary_report(incomes, formatted_title)
+        return total_summary_report(aggregates, formatted_title)
 
     async def menu_callback_query_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         """Handle callback queries from menu inline buttons"""
@@ -1,12 +1,15 @@
 from datetime import datetime, timedelta
 
-from sqlalchemy import func
+from sqlalchemy import insert
 
 from common.enums import CurrencyEnum
-from config import get_db_session
+from config import get_db_session, db_executor, run_in_db_executor
 from helper import DateUtils
 from helper.logger_utils import force_log
-from models import IncomeBalance
+from models import IncomeBalance, IncomeRow
+from models.income_balance_model import INCOME_ROW_COLUMNS
+from .income_rollup_service import IncomeRollupService
+from .income_summary_service import IncomeSummaryService
 from .shift_service import ShiftService
 
 
@@ -15,12 +18,12 @@ class IncomeService:
         self.shift_service = ShiftService()
 
     async def ensure_active_shift(self, chat_id: int) -> int:
-        force_log(f"_ensure_active_shift called for chat_id: {chat_id}")
+        force_log(f"_ensure_active_shift called for chat_id: {chat_id}", level="DEBUG")
         try:
 
             current_shift = await self.shift_service.get_current_shift(chat_id)
             if current_shift:
-                force_log(f"Found existing shift {current_shift.id} for chat {chat_id}")
+                force_log(f"Found existing shift {current_shift.id} for chat {chat_id}", level="DEBUG")
                 return current_shift.id
             else:
                 # No active shift found, create a new one
@@ -30,10 +33,11 @@ class IncomeService:
                 return new_shift.id
 
         except Exception as e:
-            force_log(f"ERROR in _ensure_active_shift: {e}")
+            force_log(f"ERROR in _ensure_active_shift: {e}", level="ERROR")
             raise e
 
-    async def update_shift(self, income_id: int, shift: int):
+    @db_executor
+    def update_shift(self, income_id: int, shift: int):
         with get_db_session() as db:
             income = db.query(IncomeBalance).filter(IncomeBalance.id == income_id)
             if income.first():
@@ -42,13 +46,14 @@ class IncomeService:
                 return income.first()
             return None
 
-    async def update_note(self, message_id: int, chat_id: int, note: str) -> bool:
+    @db_executor
+    def update_note(self, message_id: int, chat_id: int, note: str) -> bool:
         """Update the note for a transaction by message_id and chat_id"""
         try:
             with get_db_session() as db:
                 income = db.query(IncomeBalance).filter(
                     IncomeBalance.message_id == message_id,
-                    IncomeBalance.chat_id == chat_id
+                    IncomeBalance.origin_chat_id == chat_id
                 ).first()
                 
                 if income:
@@ -64,19 +69,21 @@ class IncomeService:
             force_log(f"Error updating note: {e}")
             return False
 
-    async def get_income_by_message_id(self, message_id: int, chat_id: int) -> IncomeBalance | None:
+    @db_executor
+    def get_income_by_message_id(self, message_id: int, chat_id: int) -> IncomeBalance | None:
         """Get income record by message_id and chat_id"""
         try:
             with get_db_session() as db:
                 return db.query(IncomeBalance).filter(
                     IncomeBalance.message_id == message_id,
-                    IncomeBalance.chat_id == chat_id
+                    IncomeBalance.origin_chat_id == chat_id
                 ).first()
         except Exception as e:
             force_log(f"Error getting income by message_id: {e}")
             return None
 
-    async def get_last_shift_id(self, chat_id: int) -> IncomeBalance | None:
+    @db_executor
+    def get_last_shift_id(self, chat_id: int) -> IncomeBalance | None:
         with get_db_session() as db:
             last_income = (
                 db.query(IncomeBalance)
@@ -86,6 +93,24 @@ class IncomeService:
             )
             return last_income
 
+    async def _resolve_shift_id(
+        self, chat_id: int, shift_id: int, enable_shift: bool
+    ) -> int:
+        """Ensure shift exists - auto-create if needed"""
+        if shift_id == 0:
+            if enable_shift:
+                force_log(
+                    f"No shift_id provided, ensuring active shift for chat {chat_id}", level="DEBUG"
+                )
+                shift_id = await self.ensure_active_shift(chat_id)
+                force_log(f"Using shift_id: {shift_id}", level="DEBUG")
+            else:
+                force_log(
+                    f"Shifts disabled for chat {chat_id}, setting shift_id to None", level="DEBUG"
+                )
+                shift_id = 0
+        return shift_id
+
     async def insert_income(
         self,
         chat_id: int,
@@ -103,100 +128,229 @@ class IncomeService:
         Insert income
         """
         force_log(
-            f"insert_income called: chat_id={chat_id}, amount={amount}, currency={currency}, shift_id={shift_id}"
+            f"insert_income called: chat_id={chat_id}, amount={amount}, currency={currency}, shift_id={shift_id}", level="DEBUG"
         )
         try:
             from_symbol = CurrencyEnum.from_symbol(currency)
             currency_code = from_symbol if from_symbol else currency
             current_date = DateUtils.now()
+            shift_id = await self._resolve_shift_id(chat_id, shift_id, enable_shift)
+
+            return await run_in_db_executor(
+                self._insert_income_row,
+                chat_id,
+                amount,
+                currency_code,
+                current_date,
+                original_amount,
+                message_id,
+                message,
+                trx_id,
+                shift_id,
+                sent_by,
+            )
+        except Exception as e:
+            force_log(f"ERROR in insert_income: {e}", level="ERROR")
+            raise e
 
-            # Ensure shift exists - auto-create if needed
-            if shift_id is 0:
-                if enable_shift:
-                    force_log(
-                        f"No shift_id provided, ensuring active shift for chat {chat_id}"
-                    )
-                    shift_id = await self.ensure_active_shift(chat_id)
-                    force_log(f"Using shift_id: {shift_id}")
-                else:
-                    force_log(
-                        f"Shifts disabled for chat {chat_id}, setting shift_id to None"
-                    )
-                    shift_id = 0
-
-            with get_db_session() as db:
-                try:
-                    force_log(f"Creating IncomeBalance record with shift_id={shift_id}")
-                    new_income = IncomeBalance(
-                        chat_id=chat_id,
-                        amount=amount,
-                        currency=currency_code,
-                        income_date=current_date,
-                        original_amount=original_amount,
-                        message_id=message_id,
-                        message=message,
-                        trx_id=trx_id,
-                        shift_id=shift_id if shift_id != 0 else None,
-                        sent_by=sent_by,
-                    )
-
-                    db.add(new_income)
-                    db.commit()
-                    db.refresh(new_income)
-                    force_log(
-                        f"Successfully saved IncomeBalance record with id={new_income.id}"
-                    )
-                    return new_income
+    async def insert_ignore(
+        self,
+        chat_id: int,
+        amount: float,
+        currency: str,
+        original_amount: float,
+        message_id: int,
+        message: str,
+        trx_id: str | None,
+        shift_id: int = 0,
+        enable_shift: bool = False,
+        sent_by: str | None = None,
+    ) -> IncomeBalance | None:
+        """
+        Insert income unless this (chat_id, message_id) is already stored.
 
-                except Exception as e:
-                    force_log(f"ERROR in database operation: {e}")
-                    db.rollback()
-                    raise e
+        One INSERT IGNORE against the uq_income_origin_message key, so the
+        listener and the verification scheduler can race on the same message
+        without a read-then-write check. Returns None for a duplicate.
+        """
+        force_log(
+            f"insert_ignore called: chat_id={chat_id}, message_id={message_id}, amount={amount}, currency={currency}", level="DEBUG"
+        )
+        try:
+            from_symbol = CurrencyEnum.from_symbol(currency)
+            currency_code = from_symbol if from_symbol else currency
+            current_date = DateUtils.now()
+            shift_id = await self._resolve_shift_id(chat_id, shift_id, enable_shift)
+
+            return await run_in_db_executor(
+                self._insert_ignore_row,
+                {
+                    "chat_id": chat_id,
+                    "amount": amount,
+                    "currency": currency_code,
+                    "income_date": current_date,
+                    "original_amount": original_amount,
+                    "message_id": message_id,
+                    "origin_chat_id": chat_id,
+                    "message": message,
+                    "trx_id": trx_id,
+                    "shift_id": shift_id if shift_id != 0 else None,
+                    "sent_by": sent_by,
+                },
+            )
         except Exception as e:
-            force_log(f"ERROR in insert_income: {e}")
+            force_log(f"ERROR in insert_ignore: {e}", level="ERROR")
             raise e
 
-    async def get_income(self, income_id: int) -> IncomeBalance | None:
+    @staticmethod
+    def _insert_ignore_row(values: dict) -> IncomeBalance | None:
+        statement = (
+            insert(IncomeBalance)
+            .values(**values)
+            .prefix_with("IGNORE", dialect="mysql")
+            .prefix_with("OR IGNORE", dialect="sqlite")
+        )
+        with get_db_session() as db:
+            try:
+                result = db.execute(statement)
+                if result.rowcount:
+                    IncomeRollupService.apply(db, [values])
+                db.commit()
+            except Exception as e:
+                force_log(f"ERROR in database operation: {e}", level="ERROR")
+                db.rollback()
+                raise e
+
+        if result.rowcount == 0:
+            force_log(
+                f"Message {values['message_id']} from chat {values['chat_id']} already stored, ignored", level="DEBUG"
+            )
+            return None
+
+        new_id = result.inserted_primary_key[0]
+        force_log(f"Successfully saved IncomeBalance record with id={new_id}")
+        return IncomeBalance(id=new_id, **values)
+
+    @staticmethod
+    def _insert_income_row(
+        chat_id: int,
+        amount: float,
+        currency_code: str,
+        income_date: datetime,
+        original_amount: float,
+        message_id: int,
+        message: str,
+        trx_id: str | None,
+        shift_id: int,
+        sent_by: str | None,
+    ) -> IncomeBalance:
+        with get_db_session() as db:
+            try:
+                force_log(f"Creating IncomeBalance record with shift_id={shift_id}", level="DEBUG")
+                new_income = IncomeBalance(
+                    chat_id=chat_id,
+                    amount=amount,
+                    currency=currency_code,
+                    income_date=income_date,
+                    original_amount=original_amount,
+                    message_id=message_id,
+                    origin_chat_id=chat_id,
+                    message=message,
+                    trx_id=trx_id,
+                    shift_id=shift_id if shift_id != 0 else None,
+                    sent_by=sent_by,
+                )
+
+                db.add(new_income)
+                IncomeRollupService.apply(
+                    db,
+                    [
+                        {
+                            "chat_id": chat_id,
+                            "amount": amount,
+                            "currency": currency_code,
+                            "income_date": income_date,
+                            "shift_id": new_income.shift_id,
+                        }
+                    ],
+                )
+                db.commit()
+                db.refresh(new_income)
+                force_log(
+                    f"Successfully saved IncomeBalance record with id={new_income.id}"
+                )
+                return new_income
+
+            except Exception as e:
+                force_log(f"ERROR in database operation: {e}", level="ERROR")
+                db.rollback()
+                raise e
+
+    @staticmethod
+    def _rows(query) -> list[IncomeRow]:
+        return [IncomeRow(*row) for row in query.all()]
+
+    @db_executor
+    def get_income(self, income_id: int) -> IncomeBalance | None:
         with get_db_session() as db:
             return db.query(IncomeBalance).filter(IncomeBalance.id == income_id).first()
 
-    async def get_income_by_chat_id(self, chat_id: int) -> list[IncomeBalance]:
+    @db_executor
+    def get_income_by_chat_id(self, chat_id: int) -> list[IncomeRow]:
         with get_db_session() as db:
-            return (
-                db.query(IncomeBalance).filter(IncomeBalance.chat_id == chat_id).all()
+            return self._rows(
+                db.query(*INCOME_ROW_COLUMNS).filter(IncomeBalance.chat_id == chat_id)
             )
 
-    async def get_income_by_chat_and_message_id(
+    @db_executor
+    def get_income_by_chat_and_message_id(
         self, chat_id: int, message_id: int
     ) -> bool:
         force_log(
-            f"Searching for existing income with chat_id: {chat_id} and message_id: {message_id}"
+            f"Searching for existing income with chat_id: {chat_id} and message_id: {message_id}", level="DEBUG"
         )
         with get_db_session() as db:
             result = (
-                db.query(IncomeBalance)
+                db.query(IncomeBalance.id)
                 .filter(
-                    IncomeBalance.chat_id == chat_id,
+                    IncomeBalance.origin_chat_id == chat_id,
                     IncomeBalance.message_id == message_id,
                 )
                 .first()
             )
             found = result is not None
             force_log(
-                f"Chat ID {chat_id} + Message ID {message_id} duplicate check: {'FOUND' if found else 'NOT FOUND'}"
+                f"Chat ID {chat_id} + Message ID {message_id} duplicate check: {'FOUND' if found else 'NOT FOUND'}", level="DEBUG"
             )
             return found
 
-    async def get_income_by_trx_id(self, trx_id: str | None, chat_id: int) -> bool:
+    @db_executor
+    def get_missing_message_ids(self, chat_id: int, message_ids: list[int]) -> set[int]:
+        """Return which of the given message_ids are not stored for this chat yet (one IN query)"""
+        if not message_ids:
+            return set()
+        with get_db_session() as db:
+            stored = (
+                db.query(IncomeBalance.message_id)
+                .filter(
+                    IncomeBalance.origin_chat_id == chat_id,
+                    IncomeBalance.message_id.in_(message_ids),
+                )
+                .all()
+            )
+            return set(message_ids) - {message_id for (message_id,) in stored}
+
+    @db_executor
+    def get_income_by_trx_id(self, trx_id: str | None, chat_id: int) -> bool:
         if trx_id is None:
-            force_log("Transaction ID is None, returning False")
+            force_log("Transaction ID is None, returning False", level="DEBUG")
             return False
         force_log(
-            f"Searching for existing income with trx_id: {trx_id} and chat_id: {chat_id}"
+            f"Searching for existing income with trx_id: {trx_id} and chat_id: {chat_id}", level="DEBUG"
         )
         with get_db_session() as db:
             result = (
-                db.query(IncomeBalance)
+                db.query(IncomeBalance.id)
                 .filter(
                     IncomeBalance.trx_id == trx_id, IncomeBalance.chat_id == chat_id
                 )
@@ -204,11 +358,12 @@ class IncomeService:
             )
             found = result is not None
             force_log(
-                f"Transaction ID {trx_id} duplicate check for chat {chat_id}: {'FOUND' if found else 'NOT FOUND'}"
+                f"Transaction ID {trx_id} duplicate check for chat {chat_id}: {'FOUND' if found else 'NOT FOUND'}", level="DEBUG"
             )
             return found
 
-    async def check_duplicate_transaction(
+    @db_executor
+    def check_duplicate_transaction(
         self, chat_id: int, trx_id: str | None, message_id: int
     ) -> bool:
         """
@@ -218,16 +373,16 @@ class IncomeService:
         Returns True if duplicate found, False if unique
         """
         force_log(
-            f"Checking duplicate with chat_id: {chat_id}, trx_id: {trx_id}, message_id: {message_id}"
+            f"Checking duplicate with chat_id: {chat_id}, trx_id: {trx_id}, message_id: {message_id}", level="DEBUG"
         )
 
         with get_db_session() as db:
             if trx_id:
                 # Check combination of chat_id, trx_id, and message_id
                 duplicate = (
-                    db.query(IncomeBalance)
+                    db.query(IncomeBalance.id)
                     .filter(
-                        IncomeBalance.chat_id == chat_id,
+                        IncomeBalance.origin_chat_id == chat_id,
                         IncomeBalance.trx_id == trx_id,
                         IncomeBalance.message_id == message_id,
                     )
@@ -236,15 +391,15 @@ class IncomeService:
 
                 if duplicate:
                     force_log(
-                        f"Duplicate found by combination: chat_id={chat_id}, trx_id={trx_id}, message_id={message_id}"
+                        f"Duplicate found by combination: chat_id={chat_id}, trx_id={trx_id}, message_id={message_id}", level="DEBUG"
                     )
                     return True
             else:
                 # If trx_id is null, check combination of chat_id and message_id
                 duplicate = (
-                    db.query(IncomeBalance)
+                    db.query(IncomeBalance.id)
                     .filter(
-                        IncomeBalance.chat_id == chat_id,
+                        IncomeBalance.origin_chat_id == chat_id,
                         IncomeBalance.message_id == message_id,
                     )
                     .first()
@@ -252,55 +407,63 @@ class IncomeService:
 
                 if duplicate:
                     force_log(
-                        f"Duplicate found by combination: chat_id={chat_id}, message_id={message_id} (trx_id is null)"
+                        f"Duplicate found by combination: chat_id={chat_id}, message_id={message_id} (trx_id is null)", level="DEBUG"
                     )
                     return True
 
             force_log(
-                f"No duplicate found for chat_id={chat_id}, trx_id={trx_id}, message_id={message_id}"
+                f"No duplicate found for chat_id={chat_id}, trx_id={trx_id}, message_id={message_id}", level="DEBUG"
             )
             return False
 
-    async def get_last_yesterday_message(self, date) -> IncomeBalance | None:
+    @db_executor
+    def get_last_yesterday_message(self, date) -> IncomeBalance | None:
+        day_start, day_end = DateUtils.local_day_range(date)
         with get_db_session() as db:
             return (
                 db.query(IncomeBalance)
-                .filter(func.date(IncomeBalance.income_date) == date.date())
+                .filter(
+                    IncomeBalance.income_date >= day_start,
+                    IncomeBalance.income_date < day_end,
+                )
                 .order_by(IncomeBalance.id.desc())
                 .first()
             )
 
-    async def get_income_by_date_and_chat_id(
+    @db_executor
+    def get_income_by_date_and_chat_id(
         self, chat_id: int, start_date: datetime, end_date: datetime
-    ) -> list[IncomeBalance]:
+    ) -> list[IncomeRow]:
         with get_db_session() as db:
-            return (
-                db.query(IncomeBalance)
+            return self._rows(
+                db.query(*INCOME_ROW_COLUMNS)
                 .filter(
                     IncomeBalance.chat_id == chat_id,
                     IncomeBalance.income_date >= start_date,
                     IncomeBalance.income_date < end_date,
                 )
-                .all()
             )
 
-    async def get_income_by_specific_date_and_chat_id(
+    @db_executor
+    def get_income_by_specific_date_and_chat_id(
         self, chat_id: int, target_date: datetime
-    ) -> list[IncomeBalance]:
+    ) -> list[IncomeRow]:
+        day_start, day_end = DateUtils.local_day_range(target_date)
         with get_db_session() as db:
-            return (
-                db.query(IncomeBalance)
+            return self._rows(
+                db.query(*INCOME_ROW_COLUMNS)
                 .filter(
                     IncomeBalance.chat_id == chat_id,
-                    func.date(IncomeBalance.income_date) == target_date.date(),
+                    IncomeBalance.income_date >= day_start,
+                    IncomeBalance.income_date < day_end,
                 )
-                .all()
             )
 
-    async def get_income_by_shift_id(self, shift_id: int) -> list[IncomeBalance]:
+    @db_executor
+    def get_income_by_shift_id(self, shift_id: int) -> list[IncomeRow]:
         with get_db_session() as db:
-            return (
-                db.query(IncomeBalance).filter(IncomeBalance.shift_id == shift_id).all()
+            return self._rows(
+                db.query(*INCOME_ROW_COLUMNS).filter(IncomeBalance.shift_id == shift_id)
             )
 
     async def get_income_summary_by_date_range(
@@ -315,79 +478,63 @@ class IncomeService:
         # Add one day to end_date to include the entire end day
         end_datetime = datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)
 
-        # Get all income records in the date range
-        with get_db_session() as db:
-            incomes = (
-                db.query(IncomeBalance)
-                .filter(
-                    IncomeBalance.chat_id == chat_id,
-                    IncomeBalance.income_date >= start_datetime,
-                    IncomeBalance.income_date < end_datetime,
-                )
-                .all()
-            )
-
-        # Prepare the summary structure
-        summary = {"total_amount": 0.0, "count": len(incomes), "by_currency": {}}
-
-        # Calculate totals
-        for income in incomes:
-            currency = income.currency
-            amount = income.amount
-
-            # Initialize currency entry if it doesn't exist
-            if currency not in summary["by_currency"]:
-                summary["by_currency"][currency] = {"total": 0.0, "count": 0}
+        aggregates = await IncomeSummaryService.get_aggregates_for_period(
+            chat_id, start_datetime, end_datetime
+        )
 
-            # Add to totals
-            summary["by_currency"][currency]["total"] += amount
-            summary["by_currency"][currency]["count"] += 1
-            summary["total_amount"] += amount
+        summary = {"total_amount": 0.0, "count": 0, "by_currency": {}}
+        for aggregate in aggregates:
+            summary["by_currency"][aggregate.currency] = {
+                "total": aggregate.total,
+                "count": aggregate.count,
+            }
+            summary["total_amount"] += aggregate.total
+            summary["count"] += aggregate.count
 
         return summary
 
-    async def get_today_income(self, chat_id: int) -> list[IncomeBalance]:
+    @db_executor
+    def get_today_income(self, chat_id: int) -> list[IncomeRow]:
         """Get all income records for today"""
         today = DateUtils.today()
         tomorrow = today + timedelta(days=1)
 
         with get_db_session() as db:
-            return (
-                db.query(IncomeBalance)
+            return self._rows(
+                db.query(*INCOME_ROW_COLUMNS)
                 .filter(
                     IncomeBalance.chat_id == chat_id,
                     IncomeBalance.income_date >= today,
                     IncomeBalance.income_date < tomorrow,
                 )
-                .all()
             )
 
-    async def get_weekly_income(self, chat_id: int) -> list[IncomeBalance]:
+    @db_executor
+    def get_weekly_income(self, chat_id: int) -> list[IncomeRow]:
         """Get all income records for this week"""
         today = DateUtils.today()
         week_start = today - timedelta(days=today.weekday())
 
         with get_db_session() as db:
-            return (
-                db.query(IncomeBalance)
+            return self._rows(
+                db.query(*INCOME_ROW_COLUMNS)
                 .filter(
                     IncomeBalance.chat_id == chat_id,
                     IncomeBalance.income_date >= week_start,
                 )
-                .all()
             )
 
-    async def get_monthly_income(self, chat_id: int) -> list[IncomeBalance]:
+    @db_executor
+    def get_monthly_income(self, chat_id: int) -> list[IncomeRow]:
         """Get all income records for this month"""
         today = DateUtils.today()
         month_start = today.replace(day=1)
 
         with get_db_session() as db:
-            return (
-                db.query(IncomeBalance)
+            return self._rows(
+                db.query(*INCOME_ROW_COLUMNS)
                 .filter(
                     IncomeBalance.chat_id == chat_id,
                     IncomeBalance.income_date >= month_start,
                 )
-                .all()
             )
@@ -0,0 +1,342 @@
+import asyncio
+from datetime import datetime, timedelta
+from time import perf_counter
+
+import pytz
+from sqlalchemy import func, insert, tuple_
+
+from common.enums import CurrencyEnum, IncomeWriteStatus
+from config import get_db_session, run_in_db_executor
+from helper import DateUtils
+from helper.logger_utils import force_log
+from helper.metrics import END_TO_END_LATENCY, INSERT_LATENCY
+from models import Chat, IncomeBalance, Shift
+from .income_rollup_service import IncomeRollupService
+
+
+class PendingIncome:
+    """A parsed bank notification waiting in the write buffer"""
+
+    __slots__ = (
+        "chat_id",
+        "amount",
+        "currency",
+        "original_amount",
+        "message_id",
+        "message",
+        "trx_id",
+        "sent_by",
+        "message_time",
+        "income_date",
+        "future",
+    )
+
+    def __init__(
+        self,
+        chat_id: int,
+        amount: float,
+        currency: str,
+        original_amount: float,
+        message_id: int,
+        message: str,
+        trx_id: str | None,
+        sent_by: str | None,
+        message_time: datetime,
+        future: asyncio.Future,
+    ):
+        self.chat_id = chat_id
+        self.amount = amount
+        self.currency = currency
+        self.original_amount = original_amount
+        self.message_id = message_id
+        self.message = message
+        self.trx_id = trx_id
+        self.sent_by = sent_by
+        self.message_time = message_time
+        self.income_date = DateUtils.now()
+        self.future = future
+
+
+class IncomeBatchWriter:
+    """
+    Buffers parsed bank notifications for a few milliseconds and writes them
+    to income_balance as one multi-row INSERT in a single transaction.
+
+    Callers still await one result per message via submit().
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = 0.005,
+        max_batch_size: int = 200,
+        registration_buffer: timedelta = timedelta(minutes=1),
+    ):
+        self.flush_interval = flush_interval
+        self.max_batch_size = max_batch_size
+        self.registration_buffer = registration_buffer
+        self._queue: asyncio.Queue[PendingIncome] | None = None
+        self._queue_loop: asyncio.AbstractEventLoop | None = None
+        self._worker: asyncio.Task | None = None
+
+    async def submit(
+        self,
+        chat_id: int,
+        amount: float,
+        currency: str,
+        original_amount: float,
+        message_id: int,
+        message: str,
+        trx_id: str | None,
+        sent_by: str | None,
+        message_time: datetime,
+    ) -> IncomeWriteStatus:
+        """Queue one income and wait until its batch is committed"""
+        self._ensure_worker()
+        assert self._queue is not None
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(
+            PendingIncome(
+                chat_id,
+                amount,
+                currency,
+                original_amount,
+                message_id,
+                message,
+                trx_id,
+                sent_by,
+                message_time,
+                future,
+            )
+        )
+        return await future
+
+    async def stop(self):
+        """Stop the background worker and write whatever is still queued"""
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        self._worker = None
+
+        remaining = []
+        while self._queue is not None and not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        if remaining:
+            await self._flush(remaining)
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._queue_loop is not loop:
+            self._queue = asyncio.Queue()
+            self._queue_loop = loop
+
+        if self._worker is None or self._worker.done():
+            if self._worker is not None and not self._worker.cancelled() and self._worker.exception():
+                force_log(f"Income batch worker died, restarting: {self._worker.exception()}", level="ERROR")
+            # Keep the queue: incomes queued before the worker died are still awaited
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+
+            try:
+                while len(batch) < self.max_batch_size:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            finally:
+                # Still write what was collected if we are being cancelled
+                await self._flush(batch)
+
+    async def _flush(self, batch: list[PendingIncome]):
+        started = perf_counter()
+        try:
+            statuses = await run_in_db_executor(self._write_batch, batch)
+        except Exception as e:
+            if len(batch) > 1:
+                # Write the rows one at a time so only the bad one fails
+                force_log(f"ERROR writing income batch of {len(batch)}, retrying row by row: {e}", level="ERROR")
+                for pending in batch:
+                    await self._flush([pending])
+                return
+            force_log(f"ERROR writing income message {batch[0].message_id}: {e}", level="ERROR")
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        INSERT_LATENCY.observe(perf_counter() - started)
+        committed_at = datetime.now(pytz.UTC)
+        for pending, status in zip(batch, statuses):
+            if status is IncomeWriteStatus.INSERTED and pending.message_time.tzinfo is not None:
+                END_TO_END_LATENCY.observe((committed_at - pending.message_time).total_seconds())
+            if not pending.future.done():
+                pending.future.set_result(status)
+
+    def _write_batch(self, batch: list[PendingIncome]) -> list[IncomeWriteStatus]:
+        statuses = self._write_rows(batch, row_by_row=False)
+        if statuses is None:
+            # Some rows were stored by a concurrent writer since the duplicate
+            # query, and a multi-row INSERT IGNORE does not say which
+            statuses = self._write_rows(batch, row_by_row=True)
+        return statuses  # type: ignore
+
+    def _write_rows(self, batch: list[PendingIncome], row_by_row: bool) -> list[IncomeWriteStatus] | None:
+        """Statuses per pending income, None if the batch has to be written row by row"""
+        statuses: list[IncomeWriteStatus | None] = [None] * len(batch)
+        chat_ids = {pending.chat_id for pending in batch}
+
+        with get_db_session() as db:
+            try:
+                chats = {
+                    chat.chat_id: chat
+                    for chat in db.query(Chat).filter(Chat.chat_id.in_(chat_ids)).all()
+                }
+
+                # Duplicates already stored, keyed the same way as the verification scheduler
+                keys = {(pending.chat_id, pending.message_id) for pending in batch}
+                existing = set(
+                    db.query(IncomeBalance.origin_chat_id, IncomeBalance.message_id)
+                    .filter(tuple_(IncomeBalance.origin_chat_id, IncomeBalance.message_id).in_(keys))
+                    .all()
+                )
+
+                accepted: list[tuple[int, PendingIncome]] = []
+                for index, pending in enumerate(batch):
+                    key = (pending.chat_id, pending.message_id)
+                    chat = chats.get(pending.chat_id)
+                    if not chat:
+                        statuses[index] = IncomeWriteStatus.CHAT_NOT_FOUND
+                    elif key in existing:
+                        statuses[index] = IncomeWriteStatus.DUPLICATE
+                    elif self._is_before_registration(chat, pending.message_time):
+                        statuses[index] = IncomeWriteStatus.BEFORE_REGISTRATION
+                    else:
+                        # Also catches the same message submitted twice within one batch
+                        existing.add(key)
+                        accepted.append((index, pending))
+
+                if accepted:
+                    shift_ids = self._resolve_shift_ids(
+                        db, [chats[pending.chat_id] for _, pending in accepted]
+                    )
+                    rows = []
+                    for _, pending in accepted:
+                        from_symbol = CurrencyEnum.from_symbol(pending.currency)
+                        rows.append(
+                            {
+                                "chat_id": pending.chat_id,
+                                "amount": pending.amount,
+                                "currency": from_symbol if from_symbol else pending.currency,
+                                "income_date": pending.income_date,
+                                "original_amount": pending.original_amount,
+                                "message_id": pending.message_id,
+                                "origin_chat_id": pending.chat_id,
+                                "message": pending.message,
+                                "trx_id": pending.trx_id,
+                                "shift_id": shift_ids.get(pending.chat_id),
+                                "sent_by": pending.sent_by,
+                            }
+                        )
+                    # IGNORE: the verification scheduler may have stored one of
+                    # these since the duplicate query above
+                    if row_by_row or len(rows) == 1:
+                        inserted = [self._insert_ignore(db, [row]) == 1 for row in rows]
+                    elif self._insert_ignore(db, rows) == len(rows):
+                        inserted = [True] * len(rows)
+                    else:
+                        force_log("Income batch: rows already stored by a concurrent writer, writing row by row")
+                        db.rollback()
+                        return None
+
+                    inserted_rows = [row for row, ok in zip(rows, inserted) if ok]
+                    IncomeRollupService.apply(db, inserted_rows)
+                    db.commit()
+                    for (index, _), ok in zip(accepted, inserted):
+                        statuses[index] = IncomeWriteStatus.INSERTED if ok else IncomeWriteStatus.DUPLICATE
+
+                force_log(
+                    f"Income batch written: {statuses.count(IncomeWriteStatus.INSERTED)} inserted out of {len(batch)} queued"
+                )
+                return statuses  # type: ignore
+            except Exception:
+                db.rollback()
+                raise
+
+    @staticmethod
+    def _insert_ignore(db, rows: list[dict]) -> int:
+        """INSERT IGNORE the rows, returns how many were actually inserted"""
+        result = db.execute(
+            insert(IncomeBalance)
+            .values(rows)
+            .prefix_with("IGNORE", dialect="mysql")
+            .prefix_with("OR IGNORE", dialect="sqlite")
+        )
+        return result.rowcount
+
+    @staticmethod
+    def _resolve_shift_ids(db, chats: list[Chat]) -> dict[int, int]:
+        """Get (or open) the current shift for every shift-enabled chat in the batch"""
+        shift_chat_ids = {chat.chat_id for chat in chats if chat.enable_shift}
+        if not shift_chat_ids:
+            return {}
+
+        shift_ids: dict[int, int] = {}
+        open_shifts = (
+            db.query(Shift.chat_id, Shift.id)
+            .filter(Shift.chat_id.in_(shift_chat_ids), Shift.is_closed == False)
+            .order_by(Shift.start_time.asc())
+            .all()
+        )
+        for chat_id, shift_id in open_shifts:
+            # Ascending order, so the latest open shift wins (same as ShiftService.get_current_shift)
+            shift_ids[chat_id] = shift_id
+
+        current_time = DateUtils.now()
+        for chat_id in shift_chat_ids - shift_ids.keys():
+            last_shift_number = (
+                db.query(func.max(Shift.number))
+                .filter(Shift.chat_id == chat_id, Shift.shift_date == current_time.date())
+                .scalar()
+                or 0
+            )
+            new_shift = Shift(
+                chat_id=chat_id,
+                shift_date=current_time.date(),
+                number=last_shift_number + 1,
+                start_time=current_time,
+                is_closed=False,
+            )
+            db.add(new_shift)
+            db.flush()
+            shift_ids[chat_id] = new_shift.id
+            force_log(f"Created new shift {new_shift.id} for chat {chat_id} while writing income batch")
+
+        return shift_ids
+
+    def _is_before_registration(self, chat: Chat, message_time: datetime) -> bool:
+        if message_time.tzinfo is None:
+            message_time = pytz.UTC.localize(message_time)
+
+        chat_created = chat.created_at
+        if chat_created.tzinfo is None:
+            chat_created = DateUtils.localize_datetime(chat_created)
+        chat_created_utc = chat_created.astimezone(pytz.UTC)
+
+        return message_time < chat_created_utc - self.registration_buffer
+
+
+# Shared by every Telethon client in the process so their messages batch together
+income_batch_writer = IncomeBatchWriter()
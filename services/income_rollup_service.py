@@ -0,0 +1,295 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session
+
+from config import get_db_session, db_executor
+from helper.logger_utils import force_log
+from models import IncomeBalance, IncomeChatVersion, IncomeDailyRollup, IncomeShiftRollup
+
+
+class IncomeRollupService:
+    """
+    Maintains income_daily_rollup and income_shift_rollup.
+
+    apply() is called with the rows of every income_balance insert, inside the
+    same session and before its commit, so the rollups never disagree with the
+    raw table. rebuild() recomputes them from income_balance for backfills and
+    repairs (see scripts/rebuild_income_rollups.py).
+
+    Every change also bumps the chats' row in income_chat_version in the same
+    transaction; report caches compare it to know their totals are current.
+    """
+
+    @staticmethod
+    def apply(db: Session, rows: list[dict]) -> None:
+        """Add freshly inserted income rows to the rollups (caller commits)"""
+        daily: dict[tuple, dict] = {}
+        shifts: dict[tuple, dict] = {}
+        for row in rows:
+            income_date = row["income_date"]
+            day_key = (row["chat_id"], income_date.date(), row["currency"])
+            IncomeRollupService._accumulate(daily, day_key, row)
+            if row.get("shift_id"):
+                shift_key = (row["shift_id"], row["currency"])
+                IncomeRollupService._accumulate(shifts, shift_key, row)
+
+        if daily:
+            IncomeRollupService._upsert(
+                db,
+                IncomeDailyRollup,
+                [
+                    {"day": day, "currency": currency, **totals}
+                    for (_, day, currency), totals in daily.items()
+                ],
+                ["chat_id", "day", "currency"],
+            )
+        if shifts:
+            IncomeRollupService._upsert(
+                db,
+                IncomeShiftRollup,
+                [
+                    {"shift_id": shift_id, "currency": currency, **totals}
+                    for (shift_id, currency), totals in shifts.items()
+                ],
+                ["shift_id", "currency"],
+            )
+        IncomeRollupService._bump_versions(db, {row["chat_id"] for row in rows})
+
+    @staticmethod
+    def _accumulate(buckets: dict[tuple, dict], key: tuple, row: dict):
+        totals = buckets.get(key)
+        if totals is None:
+            buckets[key] = {
+                "chat_id": row["chat_id"],
+                "total": row["amount"],
+                "count": 1,
+                "first_at": row["income_date"],
+                "last_at": row["income_date"],
+            }
+            return
+        totals["total"] += row["amount"]
+        totals["count"] += 1
+        totals["first_at"] = min(totals["first_at"], row["income_date"])
+        totals["last_at"] = max(totals["last_at"], row["income_date"])
+
+    @staticmethod
+    def _upsert(db: Session, model, values: list[dict], key_columns: list[str]):
+        table = model.__table__
+        dialect = db.get_bind().dialect.name
+        if dialect == "mysql":
+            statement = mysql.insert(table).values(values)
+            inserted = statement.inserted
+            statement = statement.on_duplicate_key_update(
+                total=table.c.total + inserted.total,
+                count=table.c.count + inserted.count,
+                first_at=func.least(table.c.first_at, inserted.first_at),
+                last_at=func.greatest(table.c.last_at, inserted.last_at),
+            )
+        elif dialect == "sqlite":
+            statement = sqlite.insert(table).values(values)
+            excluded = statement.excluded
+            statement = statement.on_conflict_do_update(
+                index_elements=key_columns,
+                set_={
+                    "total": table.c.total + excluded.total,
+                    "count": table.c.count + excluded.count,
+                    "first_at": func.min(table.c.first_at, excluded.first_at),
+                    "last_at": func.max(table.c.last_at, excluded.last_at),
+                },
+            )
+        else:
+            raise NotImplementedError(f"Income rollups are not supported on {dialect}")
+        db.execute(statement)
+
+    @staticmethod
+    def _bump_versions(db: Session, chat_ids: set[int]):
+        """Mark these chats' rollups as changed (caller commits)"""
+        if not chat_ids:
+            return
+        table = IncomeChatVersion.__table__
+        values = [{"chat_id": chat_id, "version": 1} for chat_id in sorted(chat_ids)]
+        dialect = db.get_bind().dialect.name
+        if dialect == "mysql":
+            statement = mysql.insert(table).values(values)
+            statement = statement.on_duplicate_key_update(version=table.c.version + 1)
+        elif dialect == "sqlite":
+            statement = sqlite.insert(table).values(values)
+            statement = statement.on_conflict_do_update(
+                index_elements=["chat_id"], set_={"version": table.c.version + 1}
+            )
+        else:
+            raise NotImplementedError(f"Income rollups are not supported on {dialect}")
+        db.execute(statement)
+
+    @staticmethod
+    @db_executor
+    def get_chat_version(chat_id: int) -> int:
+        """Current rollup version of a chat (0 until its first change)"""
+        with get_db_session() as db:
+            version = (
+                db.query(IncomeChatVersion.version)
+                .filter(IncomeChatVersion.chat_id == chat_id)
+                .scalar()
+            )
+        return version or 0
+
+    @staticmethod
+    def rebuild(
+        db: Session,
+        chat_id: int | None = None,
+        start_day: date | None = None,
+        end_day: date | None = None,
+        shift_ids: set[int] | None = None,
+    ) -> tuple[int, int]:
+        """
+        Recompute rollups from income_balance (caller commits).
+
+        Daily rows are rebuilt for chat_id (or every chat) with
+        start_day <= day < end_day; shift rows for shift_ids, or for every
+        shift of chat_id when shift_ids is None. Returns the number of
+        daily and shift rows written.
+        """
+        income_filters = []
+        if chat_id is not None:
+            income_filters.append(IncomeBalance.chat_id == chat_id)
+
+        daily_filters = list(income_filters)
+        daily_delete = db.query(IncomeDailyRollup)
+        if chat_id is not None:
+            daily_delete = daily_delete.filter(IncomeDailyRollup.chat_id == chat_id)
+        if start_day is not None:
+            daily_filters.append(IncomeBalance.income_date >= datetime.combine(start_day, time.min))
+            daily_delete = daily_delete.filter(IncomeDailyRollup.day >= start_day)
+        if end_day is not None:
+            daily_filters.append(IncomeBalance.income_date < datetime.combine(end_day, time.min))
+            daily_delete = daily_delete.filter(IncomeDailyRollup.day < end_day)
+        daily_delete.delete(synchronize_session=False)
+
+        day = func.date(IncomeBalance.income_date)
+        daily_rows = db.execute(
+            insert(IncomeDailyRollup).from_select(
+                ["chat_id", "day", "currency", "total", "count", "first_at", "last_at"],
+                select(
+                    IncomeBalance.chat_id,
+                    day,
+                    IncomeBalance.currency,
+                    func.sum(IncomeBalance.amount),
+                    func.count(IncomeBalance.id),
+                    func.min(IncomeBalance.income_date),
+                    func.max(IncomeBalance.income_date),
+                )
+                .where(*daily_filters)
+                .group_by(IncomeBalance.chat_id, day, IncomeBalance.currency),
+            )
+        ).rowcount
+
+        shift_filters = list(income_filters) + [IncomeBalance.shift_id.is_not(None)]
+        shift_delete = db.query(IncomeShiftRollup)
+        if chat_id is not None:
+            shift_delete = shift_delete.filter(IncomeShiftRollup.chat_id == chat_id)
+        if shift_ids is not None:
+            shift_filters.append(IncomeBalance.shift_id.in_(shift_ids))
+            shift_delete = shift_delete.filter(IncomeShiftRollup.shift_id.in_(shift_ids))
+        shift_delete.delete(synchronize_session=False)
+
+        shift_rows = db.execute(
+            insert(IncomeShiftRollup).from_select(
+                ["shift_id", "currency", "chat_id", "total", "count", "first_at", "last_at"],
+                select(
+                    IncomeBalance.shift_id,
+                    IncomeBalance.currency,
+                    func.min(IncomeBalance.chat_id),
+                    func.sum(IncomeBalance.amount),
+                    func.count(IncomeBalance.id),
+                    func.min(IncomeBalance.income_date),
+                    func.max(IncomeBalance.income_date),
+                )
+                .where(*shift_filters)
+                .group_by(IncomeBalance.shift_id, IncomeBalance.currency),
+            )
+        ).rowcount
+
+        if chat_id is not None:
+            IncomeRollupService._bump_versions(db, {chat_id})
+        else:
+            IncomeRollupService._bump_versions(
+                db,
+                {
+                    *(row_chat_id for (row_chat_id,) in db.query(IncomeDailyRollup.chat_id).distinct()),
+                    *(row_chat_id for (row_chat_id,) in db.query(IncomeChatVersion.chat_id)),
+                },
+            )
+
+        return daily_rows, shift_rows
+
+    @staticmethod
+    def merge_chat(db: Session, old_chat_id: int, new_chat_id: int) -> None:
+        """Move a migrated group's rollups onto its new chat id (caller commits)"""
+        daily = [
+            {
+                "chat_id": new_chat_id,
+                "day": rollup.day,
+                "currency": rollup.currency,
+                "total": rollup.total,
+                "count": rollup.count,
+                "first_at": rollup.first_at,
+                "last_at": rollup.last_at,
+            }
+            for rollup in db.query(IncomeDailyRollup).filter(IncomeDailyRollup.chat_id == old_chat_id)
+        ]
+        if daily:
+            # Added to any totals the new chat id already has for those days
+            IncomeRollupService._upsert(db, IncomeDailyRollup, daily, ["chat_id", "day", "currency"])
+            db.query(IncomeDailyRollup).filter(IncomeDailyRollup.chat_id == old_chat_id).delete(
+                synchronize_session=False
+            )
+
+        # Keyed by shift, so they cannot collide with the new chat's rows
+        db.query(IncomeShiftRollup).filter(IncomeShiftRollup.chat_id == old_chat_id).update(
+            {"chat_id": new_chat_id}, synchronize_session=False
+        )
+        IncomeRollupService._bump_versions(db, {old_chat_id, new_chat_id})
+
+    @staticmethod
+    def repair(db: Session, rows: list[dict]) -> None:
+        """Rebuild the rollups touched by rows whose insert outcome is unknown"""
+        days_by_chat: dict[int, list[date]] = {}
+        for row in rows:
+            days_by_chat.setdefault(row["chat_id"], []).append(row["income_date"].date())
+        shift_ids = {row["shift_id"] for row in rows if row.get("shift_id")}
+
+        for chat_id, days in days_by_chat.items():
+            IncomeRollupService.rebuild(
+                db,
+                chat_id=chat_id,
+                start_day=min(days),
+                end_day=max(days) + timedelta(days=1),
+                shift_ids=shift_ids,
+            )
+
+    @staticmethod
+    @db_executor
+    def rebuild_all(
+        chat_id: int | None = None,
+        start_day: date | None = None,
+        end_day: date | None = None,
+    ) -> tuple[int, int]:
+        """Backfill / repair command entry point, in its own transaction"""
+        with get_db_session() as db:
+            try:
+                daily_rows, shift_rows = IncomeRollupService.rebuild(
+                    db, chat_id=chat_id, start_day=start_day, end_day=end_day
+                )
+                db.commit()
+            except Exception as e:
+                force_log(f"ERROR rebuilding income rollups: {e}", "IncomeRollupService", "ERROR")
+                db.rollback()
+                raise e
+
+        force_log(
+            f"Rebuilt income rollups: {daily_rows} daily rows, {shift_rows} shift rows",
+            "IncomeRollupService",
+        )
+        return daily_rows, shift_rows
@@ -0,0 +1,147 @@
+from datetime import date, datetime, time, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import func
+
+from config import get_db_session, db_executor
+from helper import DateUtils
+from models import IncomeDailyRollup, IncomeShiftRollup
+from .report_cache import report_cache
+
+
+class IncomeAggregate(NamedTuple):
+    """One GROUP BY row: income of one currency within one bucket"""
+
+    bucket: date | int | None  # day, shift id, or None for a whole period
+    currency: str
+    total: float
+    count: int
+    first_at: datetime | None
+    last_at: datetime | None
+
+
+def _day_range(start_date: datetime, end_date: datetime) -> tuple[date, date]:
+    """Whole days covering start_date <= t < end_date, as a half-open day range"""
+    end_day = end_date.date()
+    if end_date.time() != time.min:
+        end_day += timedelta(days=1)
+    return start_date.date(), end_day
+
+
+class IncomeSummaryService:
+    """
+    Income totals read from the rollup tables.
+
+    Every method returns IncomeAggregate rows (currency, sum, count, first and
+    last income_date) instead of IncomeBalance objects. They come from
+    income_daily_rollup / income_shift_rollup, which IncomeRollupService keeps
+    in step with income_balance, so a report reads one row per day and
+    currency no matter how many transactions it covers. Date bounds are
+    widened to whole days, and the per-chat results are served from
+    report_cache while the chat's income version is unchanged.
+    """
+
+    @staticmethod
+    def _rollup_columns(model):
+        return (
+            model.currency,
+            func.sum(model.total),
+            func.sum(model.count),
+            func.min(model.first_at),
+            func.max(model.last_at),
+        )
+
+    @staticmethod
+    async def get_aggregates_by_day(
+        chat_id: int, start_date: datetime, end_date: datetime
+    ) -> list[IncomeAggregate]:
+        """Per day and currency totals for start_date <= income_date < end_date"""
+        start_day, end_day = _day_range(start_date, end_date)
+        return await report_cache.get_or_load(
+            chat_id, "by_day", start_day, end_day, IncomeSummaryService._load_aggregates_by_day
+        )
+
+    @staticmethod
+    @db_executor
+    def _load_aggregates_by_day(chat_id: int, start_day: date, end_day: date) -> list[IncomeAggregate]:
+        with get_db_session() as db:
+            rows = (
+                db.query(
+                    IncomeDailyRollup.day,
+                    IncomeDailyRollup.currency,
+                    IncomeDailyRollup.total,
+                    IncomeDailyRollup.count,
+                    IncomeDailyRollup.first_at,
+                    IncomeDailyRollup.last_at,
+                )
+                .filter(
+                    IncomeDailyRollup.chat_id == chat_id,
+                    IncomeDailyRollup.day >= start_day,
+                    IncomeDailyRollup.day < end_day,
+                )
+                .order_by(IncomeDailyRollup.day)
+                .all()
+            )
+        return [IncomeAggregate(*row) for row in rows]
+
+    @staticmethod
+    async def get_aggregates_for_date(chat_id: int, target_date: datetime) -> list[IncomeAggregate]:
+        """Per currency totals for the calendar day of target_date"""
+        day_start, day_end = DateUtils.local_day_range(target_date)
+        return await IncomeSummaryService.get_aggregates_by_day(chat_id, day_start, day_end)
+
+    @staticmethod
+    async def get_aggregates_for_period(
+        chat_id: int, start_date: datetime, end_date: datetime
+    ) -> list[IncomeAggregate]:
+        """Per currency totals for start_date <= income_date < end_date"""
+        start_day, end_day = _day_range(start_date, end_date)
+        return await report_cache.get_or_load(
+            chat_id, "period", start_day, end_day, IncomeSummaryService._load_aggregates_for_period
+        )
+
+    @staticmethod
+    @db_executor
+    def _load_aggregates_for_period(chat_id: int, start_day: date, end_day: date) -> list[IncomeAggregate]:
+        with get_db_session() as db:
+            rows = (
+                db.query(*IncomeSummaryService._rollup_columns(IncomeDailyRollup))
+                .filter(
+                    IncomeDailyRollup.chat_id == chat_id,
+                    IncomeDailyRollup.day >= start_day,
+                    IncomeDailyRollup.day < end_day,
+                )
+                .group_by(IncomeDailyRollup.currency)
+                .all()
+            )
+        return [
+            IncomeAggregate(None, currency, float(total), int(count), first_at, last_at)
+            for currency, total, count, first_at, last_at in rows
+        ]
+
+    @staticmethod
+    @db_executor
+    def get_aggregates_by_shift(
+        shift_ids: list[int], chat_id: int | None = None
+    ) -> list[IncomeAggregate]:
+        """Per shift and currency totals for the given shifts"""
+        if not shift_ids:
+            return []
+
+        with get_db_session() as db:
+            query = db.query(
+                IncomeShiftRollup.shift_id,
+                IncomeShiftRollup.currency,
+                IncomeShiftRollup.total,
+                IncomeShiftRollup.count,
+                IncomeShiftRollup.first_at,
+                IncomeShiftRollup.last_at,
+            ).filter(IncomeShiftRollup.shift_id.in_(shift_ids))
+            if chat_id is not None:
+                query = query.filter(IncomeShiftRollup.chat_id == chat_id)
+            rows = query.all()
+        return [IncomeAggregate(*row) for row in rows]
+
+
+def count_transactions(aggregates: list[IncomeAggregate]) -> int:
+    return sum(aggregate.count for aggregate in aggregates)
@@ -0,0 +1,156 @@
+import warnings
+from datetime import timedelta
+from enum import IntEnum
+from time import perf_counter
+from typing import Any, Awaitable, Callable, TypeVar
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from telethon.errors import FloodWaitError
+
+from helper.logger_utils import force_log
+from helper.rate_limiter import BotApiRateLimiter, get_bot_api_rate_limiter
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    """Send lanes, most urgent first"""
+
+    INTERACTIVE = 0  # replies to a user action
+    NOTIFICATION = 1  # one-off messages triggered by the system
+    BROADCAST = 2  # scheduled fan-out (shift summaries, expiry alerts)
+
+
+class OutboundDispatcher:
+    """
+    The one way a bot sends to Telegram.
+
+    Every request waits for its chat's token bucket and then for the bot's
+    global bucket, in both of which more urgent priorities are served first.
+    A RetryAfter pauses the chat's bucket (the global one for requests
+    without a chat), a FloodWaitError, which is account wide, pauses both;
+    the request is retried up to max_retries times. Delivery counters
+    per priority are kept for stats().
+    """
+
+    def __init__(self, name: str, limiter: BotApiRateLimiter, max_retries: int = 3):
+        self.name = name
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.metrics = {
+            priority.name.lower(): {
+                "sent": 0,
+                "failed": 0,
+                "retry_after": 0,
+                "wait_seconds": 0.0,
+                "max_wait_seconds": 0.0,
+            }
+            for priority in Priority
+        }
+
+    async def send(
+        self,
+        chat_id: int | None,
+        func: Callable[..., Awaitable[T]],
+        *args,
+        priority: Priority = Priority.INTERACTIVE,
+        **kwargs,
+    ) -> T:
+        """Call func(*args, **kwargs) once the limits allow; errors other than flood waits propagate"""
+        metrics = self.metrics[Priority(priority).name.lower()]
+        attempt = 0
+        while True:
+            started = perf_counter()
+            await self.limiter.acquire(chat_id, priority)
+            waited = perf_counter() - started
+            metrics["wait_seconds"] += waited
+            metrics["max_wait_seconds"] = max(metrics["max_wait_seconds"], waited)
+
+            try:
+                result = await func(*args, **kwargs)
+            except (RetryAfter, FloodWaitError) as e:
+                metrics["retry_after"] += 1
+                seconds = _retry_after_seconds(e)
+                self.limiter.on_retry_after(chat_id, seconds, global_limit=isinstance(e, FloodWaitError))
+                attempt += 1
+                if attempt > self.max_retries:
+                    metrics["failed"] += 1
+                    raise
+                force_log(
+                    f"{self.name}: flood limit for chat {chat_id}, retrying in {seconds:.0f}s "
+                    f"(attempt {attempt}/{self.max_retries})",
+                    "OutboundDispatcher",
+                    "WARNING",
+                )
+                continue
+            except Exception:
+                metrics["failed"] += 1
+                raise
+
+            metrics["sent"] += 1
+            self.limiter.global_bucket.on_success()
+            return result
+
+    def stats(self) -> dict[str, Any]:
+        return {"name": self.name, "limiter": self.limiter.stats(), "lanes": self.metrics}
+
+
+def _retry_after_seconds(error: Exception) -> float:
+    if isinstance(error, FloodWaitError):
+        return float(error.seconds) + 1
+    with warnings.catch_warnings():
+        # PTB 22 warns that retry_after will become a timedelta; both are handled
+        warnings.simplefilter("ignore")
+        retry_after = error.retry_after
+    if isinstance(retry_after, timedelta):
+        return retry_after.total_seconds() + 1
+    return float(retry_after) + 1
+
+
+class DispatcherRateLimiter(BaseRateLimiter[Priority]):
+    """
+    python-telegram-bot hook that sends every Bot API request of an
+    Application through an OutboundDispatcher.
+
+    Pass the priority as ``rate_limit_args`` (e.g.
+    ``bot.send_message(..., rate_limit_args=Priority.BROADCAST)``); requests
+    without one, such as handler replies, are interactive.
+    """
+
+    def __init__(self, dispatcher: OutboundDispatcher):
+        self.dispatcher = dispatcher
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        if not isinstance(chat_id, int):
+            chat_id = None  # @channel usernames and chat-less endpoints only use the global limit
+        return await self.dispatcher.send(
+            chat_id,
+            callback,
+            *args,
+            priority=rate_limit_args if rate_limit_args is not None else Priority.INTERACTIVE,
+            **kwargs,
+        )
+
+
+_dispatchers: dict[str, OutboundDispatcher] = {}
+
+
+def get_dispatcher(name: str) -> OutboundDispatcher:
+    """Get the shared dispatcher of one bot (one per bot token)"""
+    dispatcher = _dispatchers.get(name)
+    if dispatcher is None:
+        dispatcher = OutboundDispatcher(name, get_bot_api_rate_limiter(name))
+        _dispatchers[name] = dispatcher
+    return dispatcher
+
+
+def get_dispatcher_stats() -> list[dict[str, Any]]:
+    return [dispatcher.stats() for dispatcher in _dispatchers.values()]
@@ -1,12 +1,13 @@
 from typing import List
 
-from config.database_config import get_db_session
+from config import get_db_session, db_executor
 from models.chat_model import Chat
 from models.private_bot_group_binding_model import PrivateBotGroupBinding
 
 
 class PrivateBotGroupBindingService:
     @staticmethod
+    @db_executor
     def bind_group(private_chat_id: int, group_id: int) -> PrivateBotGroupBinding:
         """Bind a private chat to a group"""
         with get_db_session() as session:
@@ -29,6 +30,7 @@ class PrivateBotGroupBindingService:
             return binding
 
     @staticmethod
+    @db_executor
     def unbind_group(private_chat_id: int, group_id: int) -> bool:
         """Unbind a private chat from a group"""
         with get_db_session() as session:
@@ -44,6 +46,7 @@ class PrivateBotGroupBindingService:
             return False
 
     @staticmethod
+    @db_executor
     def get_bound_groups(private_chat_id: int) -> List[Chat]:
         """Get all groups bound to a private chat"""
         with get_db_session() as session:
@@ -59,6 +62,7 @@ class PrivateBotGroupBindingService:
             return groups
 
     @staticmethod
+    @db_executor
     def get_private_chats_for_group(group_id: int) -> List[int]:
         """Get all private chats bound to a specific group"""
         with get_db_session() as session:
@@ -69,6 +73,7 @@ class PrivateBotGroupBindingService:
             return [binding.private_chat_id for binding in bindings]
 
     @staticmethod
+    @db_executor
     def is_group_bound(private_chat_id: int, group_id: int) -> bool:
         """Check if a group is bound to a private chat"""
         with get_db_session() as session:
@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+from helper.logger_utils import force_log
+from helper.pdf_generator import PDFGenerator
+from helper.qr_generator import QRGenerator
+
+
+# Worker entry points: module level so the process pool can pickle them
+def render_wifi_png(wifi_name: str, wifi_password: str) -> bytes:
+    """Render the Wifi QR card and return it PNG encoded"""
+    qr_generator = QRGenerator()
+    image = qr_generator.generate_wifi_qr_with_text(wifi_name, wifi_password)
+    return qr_generator.image_to_bytes(image).getvalue()
+
+
+def render_wifi_pdf(wifi_name: str, png_bytes: bytes) -> bytes:
+    """Lay an already rendered Wifi QR card out on a PDF page"""
+    return PDFGenerator().create_wifi_qr_pdf_from_png(png_bytes, wifi_name).getvalue()
+
+
+def render_wifi_pdf_pages(pages: list[bytes]) -> bytes:
+    """Lay rendered Wifi QR cards out one per page of a single PDF"""
+    return PDFGenerator().create_multi_page_qr_pdf(pages).getvalue()
+
+
+def build_wifi_zip(cards: list[tuple[str, bytes]]) -> bytes:
+    """ZIP of (network name, PNG) cards, one uniquely named file per network"""
+    buffer = io.BytesIO()
+    used_names: set[str] = set()
+    # PNGs are already deflated; storing them keeps this to a copy
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archive:
+        for wifi_name, png_bytes in cards:
+            stem = "".join(c if c.isalnum() or c in "-_." else "_" for c in wifi_name) or "wifi"
+            filename, suffix = f"Wifi-QR-{stem}.png", 2
+            while filename in used_names:
+                filename, suffix = f"Wifi-QR-{stem}-{suffix}.png", suffix + 1
+            used_names.add(filename)
+            archive.writestr(filename, png_bytes)
+    return buffer.getvalue()
+
+
+class QRRenderService:
+    """
+    Renders Wifi QR cards and their PDFs off the event loop, with a cache.
+
+    Pillow drawing and ReportLab encoding run in a small process pool, so
+    a render never blocks the bots sharing the loop. Results are kept in an
+    LRU of PNG / PDF bytes bounded by total size and keyed by content
+    (SSID, SHA-256 of the password - or of the PNG for a PDF -,
+    QRGenerator.LAYOUT_VERSION), so repeat requests are answered without
+    rendering; concurrent identical requests share one render.
+    """
+
+    def __init__(self, max_workers: int | None = None, max_cache_bytes: int | None = None):
+        self.max_workers = max_workers or int(
+            os.getenv("QR_RENDER_WORKERS", str(min(4, os.cpu_count() or 1)))
+        )
+        self.max_cache_bytes = max_cache_bytes or int(
+            os.getenv("QR_CACHE_MAX_BYTES", str(32 * 1024 * 1024))
+        )
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[str, bytes] = OrderedDict()
+        self._cache_bytes = 0
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._executor: ProcessPoolExecutor | None = None
+
+    @staticmethod
+    def cache_key(kind: str, wifi_name: str, content: str | bytes) -> str:
+        """Key of a render; content (the password, or the PNG for a PDF) is only hashed"""
+        if isinstance(content, str):
+            content = content.encode()
+        content_hash = hashlib.sha256(content).hexdigest()
+        material = f"{kind}\0{wifi_name}\0{content_hash}\0{QRGenerator.LAYOUT_VERSION}"
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    async def render_wifi_png(self, wifi_name: str, wifi_password: str) -> bytes:
+        """PNG bytes of the Wifi QR card"""
+        key = self.cache_key("png", wifi_name, wifi_password)
+        return await self._get_or_render(key, render_wifi_png, wifi_name, wifi_password)
+
+    async def render_wifi_pdf(self, wifi_name: str, png_bytes: bytes) -> bytes:
+        """PDF bytes of a Wifi QR card rendered by render_wifi_png"""
+        key = self.cache_key("pdf", wifi_name, png_bytes)
+        return await self._get_or_render(key, render_wifi_pdf, wifi_name, png_bytes)
+
+    async def render_wifi_pngs(self, networks: list[tuple[str, str]]) -> list[bytes]:
+        """PNG bytes of many (name, password) networks, rendered in parallel on the pool"""
+        return list(await asyncio.gather(*(self.render_wifi_png(name, password) for name, password in networks)))
+
+    async def render_wifi_bulk_pdf(self, networks: list[tuple[str, str]]) -> bytes:
+        """One PDF with a page per network, in the given order"""
+        pages = await self.render_wifi_pngs(networks)
+        key = self.cache_key("bulk-pdf", "", b"".join(hashlib.sha256(page).digest() for page in pages))
+        return await self._get_or_render(key, render_wifi_pdf_pages, pages)
+
+    async def render_wifi_bulk_zip(self, networks: list[tuple[str, str]]) -> bytes:
+        """ZIP with a PNG per network"""
+        pages = await self.render_wifi_pngs(networks)
+        return build_wifi_zip([(name, page) for (name, _), page in zip(networks, pages)])
+
+    async def _get_or_render(self, key: str, render: Callable[..., bytes], *args) -> bytes:
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            return await asyncio.shield(in_flight)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await self._run(render, *args)
+            self._cache_put(key, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so an unshared failure is not reported as never awaited
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    async def _run(self, render: Callable[..., bytes], *args) -> bytes:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), render, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool once
+            force_log("QR render pool broken, restarting it", "QRRenderService", "WARNING")
+            self._executor = None
+            return await loop.run_in_executor(self._get_executor(), render, *args)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: the parent runs DB and logging threads that must not be forked
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _cache_get(self, key: str) -> bytes | None:
+        value = self._cache.get(key)
+        if value is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+        return value
+
+    def _cache_put(self, key: str, value: bytes):
+        if len(value) > self.max_cache_bytes:
+            return
+        previous = self._cache.pop(key, None)
+        if previous is not None:
+            self._cache_bytes -= len(previous)
+        self._cache[key] = value
+        self._cache_bytes += len(value)
+        while self._cache_bytes > self.max_cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "name": "qr_render",
+            "size": len(self._cache),
+            "bytes": self._cache_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "workers": self.max_workers,
+        }
+
+
+qr_render_service = QRRenderService()
@@ -0,0 +1,21 @@
+import os
+
+from helper.ttl_cache import TTLCache
+from models import Chat, GroupPackage
+
+# Other processes (bots vs. telethon listener) can change these rows too,
+# so entries also expire on their own
+REGISTRY_CACHE_TTL = float(os.getenv("REGISTRY_CACHE_TTL", "60"))
+
+# Chat rows keyed by Telegram chat_id
+chat_cache: TTLCache[Chat] = TTLCache("chat", REGISTRY_CACHE_TTL)
+
+# GroupPackage rows keyed by Telegram chat_id
+group_package_cache: TTLCache[GroupPackage] = TTLCache(
+    "group_package", REGISTRY_CACHE_TTL
+)
+
+
+def get_registry_cache_stats() -> list[dict]:
+    """Hit/miss counters for the chat and package caches"""
+    return [chat_cache.stats(), group_package_cache.stats()]
@@ -0,0 +1,85 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Awaitable, Callable, TypeVar
+
+from .income_rollup_service import IncomeRollupService
+
+V = TypeVar("V")
+
+REPORT_CACHE_MAX_ENTRIES = 4096
+
+
+class ReportSnapshotCache:
+    """
+    Report data keyed by (chat_id, kind, first day, end day), so repeated
+    taps on the same report button are answered without an aggregate query.
+
+    Incomes are written by the Telethon process while reports are read in the
+    bots process, so entries are checked against the chat's data version
+    (load_version, one primary key read) on every lookup instead of waiting
+    for an invalidation: an entry is served only while the version it was
+    loaded at is still current. The version is read before the load, so a
+    load that overlapped a write is stored under the old version and reloaded
+    on the next tap.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        load_version: Callable[[int], Awaitable[int]],
+        max_entries: int = REPORT_CACHE_MAX_ENTRIES,
+    ):
+        self.name = name
+        self.load_version = load_version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple, tuple[int, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def get_or_load(
+        self,
+        chat_id: int,
+        kind: str,
+        start_day: date,
+        end_day: date,
+        load: Callable[[int, date, date], Awaitable[list[V]]],
+    ) -> list[V]:
+        """Cached rows for start_day <= day < end_day, or load(chat_id, start_day, end_day)"""
+        key = (chat_id, kind, start_day, end_day)
+        version = await self.load_version(chat_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return list(entry[1])
+            self.misses += 1
+
+        rows = await load(chat_id, start_day, end_day)
+
+        with self._lock:
+            self._entries[key] = (version, tuple(rows))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return rows
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+
+report_cache = ReportSnapshotCache("report", IncomeRollupService.get_chat_version)
@@ -0,0 +1,134 @@
+import asyncio
+from collections import OrderedDict
+
+from telethon import TelegramClient
+
+from helper.logger_utils import force_log
+from helper.rate_limiter import TokenBucketRateLimiter
+
+# Bank / POS bots whose notifications are stored as income
+ALLOWED_BANK_BOTS = frozenset(
+    {
+        "ACLEDABankBot",
+        "PayWayByABA_bot",
+        "PLBITBot",
+        "CanadiaMerchant_bot",
+        "HLBCAM_Bot",
+        "vattanac_bank_merchant_prod_bot",
+        "CPBankBot",
+        "SathapanaBank_bot",
+        "chipmongbankpaymentbot",
+        "prasac_merchant_payment_bot",
+        "AMKPlc_bot",
+        "s7pos_bot",
+    }
+)
+
+# The message verification scheduler never recovered AMK notifications
+VERIFIED_BANK_BOTS = ALLOWED_BANK_BOTS - {"AMKPlc_bot"}
+
+
+class SenderCache:
+    """
+    sender_id -> username cache for Telethon listeners.
+
+    seed() resolves the allowed bank bots to their numeric ids once. After
+    that, is_allowed() is a plain integer set lookup, and usernames of other
+    senders are kept in a bounded LRU so get_sender() is only awaited the
+    first time a sender is seen.
+    """
+
+    def __init__(self, allowed_usernames: frozenset[str] = ALLOWED_BANK_BOTS, max_size: int = 2048):
+        self.allowed_usernames = allowed_usernames
+        self.max_size = max_size
+        self.allowed_ids: dict[int, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self._usernames: OrderedDict[int, str] = OrderedDict()
+        self._seed_lock: asyncio.Lock | None = None
+
+    @property
+    def is_seeded(self) -> bool:
+        """True once every allowed bot username has been resolved to an id"""
+        return len(self.allowed_ids) == len(self.allowed_usernames)
+
+    async def seed(self, client: TelegramClient, rate_limiter: TokenBucketRateLimiter | None = None):
+        """Resolve the allowed bank bot usernames to their ids"""
+        if self._seed_lock is None:
+            self._seed_lock = asyncio.Lock()
+
+        async with self._seed_lock:
+            resolved = set(self.allowed_ids.values())
+            for username in self.allowed_usernames - resolved:
+                try:
+                    if rate_limiter:
+                        entity = await rate_limiter.call(client.get_entity, username)
+                    else:
+                        entity = await client.get_entity(username)
+                    self.allowed_ids[entity.id] = username
+                except Exception as e:
+                    force_log(f"Could not resolve bank bot '{username}': {e}", "SenderCache", "WARNING")
+            force_log(
+                f"Resolved {len(self.allowed_ids)}/{len(self.allowed_usernames)} bank bots to sender ids",
+                "SenderCache",
+            )
+
+    def is_allowed(self, sender_id: int | None, usernames: frozenset[str] | None = None) -> bool | None:
+        """
+        Whether a sender is an allowed bank bot (one of usernames, if given).
+
+        Returns None when that cannot be decided without fetching the sender,
+        i.e. some allowed bot could not be resolved and the id is unknown.
+        """
+        if usernames is None:
+            usernames = self.allowed_usernames
+        if sender_id in self.allowed_ids:
+            return self.allowed_ids[sender_id] in usernames
+        if self.is_seeded or sender_id in self._usernames:
+            return self._usernames.get(sender_id) in usernames
+        return None
+
+    def get_username(self, sender_id: int | None) -> str | None:
+        if sender_id in self.allowed_ids:
+            self.hits += 1
+            return self.allowed_ids[sender_id]
+        username = self._usernames.get(sender_id)
+        if username is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._usernames.move_to_end(sender_id)
+        return username
+
+    def remember(self, sender_id: int | None, username: str):
+        if sender_id is None:
+            return
+        if username in self.allowed_usernames:
+            self.allowed_ids[sender_id] = username
+            return
+        self._usernames[sender_id] = username
+        self._usernames.move_to_end(sender_id)
+        if len(self._usernames) > self.max_size:
+            self._usernames.popitem(last=False)
+
+    async def resolve_username(self, message) -> str:
+        """Username of a message's sender, fetching the sender only on a cache miss"""
+        username = self.get_username(message.sender_id)
+        if username is None:
+            sender = await message.get_sender()
+            username = getattr(sender, "username", "") or ""
+            self.remember(message.sender_id, username)
+        return username
+
+    def stats(self) -> dict:
+        return {
+            "name": "sender",
+            "size": len(self._usernames) + len(self.allowed_ids),
+            "hits": self.hits,
+            "misses": self.misses,
+            "seeded": self.is_seeded,
+        }
+
+
+# Bot user ids are the same for every account, so all Telethon clients share one cache
+sender_cache = SenderCache()
@@ -1,9 +1,30 @@
-from config import get_db_session
+import json
+from typing import Callable
+
+from config import get_db_session, db_executor
+from helper.logger_utils import force_log
 from models import ShiftConfiguration
 
+# Called with a chat_id (from a DB worker thread) after its auto-close settings change
+_auto_close_listeners: list[Callable[[int], None]] = []
+
+
+def on_auto_close_settings_changed(listener: Callable[[int], None]):
+    """Register a callback for auto-close setting changes, e.g. the AutoCloseScheduler"""
+    _auto_close_listeners.append(listener)
+
+
+def _notify_auto_close_changed(chat_id: int):
+    for listener in _auto_close_listeners:
+        try:
+            listener(chat_id)
+        except Exception as e:
+            force_log(f"Auto-close listener failed for chat {chat_id}: {e}", "ShiftConfigurationService", "ERROR")
+
 
 class ShiftConfigurationService:
-    async def get_configuration(self, chat_id: int) -> ShiftConfiguration | None:
+    @db_executor
+    def get_configuration(self, chat_id: int) -> ShiftConfiguration | None:
         with get_db_session() as db:
             config = (
                 db.query(ShiftConfiguration)
@@ -13,16 +34,39 @@ class ShiftConfigurationService:
 
             return config
 
-    async def update_auto_close_settings(
+    @staticmethod
+    @db_executor
+    def get_auto_close_times_by_chat(chat_ids: list[int] | None = None) -> dict[int, list[str]]:
+        """auto_close_times of every chat with auto-close enabled (or of the given chats), one query"""
+        with get_db_session() as db:
+            query = db.query(ShiftConfiguration.chat_id, ShiftConfiguration.auto_close_times).filter(
+                ShiftConfiguration.auto_close_enabled == True
+            )
+            if chat_ids is not None:
+                query = query.filter(ShiftConfiguration.chat_id.in_(chat_ids))
+            rows = query.all()
+
+        times_by_chat = {}
+        for chat_id, auto_close_times in rows:
+            try:
+                times_by_chat[chat_id] = json.loads(auto_close_times) if auto_close_times else []
+            except (json.JSONDecodeError, TypeError):
+                times_by_chat[chat_id] = []
+        return times_by_chat
+
+    @db_executor
+    def update_auto_close_settings(
         self, chat_id: int, enabled: bool, auto_close_times: list[str] = []
     ) -> ShiftConfiguration | None:
         with get_db_session() as db:
-            config = await self.get_configuration(chat_id)
+            config = (
+                db.query(ShiftConfiguration)
+                .filter(ShiftConfiguration.chat_id == chat_id)
+                .first()
+            )
             if not config:
                 return None
 
-            # Refresh the object in this session
-            config = db.merge(config)
             config.auto_close_enabled = enabled
 
             # Set multiple auto close times
@@ -56,9 +100,11 @@ class ShiftConfigurationService:
 
             db.commit()
             db.refresh(config)
+            _notify_auto_close_changed(chat_id)
             return config
 
-    async def update_shift_preferences(
+    @db_executor
+    def update_shift_preferences(
         self,
         chat_id: int,
         shift_name_prefix: str | None = None,
@@ -66,11 +112,14 @@ class ShiftConfigurationService:
         timezone: str | None = None,
     ) -> ShiftConfiguration | None:
         with get_db_session() as db:
-            config = await self.get_configuration(chat_id)
+            config = (
+                db.query(ShiftConfiguration)
+                .filter(ShiftConfiguration.chat_id == chat_id)
+                .first()
+            )
             if not config:
                 return None
 
-            config = db.merge(config)
             if shift_name_prefix is not None:
                 config.shift_name_prefix = shift_name_prefix
             if reset_numbering_daily is not None:
@@ -82,7 +131,8 @@ class ShiftConfigurationService:
             db.refresh(config)
             return config
 
-    async def update_last_job_run(self, chat_id: int, job_run_time) -> None:
+    @db_executor
+    def update_last_job_run(self, chat_id: int, job_run_time) -> None:
         with get_db_session() as db:
             config = (
                 db.query(ShiftConfiguration)
@@ -3,16 +3,18 @@ from datetime import date
 
 from sqlalchemy import func
 
-from config import get_db_session
+from config import get_db_session, db_executor, run_in_db_executor
 from helper import force_log, DateUtils
 from models import Shift
+from .income_summary_service import IncomeAggregate, IncomeSummaryService
 
 
 class ShiftService:
     def __init__(self):
         # Lock to prevent race conditions when closing shifts
         self._close_shift_locks = {}
-    async def create_shift(self, chat_id: int) -> Shift:
+    @db_executor
+    def create_shift(self, chat_id: int) -> Shift:
         """Create a new shift starting now"""
         current_time = DateUtils.now()
 
@@ -41,7 +43,8 @@ class ShiftService:
             db.refresh(new_shift)
             return new_shift
 
-    async def get_current_shift(self, chat_id: int) -> Shift | None:
+    @db_executor
+    def get_current_shift(self, chat_id: int) -> Shift | None:
         """Get the current open shift (regardless of date)"""
         with get_db_session() as db:
             return (
@@ -51,10 +54,20 @@ class ShiftService:
                 .first()
             )
 
-    async def get_shift_by_id(self, shift_id: int) -> Shift | None:
+    @db_executor
+    def get_shift_by_id(self, shift_id: int) -> Shift | None:
         with get_db_session() as db:
             return db.query(Shift).filter(Shift.id == shift_id).first()
 
+    @db_executor
+    def get_shifts_by_ids(self, shift_ids: list[int]) -> dict[int, Shift]:
+        """Shifts by id, one query"""
+        if not shift_ids:
+            return {}
+        with get_db_session() as db:
+            shifts = db.query(Shift).filter(Shift.id.in_(shift_ids)).all()
+            return {shift.id: shift for shift in shifts}
+
     async def close_shift(self, shift_id: int) -> Shift | None:
         """Close a shift by setting end_time and is_closed"""
         current_time = DateUtils.now()
@@ -68,38 +81,47 @@ class ShiftService:
         
         async with lock:
             force_log(f"CLOSE_SHIFT: Acquired lock for shift_id {shift_id}")
-            
-            with get_db_session() as db:
-                shift = db.query(Shift).filter(Shift.id == shift_id).first()
-                if not shift:
-                    force_log(f"CLOSE_SHIFT: Shift {shift_id} not found")
-                    return None
-                    
-                if shift.is_closed:
-                    force_log(f"CLOSE_SHIFT: Shift {shift_id} is already closed at {shift.end_time}")
-                    return shift  # Return the already closed shift
-                    
-                # Double-check it's still open (race condition protection)
-                if shift.end_time is not None:
-                    force_log(f"CLOSE_SHIFT: Shift {shift_id} already has end_time {shift.end_time}, marking as closed")
-                    shift.is_closed = True
-                    db.commit()
-                    db.refresh(shift)
-                    return shift
-                    
-                force_log(f"CLOSE_SHIFT: Successfully closing shift {shift_id} (was open since {shift.start_time})")
-                shift.end_time = current_time
+
+            shift, closed_now = await run_in_db_executor(
+                self._close_shift_row, shift_id, current_time
+            )
+
+            # Clean up the lock after successful close to prevent memory leaks
+            if closed_now and shift_id in self._close_shift_locks:
+                del self._close_shift_locks[shift_id]
+
+            return shift
+
+    @staticmethod
+    def _close_shift_row(shift_id: int, current_time) -> tuple[Shift | None, bool]:
+        """Close the shift row; returns (shift, whether this call closed it)"""
+        with get_db_session() as db:
+            shift = db.query(Shift).filter(Shift.id == shift_id).first()
+            if not shift:
+                force_log(f"CLOSE_SHIFT: Shift {shift_id} not found")
+                return None, False
+
+            if shift.is_closed:
+                force_log(f"CLOSE_SHIFT: Shift {shift_id} is already closed at {shift.end_time}")
+                return shift, False  # Return the already closed shift
+
+            # Double-check it's still open (race condition protection)
+            if shift.end_time is not None:
+                force_log(f"CLOSE_SHIFT: Shift {shift_id} already has end_time {shift.end_time}, marking as closed")
                 shift.is_closed = True
                 db.commit()
                 db.refresh(shift)
-                
-                # Clean up the lock after successful close to prevent memory leaks
-                if shift_id in self._close_shift_locks:
-                    del self._close_shift_locks[shift_id]
-                
-                return shift
-
-    async def get_shifts_by_date_range(
+                return shift, False
+
+            force_log(f"CLOSE_SHIFT: Successfully closing shift {shift_id} (was open since {shift.start_time})")
+            shift.end_time = current_time
+            shift.is_closed = True
+            db.commit()
+            db.refresh(shift)
+            return shift, True
+
+    @db_executor
+    def get_shifts_by_date_range(
         self, chat_id: int, start_date: date, end_date: date
     ) -> list[Shift]:
         with get_db_session() as db:
@@ -114,7 +136,8 @@ class ShiftService:
                 .all()
             )
 
-    async def get_shifts_by_date(self, chat_id: int, shift_date: date) -> list[Shift]:
+    @db_executor
+    def get_shifts_by_date(self, chat_id: int, shift_date: date) -> list[Shift]:
         with get_db_session() as db:
             return (
                 db.query(Shift)
@@ -123,24 +146,25 @@ class ShiftService:
                 .all()
             )
 
-    async def get_shifts_by_end_date(self, chat_id: int, end_date: date) -> list[Shift]:
+    @db_executor
+    def get_shifts_by_end_date(self, chat_id: int, end_date: date) -> list[Shift]:
         """Get shifts that ended on a specific date (for admin bot)"""
+        day_start, day_end = DateUtils.local_day_range(end_date)
         with get_db_session() as db:
-            from sqlalchemy import func
-            
             return (
                 db.query(Shift)
                 .filter(
                     Shift.chat_id == chat_id,
-                    func.date(Shift.end_time) == end_date,
-                    Shift.end_time.is_not(None),  # Only closed shifts have end_time
+                    Shift.end_time >= day_start,  # Only closed shifts have end_time
+                    Shift.end_time < day_end,
                     Shift.is_closed == True
                 )
                 .order_by(Shift.number)
                 .all()
             )
 
-    async def get_recent_closed_shifts(
+    @db_executor
+    def get_recent_closed_shifts(
         self, chat_id: int, limit: int = 1
     ) -> list[Shift]:
         with get_db_session() as db:
@@ -154,40 +178,24 @@ class ShiftService:
 
     async def get_shift_income_summary(self, shift_id: int, chat_id: int) -> dict:
         """Get income summary for a specific shift and chat"""
-        with get_db_session() as db:
-            from models.income_balance_model import IncomeBalance
-
-            # Get all income records for this shift and chat
-            income_records = (
-                db.query(IncomeBalance)
-                .filter(
-                    IncomeBalance.shift_id == shift_id, IncomeBalance.chat_id == chat_id
-                )
-                .all()
-            )
-
-            if not income_records:
-                return {"total_amount": 0.0, "transaction_count": 0, "currencies": {}}
-
-            total_amount = sum(record.amount for record in income_records)
-            transaction_count = len(income_records)
-
-            # Group by currency
-            currencies = {}
-            for record in income_records:
-                currency = record.currency or "USD"
-                if currency not in currencies:
-                    currencies[currency] = {"amount": 0.0, "count": 0}
-                currencies[currency]["amount"] += record.amount
-                currencies[currency]["count"] += 1
-
-            return {
-                "total_amount": total_amount,
-                "transaction_count": transaction_count,
-                "currencies": currencies,
-            }
-
-    async def get_recent_dates_with_shifts(
+        aggregates = await IncomeSummaryService.get_aggregates_by_shift([shift_id], chat_id)
+        return self.build_shift_income_summary(aggregates)
+
+    @staticmethod
+    def build_shift_income_summary(aggregates: list[IncomeAggregate]) -> dict:
+        """Shape one shift's aggregates the way the shift report helpers expect"""
+        summary = {"total_amount": 0.0, "transaction_count": 0, "currencies": {}}
+        for aggregate in aggregates:
+            currency = aggregate.currency or "USD"
+            totals = summary["currencies"].setdefault(currency, {"amount": 0.0, "count": 0})
+            totals["amount"] += aggregate.total
+            totals["count"] += aggregate.count
+            summary["total_amount"] += aggregate.total
+            summary["transaction_count"] += aggregate.count
+        return summary
+
+    @db_executor
+    def get_recent_dates_with_shifts(
         self, chat_id: int, days: int = 3
     ) -> list[date]:
         """Get last N dates that have shifts"""
@@ -203,36 +211,40 @@ class ShiftService:
 
             return [d[0] for d in dates]
 
-    async def get_recent_end_dates_with_shifts(
+    @db_executor
+    def get_recent_end_dates_with_shifts(
         self, chat_id: int, days: int = 3
     ) -> list[date]:
         """Get last N dates based on shift end dates (for admin bot)"""
+        dates = []
         with get_db_session() as db:
-            from sqlalchemy import func
-            
-            dates = (
-                db.query(func.date(Shift.end_time))
-                .filter(
+            # One MAX(end_time) seek per date, each bounded by the start of the
+            # previous date found, instead of DISTINCT DATE(end_time) over all shifts
+            before = None
+            while len(dates) < days:
+                query = db.query(func.max(Shift.end_time)).filter(
                     Shift.chat_id == chat_id,
                     Shift.end_time.is_not(None),  # Only closed shifts have end_time
                     Shift.is_closed == True
                 )
-                .distinct()
-                .order_by(func.date(Shift.end_time).desc())
-                .limit(days)
-                .all()
-            )
-
-            return [d[0] for d in dates]
-
-    async def check_and_auto_close_shifts(self) -> list[dict]:
+                if before is not None:
+                    query = query.filter(Shift.end_time < before)
+                latest_end_time = query.scalar()
+                if latest_end_time is None:
+                    break
+                dates.append(latest_end_time.date())
+                before, _ = DateUtils.local_day_range(latest_end_time.date())
+
+        return dates
+
+    @db_executor
+    def check_and_auto_close_shifts(self) -> list[dict]:
         """Check all open shifts and auto-close them based on configuration"""
-        from models.shift_configuration_model import ShiftConfigurationService
+        from models.shift_configuration_model import ShiftConfiguration
         from datetime import datetime
 
         closed_shifts = []
         closed_shift_info = []
-        config_service = ShiftConfigurationService()
         current_time = DateUtils.now()
 
         # Track which chats we've processed to update their last_job_run
@@ -247,7 +259,11 @@ class ShiftService:
                 if shift.chat_id in processed_chats:
                     continue
 
-                config = await config_service.get_configuration(shift.chat_id)
+                config = (
+                    db.query(ShiftConfiguration)
+                    .filter(ShiftConfiguration.chat_id == shift.chat_id)
+                    .first()
+                )
                 if not config or not config.auto_close_enabled:
                     continue
 
@@ -269,16 +285,8 @@ class ShiftService:
                 processed_chats.add(shift.chat_id)
 
                 # Update last_job_run immediately to prevent race conditions
-                from models.shift_configuration_model import ShiftConfiguration
-
-                db_config = (
-                    db.query(ShiftConfiguration)
-                    .filter(ShiftConfiguration.chat_id == shift.chat_id)
-                    .first()
-                )
-                if db_config:
-                    db_config.last_job_run = current_time
-                    db.commit()
+                config.last_job_run = current_time
+                db.commit()
 
                 should_close = False
 
@@ -324,43 +332,112 @@ class ShiftService:
                     )
 
             if closed_shifts:
-                db.commit()
-                for shift in closed_shifts:
-                    db.refresh(shift)
-
-                # Create new shifts for each closed shift (same as manual close behavior)
-                for i, closed_shift in enumerate(closed_shifts):
-                    try:
-                        # Get the highest shift number for this chat for today (same logic as create_shift)
-                        last_shift_number = (
-                            db.query(func.max(Shift.number))
-                            .filter(
-                                Shift.chat_id == closed_shift.chat_id,
-                                Shift.shift_date == current_time.date(),
-                            )
-                            .scalar()
-                            or 0
-                        )
-
-                        # Create a new shift for this chat
-                        new_shift = Shift(
-                            chat_id=closed_shift.chat_id,
-                            shift_date=current_time.date(),
-                            number=last_shift_number + 1,
-                            start_time=current_time,
-                            is_closed=False,
-                        )
-                        db.add(new_shift)
-                        force_log(
-                            f"Auto-created new shift #{new_shift.number} for chat {closed_shift.chat_id} after closing shift #{closed_shift.number}"
-                        )
-                    except Exception as e:
-                        force_log(
-                            f"Error creating new shift after auto-close for chat {closed_shift.chat_id}: {e}",
-                            "ERROR",
-                        )
-
-                # Commit the new shifts
+                self._commit_auto_closed_shifts(db, closed_shifts, current_time)
+
+        return closed_shift_info
+
+    @staticmethod
+    def _commit_auto_closed_shifts(db, closed_shifts: list[Shift], current_time) -> None:
+        """Commit closed shifts and open the next shift for each chat (same as manual close)"""
+        db.commit()
+        for shift in closed_shifts:
+            db.refresh(shift)
+
+        # Create new shifts for each closed shift (same as manual close behavior)
+        for closed_shift in closed_shifts:
+            try:
+                # Get the highest shift number for this chat for today (same logic as create_shift)
+                last_shift_number = (
+                    db.query(func.max(Shift.number))
+                    .filter(
+                        Shift.chat_id == closed_shift.chat_id,
+                        Shift.shift_date == current_time.date(),
+                    )
+                    .scalar()
+                    or 0
+                )
+
+                # Create a new shift for this chat
+                new_shift = Shift(
+                    chat_id=closed_shift.chat_id,
+                    shift_date=current_time.date(),
+                    number=last_shift_number + 1,
+                    start_time=current_time,
+                    is_closed=False,
+                )
+                db.add(new_shift)
+                force_log(
+                    f"Auto-created new shift #{new_shift.number} for chat {closed_shift.chat_id} after closing shift #{closed_shift.number}"
+                )
+            except Exception as e:
+                force_log(
+                    f"Error creating new shift after auto-close for chat {closed_shift.chat_id}: {e}",
+                    "ERROR",
+                )
+
+        # Commit the new shifts
+        db.commit()
+
+    @db_executor
+    def auto_close_shifts_for_chats(self, chat_ids: list[int], close_time) -> list[dict]:
+        """
+        Close the open shift of each chat that started before close_time,
+        for chats whose auto-close is still enabled, in one transaction
+        """
+        from models.shift_configuration_model import ShiftConfiguration
+
+        current_time = DateUtils.now()
+        # start_time is stored as naive local time
+        close_time_local = close_time.astimezone(DateUtils.get_timezone()).replace(tzinfo=None)
+        closed_shifts = []
+        closed_shift_info = []
+
+        with get_db_session() as db:
+            enabled_chat_ids = {
+                chat_id
+                for (chat_id,) in db.query(ShiftConfiguration.chat_id).filter(
+                    ShiftConfiguration.chat_id.in_(chat_ids),
+                    ShiftConfiguration.auto_close_enabled == True,
+                )
+            }
+            if not enabled_chat_ids:
+                return []
+
+            open_shifts = (
+                db.query(Shift)
+                .filter(
+                    Shift.chat_id.in_(enabled_chat_ids),
+                    Shift.is_closed == False,
+                    Shift.start_time < close_time_local,
+                )
+                .order_by(Shift.start_time.desc())
+                .all()
+            )
+
+            closed_chat_ids = set()
+            for shift in open_shifts:
+                # One shift per chat, like check_and_auto_close_shifts
+                if shift.chat_id in closed_chat_ids:
+                    continue
+                closed_chat_ids.add(shift.chat_id)
+                shift.end_time = current_time
+                shift.is_closed = True
+                closed_shifts.append(shift)
+                closed_shift_info.append(
+                    {
+                        "id": shift.id,
+                        "chat_id": shift.chat_id,
+                        "number": shift.number,
+                    }
+                )
+
+            db.query(ShiftConfiguration).filter(
+                ShiftConfiguration.chat_id.in_(enabled_chat_ids)
+            ).update({"last_job_run": current_time}, synchronize_session=False)
+
+            if closed_shifts:
+                self._commit_auto_closed_shifts(db, closed_shifts, current_time)
+            else:
                 db.commit()
 
         return closed_shift_info
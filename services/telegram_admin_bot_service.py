@@ -13,6 +13,7 @@ from telegram.ext import (
 from handlers.bot_command_handler import EventHandler
 from helper.logger_utils import force_log
 from .handlers import ChatSearchHandler, MenuHandler, PackageHandler
+from .outbound_dispatcher import DispatcherRateLimiter, Priority, get_dispatcher
 
 # Conversation state codes
 PACKAGE_COMMAND_CODE = 1003
@@ -45,6 +46,7 @@ class TelegramAdminBot:
             "Please provide the chat ID by replying to this message."
         )
         self.telethon_client = None
+        self.dispatcher = get_dispatcher("admin_bot")
         
         # Initialize handlers
         self.chat_search_handler = ChatSearchHandler()
@@ -264,7 +266,12 @@ class TelegramAdminBot:
 
 
     def setup(self) -> None:
-        self.app = ApplicationBuilder().token(self.bot_token).build()
+        self.app = (
+            ApplicationBuilder()
+            .token(self.bot_token)
+            .rate_limiter(DispatcherRateLimiter(self.dispatcher))
+            .build()
+        )
 
         # Package command handler with multiple states
         package_handler = ConversationHandler(
@@ -364,20 +371,25 @@ class TelegramAdminBot:
         await self.app.updater.start_polling()  # type: ignore
         force_log("TelegramAdminBot started polling", "TelegramAdminBot")
 
-    async def send_message(self, chat_id: int, message: str) -> bool:
+    async def send_message(
+        self, chat_id: int, message: str, priority: Priority = Priority.NOTIFICATION
+    ) -> bool:
         """
         Send a message to a specific chat using the admin bot
         
         Args:
             chat_id: The chat ID to send the message to
             message: The message text to send
+            priority: Outbound dispatcher lane for the message
             
         Returns:
             bool: True if message was sent successfully, False otherwise
         """
         try:
             if self.app and self.app.bot:
-                await self.app.bot.send_message(chat_id=chat_id, text=message)
+                await self.app.bot.send_message(
+                    chat_id=chat_id, text=message, rate_limit_args=priority
+                )
                 force_log(f"Admin bot sent message to chat {chat_id}: {message[:50]}...", "TelegramAdminBot")
                 return True
             else:
@@ -17,6 +17,7 @@ from handlers.business_event_handler import BusinessEventHandler
 from helper import force_log
 from services import ChatService, UserService, GroupPackageService
 from services.private_bot_group_binding_service import PrivateBotGroupBindingService
+from services.outbound_dispatcher import DispatcherRateLimiter, Priority, get_dispatcher
 
 # Get logger
 logger = logging.getLogger(__name__)
@@ -41,6 +42,7 @@ class AutosumBusinessBot:
         self.user_service = UserService()
         self.event_handler = BusinessEventHandler()
         self.group_package_service = GroupPackageService()
+        self.dispatcher = get_dispatcher("business_bot")
         force_log("AutosumBusinessBot initialized with token", "AutosumBusinessBot")
 
     async def handle_reply_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -139,7 +141,7 @@ class AutosumBusinessBot:
         chat_id = int(update.effective_chat.id)
         chat = await self.chat_service.get_chat_by_chat_id(chat_id)
         if chat:
-            private_chats = PrivateBotGroupBindingService.get_private_chats_for_group(chat.id)
+            private_chats = await PrivateBotGroupBindingService.get_private_chats_for_group(chat.id)
         else:
             private_chats = None
         if private_chats:
@@ -561,7 +563,12 @@ class AutosumBusinessBot:
         if not self.bot_token:
             raise ValueError("Business bot token is required")
 
-        self.app = ApplicationBuilder().token(self.bot_token).build()
+        self.app = (
+            ApplicationBuilder()
+            .token(self.bot_token)
+            .rate_limiter(DispatcherRateLimiter(self.dispatcher))
+            .build()
+        )
 
         # Business-specific command handlers
         self.app.add_handler(CommandHandler("start", self.business_start))
@@ -649,11 +656,15 @@ class AutosumBusinessBot:
             force_log(f"Error starting AutosumBusinessBot: {e}", "AutosumBusinessBot")
             raise
 
-    async def send_message(self, chat_id: int, message: str) -> bool:
+    async def send_message(
+        self, chat_id: int, message: str, priority: Priority = Priority.NOTIFICATION
+    ) -> bool:
         """Send a message to a specific chat"""
         try:
             if self.app and self.app.bot:
-                await self.app.bot.send_message(chat_id=chat_id, text=message)
+                await self.app.bot.send_message(
+                    chat_id=chat_id, text=message, rate_limit_args=priority
+                )
                 return True
             else:
                 force_log("Bot application not initialized")
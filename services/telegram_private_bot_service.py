@@ -16,6 +16,7 @@ from services.chat_service import ChatService
 from services.group_package_service import GroupPackageService
 from services.handlers.menu_handler import MenuHandler
 from services.private_bot_group_binding_service import PrivateBotGroupBindingService
+from services.outbound_dispatcher import DispatcherRateLimiter, get_dispatcher
 
 # Conversation state codes for private bot
 START_MENU_CODE = 2000
@@ -34,6 +35,7 @@ class TelegramPrivateBot:
         self.chat_service = ChatService()
         self.group_package_service = GroupPackageService()
         self.menu_handler = MenuHandler()
+        self.dispatcher = get_dispatcher("private_bot")
         
         force_log("TelegramPrivateBot initialized with token", "TelegramPrivateBot")
 
@@ -109,7 +111,7 @@ class TelegramPrivateBot:
         """Start the list flow from start menu"""
         query = update.callback_query
         private_chat_id = update.effective_chat.id
-        bound_groups = self.binding_service.get_bound_groups(private_chat_id)
+        bound_groups = await self.binding_service.get_bound_groups(private_chat_id)
         
         if not bound_groups:
             keyboard = [[InlineKeyboardButton("🔗 Bind Group", callback_data="start_bind")]]
@@ -158,7 +160,7 @@ class TelegramPrivateBot:
         """Start the menu flow from start menu"""
         query = update.callback_query
         private_chat_id = update.effective_chat.id
-        bound_groups = self.binding_service.get_bound_groups(private_chat_id)
+        bound_groups = await self.binding_service.get_bound_groups(private_chat_id)
         
         if not bound_groups:
             keyboard = [
@@ -202,7 +204,7 @@ class TelegramPrivateBot:
         """Start the unbind flow from start menu"""
         query = update.callback_query
         private_chat_id = update.effective_chat.id
-        bound_groups = self.binding_service.get_bound_groups(private_chat_id)
+        bound_groups = await self.binding_service.get_bound_groups(private_chat_id)
         
         if not bound_groups:
             keyboard = [
@@ -320,7 +322,7 @@ class TelegramPrivateBot:
                     return ConversationHandler.END
                 
                 # Bind the group (use the database id for binding)
-                self.binding_service.bind_group(private_chat_id, group.id)
+                await self.binding_service.bind_group(private_chat_id, group.id)
                 
                 group_name = group.group_name or f"Group {group.chat_id}"
                 
@@ -340,7 +342,7 @@ class TelegramPrivateBot:
             private_chat_id = update.effective_chat.id
             
             # Bind the group
-            self.binding_service.bind_group(private_chat_id, chat.id)
+            await self.binding_service.bind_group(private_chat_id, chat.id)
             
             group_name = chat.group_name or f"Group {chat.chat_id}"
             
@@ -358,7 +360,7 @@ class TelegramPrivateBot:
     async def menu_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /menu command"""
         private_chat_id = update.effective_chat.id
-        bound_groups = self.binding_service.get_bound_groups(private_chat_id)
+        bound_groups = await self.binding_service.get_bound_groups(private_chat_id)
         
         if not bound_groups:
             await update.message.reply_text(
@@ -542,7 +544,7 @@ class TelegramPrivateBot:
             
             try:
                 # Get bound groups to find the group info by database ID
-                bound_groups = self.binding_service.get_bound_groups(private_chat_id)
+                bound_groups = await self.binding_service.get_bound_groups(private_chat_id)
                 group = next((g for g in bound_groups if g.id == group_id), None)
                 
                 if not group:
@@ -550,7 +552,7 @@ class TelegramPrivateBot:
                     return ConversationHandler.END
                 
                 # Unbind the group
-                self.binding_service.unbind_group(private_chat_id, group_id)
+                await self.binding_service.unbind_group(private_chat_id, group_id)
                 
                 group_name = group.group_name or f"Group {group.chat_id}"
                 
@@ -581,7 +583,12 @@ class TelegramPrivateBot:
 
     def setup(self):
         """Set up the bot handlers"""
-        self.app = ApplicationBuilder().token(self.bot_token).build()
+        self.app = (
+            ApplicationBuilder()
+            .token(self.bot_token)
+            .rate_limiter(DispatcherRateLimiter(self.dispatcher))
+            .build()
+        )
 
         # Main conversation handler that starts with /start
         main_handler = ConversationHandler(
@@ -7,6 +7,7 @@ from telethon import TelegramClient, events
 from handlers import EventHandler
 from models import User
 from services import UserService, ChatService
+from services.outbound_dispatcher import Priority, get_dispatcher
 from services.private_bot_group_binding_service import PrivateBotGroupBindingService
 
 # Use the logging configuration from main_bots_only.py
@@ -20,20 +21,26 @@ class TelegramBotService:
         self.event_handler = EventHandler()
         self.user_service = UserService()
         self.chat_service = ChatService()
+        self.dispatcher = get_dispatcher("standard_bot")
         
         logger.info("TelegramBotService initialized")
 
-    async def send_message_to_chat(self, chat_id: int, message: str):
+    async def send_message_to_chat(
+        self, chat_id: int, message: str, priority: Priority = Priority.NOTIFICATION
+    ):
         """
         Send a message to a specific chat
         
         Args:
             chat_id: The chat ID to send the message to
             message: The message text to send
+            priority: Outbound dispatcher lane for the message
         """
         try:
             if self.bot:
-                await self.bot.send_message(chat_id, message)
+                await self.dispatcher.send(
+                    chat_id, self.bot.send_message, chat_id, message, priority=priority
+                )
                 logger.info(f"Message sent to chat {chat_id}: {message[:50]}...")
             else:
                 logger.info("Bot is not initialized, cannot send message")
@@ -76,7 +83,7 @@ class TelegramBotService:
                 # Check if this group is bound to a private chat
                 chat = await self.chat_service.get_chat_by_chat_id(event.chat_id)
                 if chat:
-                    private_chats = PrivateBotGroupBindingService.get_private_chats_for_group(chat.id)
+                    private_chats = await PrivateBotGroupBindingService.get_private_chats_for_group(chat.id)
                 else:
                     private_chats = None
                 if private_chats:
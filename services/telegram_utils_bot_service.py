@@ -1,3 +1,8 @@
+import asyncio
+import csv
+import os
+import time
+
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import (
     ApplicationBuilder,
@@ -13,23 +18,63 @@ from telegram.ext import (
 from common.enums import QuestionType
 from helper.logger_utils import force_log
 from helper.pdf_generator import PDFGenerator
-from helper.qr_generator import QRGenerator
 from services.conversation_service import ConversationService
+from services.outbound_dispatcher import DispatcherRateLimiter, get_dispatcher
+from services.qr_render_service import qr_render_service
 
 # Conversation state codes for Utils bot
 START_MENU_CODE = 3000
 WIFI_NAME_CODE = 3001
 WIFI_PASSWORD_CODE = 3002
 PDF_OPTION_CODE = 3003
+WIFI_BULK_CODE = 3004
+BULK_FORMAT_CODE = 3005
+
+MAX_BULK_NETWORKS = int(os.getenv("QR_BULK_MAX_NETWORKS", "100"))
+MAX_BULK_FILE_BYTES = 256 * 1024
+
+
+def parse_wifi_networks(text: str) -> tuple[list[tuple[str, str]], list[int]]:
+    """
+    Parse one network per line as "name,password" (CSV quoting allowed; tab
+    or semicolon separated also work). A header row such as "ssid,password"
+    is skipped. Returns the networks and the line numbers that could not be
+    read.
+    """
+    lines = text.lstrip("\ufeff").splitlines()
+    first_line = next((line for line in lines if line.strip()), "")
+    if "\t" in first_line:
+        delimiter = "\t"
+    elif ";" in first_line and "," not in first_line:
+        delimiter = ";"
+    else:
+        delimiter = ","
+
+    networks: list[tuple[str, str]] = []
+    invalid_lines: list[int] = []
+    for line_number, row in enumerate(csv.reader(lines, delimiter=delimiter), start=1):
+        if not row or not "".join(row).strip():
+            continue
+        if not networks and not invalid_lines and row[0].strip().lower() in ("ssid", "name", "wifi name", "network"):
+            continue
+        if len(row) < 2 or not row[0].strip() or not row[1].strip():
+            invalid_lines.append(line_number)
+            continue
+        # Only the first separator splits; the password may contain it
+        networks.append((row[0].strip(), delimiter.join(row[1:]).strip()))
+    return networks, invalid_lines
 
 
 class TelegramUtilsBot:
     def __init__(self, bot_token: str):
         self.bot_token = bot_token
         self.app: Application | None = None
-        self.qr_generator = QRGenerator()
         self.pdf_generator = PDFGenerator()
+        self.qr_render_service = qr_render_service
         self.conversation_service = ConversationService()
+        self.dispatcher = get_dispatcher("utils_bot")
+        self.qr_session_ttl = int(os.getenv("QR_SESSION_TTL_SECONDS", "900"))
+        self._sweep_task: asyncio.Task | None = None
         
         force_log("TelegramUtilsBot initialized with token", "TelegramUtilsBot")
 
@@ -37,6 +82,7 @@ class TelegramUtilsBot:
         """Handle /start command - always show menu"""
         keyboard = [
             [InlineKeyboardButton("📶 Generate WIFI QR Code", callback_data="generate_wifi_qr")],
+            [InlineKeyboardButton("📑 Generate Many WIFI QR Codes", callback_data="generate_wifi_qr_bulk")],
             [InlineKeyboardButton("❌ Cancel", callback_data="close_conversation")]
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -74,6 +120,28 @@ class TelegramUtilsBot:
                 "Please 'Reply' to this message:"
             )
             return WIFI_NAME_CODE
+        elif query.data == "generate_wifi_qr_bulk":
+            chat_id = update.effective_chat.id if update.effective_chat else 0
+            thread_id = query.message.message_id if query.message else 0
+            context.user_data["thread_id"] = thread_id
+            
+            await self.conversation_service.save_question(
+                chat_id=chat_id,
+                thread_id=thread_id,
+                message_id=thread_id,
+                question_type=QuestionType.WIFI_BULK_INPUT
+            )
+            
+            await query.edit_message_text(
+                "📑 Let's generate wifi QR codes for many networks!\n\n"
+                "Send one network per line as: Wifi Name,Password\n"
+                "e.g.\n"
+                "Lobby,lobby-pass\n"
+                "Floor 2,floor2-pass\n\n"
+                f"Or send a CSV file with those two columns (up to {MAX_BULK_NETWORKS} networks).\n\n"
+                "Please 'Reply' to this message:"
+            )
+            return WIFI_BULK_CODE
         elif query.data == "close_conversation":
             await query.edit_message_text("Goodbye! Use /start anytime to generate Utils codes.")
             return ConversationHandler.END
@@ -180,16 +248,14 @@ class TelegramUtilsBot:
                 "⏳ Please wait..."
             )
             
-            # Generate Wifi QR code with text using utility class
-            final_img = self.qr_generator.generate_wifi_qr_with_text(wifi_name, wifi_password)
-            
-            # Convert to bytes for sending
-            bio = self.qr_generator.image_to_bytes(final_img)
+            # Render in the QR worker pool (or take it from the cache)
+            png_bytes = await self.qr_render_service.render_wifi_png(wifi_name, wifi_password)
             
-            # Store the QR image data for potential PDF generation
-            context.user_data["qr_image"] = final_img
+            # Keep only the compressed PNG for potential PDF generation;
+            # _sweep_expired_qr_sessions drops it if the user never answers
+            context.user_data["qr_png"] = png_bytes
+            context.user_data["qr_rendered_at"] = time.monotonic()
             context.user_data["wifi_name"] = wifi_name
-            context.user_data["wifi_password"] = wifi_password
             
             # Create keyboard with PDF option
             keyboard = [
@@ -203,7 +269,7 @@ class TelegramUtilsBot:
             
             # Send the QR code image
             await update.message.reply_photo(
-                photo=bio,
+                photo=png_bytes,
                 caption=f"📶 Wifi QR Code Generated!\n\n"
                        f"🏷️ Network: {wifi_name}\n"
                        f"🔐 Password: {'*' * len(wifi_password)}\n\n"
@@ -243,22 +309,22 @@ class TelegramUtilsBot:
     async def generate_pdf(self, query, context: ContextTypes.DEFAULT_TYPE):
         """Generate and send PDF version of the QR code using utility class"""
         try:
-            qr_image = context.user_data.get("qr_image")
+            png_bytes = context.user_data.get("qr_png")
             wifi_name = context.user_data.get("wifi_name", "")
             
-            if not qr_image:
+            if not png_bytes:
                 await query.edit_message_caption(
                     caption=f"{query.message.caption}\n\n❌ Error: QR code data not found."
                 )
                 return
             
-            # Generate PDF using utility class
-            pdf_buffer = self.pdf_generator.create_wifi_qr_pdf(qr_image, wifi_name)
+            # Build the PDF in the QR worker pool straight from the PNG
+            pdf_bytes = await self.qr_render_service.render_wifi_pdf(wifi_name, png_bytes)
             filename = self.pdf_generator.get_pdf_filename(wifi_name)
             
             # Send PDF document
             await query.message.reply_document(
-                document=pdf_buffer,
+                document=pdf_bytes,
                 filename=filename,
                 caption=f"📄 PDF version ready for printing! 🖨️"
             )
@@ -276,6 +342,143 @@ class TelegramUtilsBot:
                 caption=f"{query.message.caption}\n\n❌ Error generating PDF. Please try again."
             )
 
+    async def handle_wifi_bulk(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Handle a list of networks (message text or CSV document) and ask for the output format"""
+        chat_id = update.effective_chat.id if update.effective_chat else 0
+        
+        if not update.message.reply_to_message:
+            await update.message.reply_text(
+                "❌ Please reply to the wifi networks question. Use /start to begin again."
+            )
+            return ConversationHandler.END
+        
+        pending_question = await self.conversation_service.get_pending_question_by_message_id_and_type(
+            chat_id, update.message.reply_to_message.message_id, QuestionType.WIFI_BULK_INPUT
+        )
+        
+        if not pending_question or pending_question.question_type != QuestionType.WIFI_BULK_INPUT.value:
+            await update.message.reply_text(
+                "❌ No pending Wifi networks question found. Please use /start to begin."
+            )
+            return ConversationHandler.END
+        
+        document = update.message.document
+        if document:
+            if document.file_size and document.file_size > MAX_BULK_FILE_BYTES:
+                await update.message.reply_text(
+                    f"❌ The file is too large (max {MAX_BULK_FILE_BYTES // 1024} KB). Please reply with a smaller CSV file:"
+                )
+                return WIFI_BULK_CODE
+            telegram_file = await document.get_file()
+            text = (await telegram_file.download_as_bytearray()).decode("utf-8-sig", errors="replace")
+        else:
+            text = update.message.text or ""
+        
+        networks, invalid_lines = parse_wifi_networks(text)
+        
+        if invalid_lines or not networks:
+            details = f" (line {', '.join(str(n) for n in invalid_lines[:10])})" if invalid_lines else ""
+            await update.message.reply_text(
+                f"❌ Each line needs a Wifi name and a password separated by a comma{details}. "
+                "Please reply to the question again:"
+            )
+            return WIFI_BULK_CODE
+        
+        if len(networks) > MAX_BULK_NETWORKS:
+            await update.message.reply_text(
+                f"❌ Too many networks ({len(networks)}). Please send at most {MAX_BULK_NETWORKS}:"
+            )
+            return WIFI_BULK_CODE
+        
+        await self.conversation_service.mark_as_replied(chat_id, pending_question.thread_id, pending_question.message_id)
+        
+        context.user_data["bulk_networks"] = networks
+        context.user_data["qr_rendered_at"] = time.monotonic()
+        
+        keyboard = [
+            [InlineKeyboardButton("📄 One PDF (a page per network)", callback_data="bulk_pdf")],
+            [InlineKeyboardButton("🗂️ ZIP of images", callback_data="bulk_zip")],
+            [InlineKeyboardButton("❌ Cancel", callback_data="bulk_cancel")]
+        ]
+        await update.message.reply_text(
+            f"📶 {len(networks)} networks received:\n"
+            + "\n".join(f"• {name}" for name, _ in networks[:20])
+            + (f"\n… and {len(networks) - 20} more" if len(networks) > 20 else "")
+            + "\n\nChoose the format:",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        return BULK_FORMAT_CODE
+
+    async def handle_bulk_format(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Render every network of the list and send them as one PDF or a ZIP"""
+        query = update.callback_query
+        await query.answer()
+        
+        networks = context.user_data.get("bulk_networks")
+        if query.data == "bulk_cancel" or not networks:
+            await query.edit_message_text(
+                "Goodbye! Use /start anytime to generate Utils codes." if networks
+                else "❌ Error: Wifi networks not found. Please use /start to begin again."
+            )
+            context.user_data.clear()
+            return ConversationHandler.END
+        
+        try:
+            await query.edit_message_text(
+                f"🔧 Generating {len(networks)} Wifi QR codes...\n"
+                "⏳ Please wait..."
+            )
+            
+            if query.data == "bulk_zip":
+                document = await self.qr_render_service.render_wifi_bulk_zip(networks)
+                filename = "Wifi-QR-codes.zip"
+            else:
+                document = await self.qr_render_service.render_wifi_bulk_pdf(networks)
+                filename = "Wifi-QR-codes.pdf"
+            
+            await query.message.reply_document(
+                document=document,
+                filename=filename,
+                caption=f"📶 {len(networks)} Wifi QR codes ready! 🖨️"
+            )
+            await query.edit_message_text(
+                f"✅ {len(networks)} Wifi QR codes generated and sent! Use /start to generate more."
+            )
+            force_log(f"Bulk Wifi QR {filename} generated for {len(networks)} networks", "TelegramUtilsBot")
+            
+        except Exception as e:
+            force_log(f"Error generating bulk Wifi QR codes: {e}", "TelegramUtilsBot", "ERROR")
+            await query.edit_message_text(
+                "❌ Error generating QR codes. Please try again with /start"
+            )
+        
+        context.user_data.clear()
+        return ConversationHandler.END
+
+    def _evict_expired_qr_sessions(self) -> int:
+        """Drop QR images and network lists of conversations idle for longer than the TTL"""
+        if not self.app:
+            return 0
+        expires_before = time.monotonic() - self.qr_session_ttl
+        evicted = 0
+        for user_data in self.app.user_data.values():
+            rendered_at = user_data.get("qr_rendered_at")
+            if rendered_at is not None and rendered_at < expires_before:
+                user_data.clear()
+                evicted += 1
+        return evicted
+
+    async def _sweep_expired_qr_sessions(self):
+        interval = max(1, min(60, self.qr_session_ttl))
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                evicted = self._evict_expired_qr_sessions()
+                if evicted:
+                    force_log(f"Evicted {evicted} abandoned QR sessions", "TelegramUtilsBot")
+            except Exception as e:
+                force_log(f"Error sweeping QR sessions: {e}", "TelegramUtilsBot", "ERROR")
+
     async def cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Cancel command"""
         await update.message.reply_text("Operation cancelled. Use /start to begin again.")
@@ -285,7 +488,12 @@ class TelegramUtilsBot:
 
     def setup(self):
         """Set up the bot handlers"""
-        self.app = ApplicationBuilder().token(self.bot_token).build()
+        self.app = (
+            ApplicationBuilder()
+            .token(self.bot_token)
+            .rate_limiter(DispatcherRateLimiter(self.dispatcher))
+            .build()
+        )
 
         # Main conversation handler
         main_handler = ConversationHandler(
@@ -307,6 +515,16 @@ class TelegramUtilsBot:
                     CallbackQueryHandler(self.handle_pdf_option),
                     CommandHandler("start", self.start_command)
                 ],
+                WIFI_BULK_CODE: [
+                    MessageHandler(
+                        (filters.TEXT & ~filters.COMMAND) | filters.Document.ALL, self.handle_wifi_bulk
+                    ),
+                    CommandHandler("start", self.start_command)
+                ],
+                BULK_FORMAT_CODE: [
+                    CallbackQueryHandler(self.handle_bulk_format),
+                    CommandHandler("start", self.start_command)
+                ],
             },
             fallbacks=[CommandHandler("cancel", self.cancel)],
             per_chat=True,
@@ -327,4 +545,5 @@ class TelegramUtilsBot:
         await self.app.initialize()
         await self.app.start()
         await self.app.updater.start_polling()  # type: ignore
+        self._sweep_task = asyncio.create_task(self._sweep_expired_qr_sessions())
         force_log("TelegramUtilsBot started polling", "TelegramUtilsBot")
\ No newline at end of file
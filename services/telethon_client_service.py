@@ -1,18 +1,18 @@
 import asyncio
 import os
-from datetime import timedelta
 
-import pytz
 from telethon import TelegramClient, events
 from telethon.errors import PersistentTimestampInvalidError
 
 from common.enums import ServicePackage
-# Check if message was sent after chat registration (applies to all messages)
-from helper import DateUtils
-from helper import extract_amount_and_currency, extract_trx_id, extract_s7pos_amount_and_currency
+from helper import parse_bank_message
 from helper.logger_utils import force_log
+from helper.metrics import INCOME_WRITES, MESSAGES_RECEIVED, PARSE_FAILURES
+from helper.rate_limiter import TokenBucketRateLimiter, get_telethon_rate_limiter
 from schedulers import MessageVerificationScheduler
 from services import ChatService, IncomeService, UserService, GroupPackageService
+from services.income_batch_writer import income_batch_writer
+from services.sender_cache import ALLOWED_BANK_BOTS, sender_cache
 
 
 class TelethonClientService:
@@ -24,6 +24,7 @@ class TelethonClientService:
         self.user_service = UserService()
         self.group_package_service = GroupPackageService()
         self.mobile_number: str | None = None
+        self.rate_limiter: TokenBucketRateLimiter | None = None
 
     async def get_username_by_phone(self, phone_number: str) -> str | None:
         """
@@ -45,7 +46,7 @@ class TelethonClientService:
             
             # Try to resolve the user by phone number
             try:
-                user = await self.client.get_entity(f"+{clean_phone}")
+                user = await self._call_api(self.client.get_entity, f"+{clean_phone}")
                 if hasattr(user, 'username') and user.username:
                     force_log(f"Found username '{user.username}' for phone {phone_number}")
                     return user.username
@@ -55,7 +56,7 @@ class TelethonClientService:
             except Exception:
                 # Try without the plus sign if the first attempt failed
                 try:
-                    user = await self.client.get_entity(clean_phone)
+                    user = await self._call_api(self.client.get_entity, clean_phone)
                     if hasattr(user, 'username') and user.username:
                         force_log(f"Found username '{user.username}' for phone {phone_number}")
                         return user.username
@@ -70,11 +71,18 @@ class TelethonClientService:
             force_log(f"Error getting username by phone {phone_number}: {e}")
             return None
 
+    async def _call_api(self, func, *args, **kwargs):
+        """Run a Telegram API call under this account's rate limiter"""
+        if self.rate_limiter is None:
+            return await func(*args, **kwargs)
+        return await self.rate_limiter.call(func, *args, **kwargs)
+
     async def start(self, mobile, api_id, api_hash, is_primary: bool = False):
         session_file = f"{mobile}.session"
         
         # Store mobile number for use in register handler
         self.mobile_number = mobile
+        self.rate_limiter = get_telethon_rate_limiter(mobile)
 
         # Handle persistent timestamp errors by removing corrupted session
         try:
@@ -107,121 +115,63 @@ class TelethonClientService:
         scheduler_mobile = None if is_primary else mobile
 
         # Initialize and start the message verification scheduler
-        self.scheduler = MessageVerificationScheduler(self.client, scheduler_mobile)  # type: ignore
+        self.scheduler = MessageVerificationScheduler(self.client, scheduler_mobile, self.rate_limiter)  # type: ignore
         force_log("Starting message verification scheduler...")
 
+        # Resolve bank bot ids once so the listener can filter on sender_id
+        await sender_cache.seed(self.client, self.rate_limiter)  # type: ignore
+
         @self.client.on(events.NewMessage)  # type: ignore
         async def _new_message_listener(event):
-            force_log(f"=== NEW MESSAGE EVENT TRIGGERED ===")
-            force_log(f"Chat ID: {event.chat_id}, Message: '{event.message.text}'")
+            force_log(f"=== NEW MESSAGE EVENT TRIGGERED ===", level="DEBUG")
+            force_log(f"Chat ID: {event.chat_id}, Message: '{event.message.text}'", level="DEBUG")
 
             try:
-                sender = await event.get_sender()
-                # is_bot = getattr(sender, "bot", False)
-                username = getattr(sender, "username", "") or ""
+                # Only process messages from the allowed bank bots; a known
+                # sender_id is decided without fetching the sender
+                sender_id = event.message.sender_id
+                if sender_cache.is_allowed(sender_id) is False:
+                    force_log(f"Message from sender {sender_id} not in allowed list, ignoring.", level="DEBUG")
+                    return
 
-                # Only process messages from the specified bots
-                allowed_bots = {
-                    "ACLEDABankBot",
-                    "PayWayByABA_bot",
-                    "PLBITBot",
-                    "CanadiaMerchant_bot",
-                    "HLBCAM_Bot",
-                    "vattanac_bank_merchant_prod_bot",
-                    "CPBankBot",
-                    "SathapanaBank_bot",
-                    "chipmongbankpaymentbot",
-                    "prasac_merchant_payment_bot",
-                    "AMKPlc_bot",
-                    "s7pos_bot"
-                }
-                if username not in allowed_bots:
-                    force_log(f"Message from bot '{username}' not in allowed list, ignoring.")
+                username = await sender_cache.resolve_username(event.message)
+                if username not in ALLOWED_BANK_BOTS:
+                    force_log(f"Message from bot '{username}' not in allowed list, ignoring.", level="DEBUG")
                     return
+                MESSAGES_RECEIVED.inc(bot=username)
 
                 # Skip if no message text
                 if not event.message.text:
-                    force_log("No message text, skipping")
+                    force_log("No message text, skipping", level="DEBUG")
                     return
 
                 force_log(
-                    f"Processing message from chat {event.chat_id}: {event.message.text}"
+                    f"Processing message from chat {event.chat_id}: {event.message.text}", level="DEBUG"
                 )
                 
-                # Use specific parser based on sender bot
-                if username == "s7pos_bot":
-                    currency, amount = extract_s7pos_amount_and_currency(event.message.text)
-                else:
-                    currency, amount = extract_amount_and_currency(event.message.text)
-                    
+                # Parse with the sender bot's profile so only that bank's patterns run
+                currency, amount, trx_id = parse_bank_message(event.message.text, username)
                 message_id: int = event.message.id
-                trx_id: str | None = extract_trx_id(event.message.text)
 
                 force_log(
-                    f"Extracted: currency={currency}, amount={amount}, trx_id={trx_id}"
+                    f"Extracted: currency={currency}, amount={amount}, trx_id={trx_id}", level="DEBUG"
                 )
 
                 # Skip if no valid currency/amount (do this check early)
                 if not (currency and amount):
                     force_log(
-                        f"No valid currency/amount found in message: {event.message.text}"
-                    )
-                    return
-
-                force_log(f"Valid currency and amount found, checking duplicates...")
-
-                # Use comprehensive duplicate check (chat_id + trx_id + message_id)
-                is_duplicate = await self.service.check_duplicate_transaction(
-                    event.chat_id, trx_id, message_id
-                )
-                if is_duplicate:
-                    force_log(
-                        f"Duplicate transaction found for chat_id={event.chat_id}, trx_id={trx_id}, message_id={message_id}, skipping"
+                        f"No valid currency/amount found in message: {event.message.text}", level="DEBUG"
                     )
+                    PARSE_FAILURES.inc(bot=username)
                     return
 
-                force_log(f"No duplicates found - proceeding with income processing...")
-
-                # Get chat info to check registration timestamp
-                force_log(f"Getting chat info for chat_id: {event.chat_id}")
-                chat = await self.chat_service.get_chat_by_chat_id(event.chat_id)
-                if not chat:
-                    force_log(f"Chat {event.chat_id} not found in database!")
-                    return
-
-                force_log(f"Checking message timestamp vs chat registration timestamp")
-                # Get message timestamp (Telethon provides it as UTC datetime)
-                message_time = event.message.date
-                if message_time.tzinfo is None:
-                    message_time = pytz.UTC.localize(message_time)
-
-                # Convert chat created_at to UTC for comparison
-                chat_created = chat.created_at
-                if chat_created.tzinfo is None:
-                    chat_created = DateUtils.localize_datetime(chat_created)
-                chat_created_utc = chat_created.astimezone(pytz.UTC)
-
-                # Add a 1-minute buffer to handle any timestamp precision issues
-                chat_created_with_buffer = chat_created_utc - timedelta(minutes=1)
-                
+                # Duplicate check, chat lookup, registration-time check and insert
+                # all happen in the shared batch writer's single transaction
                 force_log(
-                    f"Message time: {message_time}, Chat created: {chat_created_utc} (with 5min buffer: {chat_created_with_buffer})"
-                )
-                # Ignore messages sent before chat registration (with buffer)
-                if message_time < chat_created_with_buffer:
-                    force_log(
-                        f"Ignoring message from {message_time} (before chat registration buffer at {chat_created_with_buffer})"
-                    )
-                    return
-
-                force_log(f"Message timestamp verified, proceeding to save income...")
-
-                # Let the income service handle shift creation automatically
-                force_log(
-                    f"Attempting to save income: chat_id={event.chat_id}, amount={amount}, currency={currency}"
+                    f"Queueing income: chat_id={event.chat_id}, amount={amount}, currency={currency}", level="DEBUG"
                 )
                 try:
-                    result = await self.service.insert_income(
+                    status = await income_batch_writer.submit(
                         event.chat_id,
                         amount,
                         currency,
@@ -229,24 +179,22 @@ class TelethonClientService:
                         message_id,
                         event.message.text,
                         trx_id,
-                        0,  # shift_id
-                        chat.enable_shift,  # enable_shift
                         username,  # sent_by
+                        event.message.date,
                     )
-                    force_log(
-                        f"Successfully saved income record with id={result.id} for message {message_id}"
-                    )
+                    force_log(f"Income write for message {message_id} in chat {event.chat_id}: {status.value}")
+                    INCOME_WRITES.inc(source="listener", status=status.value)
                 except Exception as income_error:
-                    force_log(f"ERROR saving income: {income_error}")
+                    force_log(f"ERROR saving income: {income_error}", level="ERROR")
                     import traceback
 
-                    force_log(f"Traceback: {traceback.format_exc()}")
+                    force_log(f"Traceback: {traceback.format_exc()}", level="ERROR")
 
             except Exception as e:
-                force_log(f"ERROR in message processing: {e}")
+                force_log(f"ERROR in message processing: {e}", level="ERROR")
                 import traceback
 
-                force_log(f"Traceback: {traceback.format_exc()}")
+                force_log(f"Traceback: {traceback.format_exc()}", level="ERROR")
 
         # Start command handler for private chats
         @self.client.on(events.NewMessage(pattern="/register_me"))  # type: ignore
@@ -1,19 +1,22 @@
-from config import get_db_session
+from config import get_db_session, db_executor
 from models import User
 
 
 class UserService:
-    async def get_user_by_identifier(self, identifier: str) -> User | None:
+    @db_executor
+    def get_user_by_identifier(self, identifier: str) -> User | None:
         with get_db_session() as db:
             user = db.query(User).filter(User.identifier == identifier).first()
             return user
 
-    async def get_user_by_username(self, username: str) -> User | None:
+    @db_executor
+    def get_user_by_username(self, username: str) -> User | None:
         with get_db_session() as db:
             user = db.query(User).filter(User.username == username).first()
             return user
 
-    async def create_user(self, sender) -> User:
+    @db_executor
+    def create_user(self, sender) -> User:
         with get_db_session() as db:
             existing_user = (
                 db.query(User)
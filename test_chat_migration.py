@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.pool import StaticPool
+
+from config import database_config
+from helper import DateUtils
+from models import BaseModel, Chat, IncomeBalance, IncomeDailyRollup
+from services import ChatService, IncomeService
+from services.income_batch_writer import IncomeBatchWriter, IncomeWriteStatus
+from services.income_rollup_service import IncomeRollupService
+from services.income_summary_service import IncomeSummaryService
+
+OLD_CHAT_ID = -100
+NEW_CHAT_ID = -1001000000100
+
+
+class TestChatMigration(unittest.TestCase):
+    """A group migrated to a supergroup restarts its message ids"""
+
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+        )
+        BaseModel.metadata.create_all(self.engine)
+        self.original_bind = database_config.SessionLocal.kw["bind"]
+        database_config.SessionLocal.configure(bind=self.engine)
+
+        with database_config.get_db_session() as db:
+            db.add(Chat(chat_id=OLD_CHAT_ID, group_name="Shop", is_active=True,
+                        created_at=datetime.now() - timedelta(days=1)))
+            db.commit()
+
+    def tearDown(self):
+        database_config.SessionLocal.configure(bind=self.original_bind)
+        self.engine.dispose()
+
+    @staticmethod
+    async def submit(writer: IncomeBatchWriter, chat_id: int, message_id: int, amount: float):
+        return await writer.submit(
+            chat_id, amount, "USD", amount, message_id, f"Received {amount} USD", None,
+            "PayWayByABA_bot", DateUtils.now(),
+        )
+
+    def test_restarted_message_ids_are_stored_after_migration(self):
+        async def scenario():
+            writer = IncomeBatchWriter()
+            try:
+                before = await self.submit(writer, OLD_CHAT_ID, 5, 10)
+                migrated = await ChatService.migrate_chat_id(OLD_CHAT_ID, NEW_CHAT_ID)
+                after = await self.submit(writer, NEW_CHAT_ID, 5, 7)
+                again = await self.submit(writer, NEW_CHAT_ID, 5, 7)
+            finally:
+                await writer.stop()
+            missing = await IncomeService().get_missing_message_ids(NEW_CHAT_ID, [5, 6])
+            now = DateUtils.now()
+            totals = await IncomeSummaryService.get_aggregates_for_period(
+                NEW_CHAT_ID, now - timedelta(days=1), now + timedelta(days=1)
+            )
+            return before, migrated, after, again, missing, totals
+
+        before, migrated, after, again, missing, totals = asyncio.run(scenario())
+        self.assertEqual(before, IncomeWriteStatus.INSERTED)
+        self.assertTrue(migrated)
+        self.assertEqual(after, IncomeWriteStatus.INSERTED)
+        self.assertEqual(again, IncomeWriteStatus.DUPLICATE)
+        self.assertEqual(missing, {6})
+        self.assertEqual([(t.total, t.count) for t in totals], [(17, 2)])
+
+    def test_rollups_merge_into_existing_totals_of_the_new_chat(self):
+        # The supergroup already received a message before the migration event
+        income_date = DateUtils.now().replace(tzinfo=None)
+        row = {
+            "chat_id": NEW_CHAT_ID, "origin_chat_id": NEW_CHAT_ID, "message_id": 1, "amount": 4.0,
+            "original_amount": 4.0, "currency": "USD", "message": "Received 4 USD", "income_date": income_date,
+        }
+        with database_config.get_db_session() as db:
+            db.execute(insert(IncomeBalance).values(row))
+            IncomeRollupService.apply(db, [row])
+            db.commit()
+
+        async def scenario():
+            writer = IncomeBatchWriter()
+            try:
+                await self.submit(writer, OLD_CHAT_ID, 5, 10)
+            finally:
+                await writer.stop()
+            migrated = await ChatService.migrate_chat_id(OLD_CHAT_ID, NEW_CHAT_ID)
+            return migrated
+
+        self.assertTrue(asyncio.run(scenario()))
+        with database_config.get_db_session() as db:
+            rollups = db.query(IncomeDailyRollup.chat_id, IncomeDailyRollup.total, IncomeDailyRollup.count).all()
+        self.assertEqual(rollups, [(NEW_CHAT_ID, 14, 2)])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
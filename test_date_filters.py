@@ -0,0 +1,155 @@
+import asyncio
+import unittest
+from datetime import date, datetime
+
+import pytz
+from sqlalchemy import create_engine, func
+from sqlalchemy.pool import StaticPool
+
+from config import database_config
+from helper import DateUtils
+from models import BaseModel, IncomeBalance, Shift
+from services import IncomeService, ShiftService
+
+CHAT_ID = -1001
+
+# income_date / end_time are stored as naive Asia/Phnom_Penh local time
+BOUNDARY_TIMES = [
+    datetime(2025, 7, 9, 23, 59, 59, 999999),
+    datetime(2025, 7, 10, 0, 0, 0),
+    datetime(2025, 7, 10, 0, 0, 0, 1),
+    datetime(2025, 7, 10, 12, 0, 0),
+    datetime(2025, 7, 10, 23, 59, 59),
+    datetime(2025, 7, 10, 23, 59, 59, 999999),
+    datetime(2025, 7, 11, 0, 0, 0),
+    datetime(2025, 12, 31, 23, 59, 59),
+    datetime(2026, 1, 1, 0, 0, 0),
+]
+
+TARGET_DATES = [date(2025, 7, 9), date(2025, 7, 10), date(2025, 7, 11), date(2025, 12, 31), date(2026, 1, 1)]
+
+
+class TestSargableDateFilters(unittest.TestCase):
+    """Half-open range filters must match the old func.date() == x predicates"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = create_engine(
+            "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+        )
+        BaseModel.metadata.create_all(cls.engine)
+        cls.original_bind = database_config.SessionLocal.kw["bind"]
+        database_config.SessionLocal.configure(bind=cls.engine)
+
+        with database_config.get_db_session() as db:
+            for message_id, moment in enumerate(BOUNDARY_TIMES, start=1):
+                db.add(
+                    IncomeBalance(
+                        chat_id=CHAT_ID,
+                        amount=message_id,
+                        currency="USD",
+                        original_amount=message_id,
+                        income_date=moment,
+                        message_id=message_id,
+                        message="",
+                    )
+                )
+                db.add(
+                    Shift(
+                        chat_id=CHAT_ID,
+                        shift_date=moment.date(),
+                        number=message_id,
+                        start_time=moment,
+                        end_time=moment,
+                        is_closed=True,
+                    )
+                )
+            db.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        database_config.SessionLocal.configure(bind=cls.original_bind)
+        cls.engine.dispose()
+
+    @staticmethod
+    def run_async(coroutine):
+        return asyncio.run(coroutine)
+
+    def test_local_day_range_naive(self):
+        start, end = DateUtils.local_day_range(datetime(2025, 7, 10, 23, 59, 59))
+        self.assertEqual(start, datetime(2025, 7, 10))
+        self.assertEqual(end, datetime(2025, 7, 11))
+        self.assertEqual(DateUtils.local_day_range(date(2025, 12, 31)), (datetime(2025, 12, 31), datetime(2026, 1, 1)))
+
+    def test_local_day_range_converts_aware_datetimes(self):
+        # 2025-07-10 18:30 UTC is already 2025-07-11 01:30 in Phnom Penh (UTC+7)
+        utc_evening = datetime(2025, 7, 10, 18, 30, tzinfo=pytz.utc)
+        start, end = DateUtils.local_day_range(utc_evening)
+        self.assertEqual(start, datetime(2025, 7, 11))
+        self.assertEqual(end, datetime(2025, 7, 12))
+        self.assertIsNone(start.tzinfo)
+
+        local_midnight = DateUtils.get_timezone().localize(datetime(2025, 7, 10, 0, 0))
+        self.assertEqual(DateUtils.local_day_range(local_midnight)[0], datetime(2025, 7, 10))
+
+    def expected_income_ids(self, target: date) -> list[int]:
+        with database_config.get_db_session() as db:
+            rows = (
+                db.query(IncomeBalance.message_id)
+                .filter(
+                    IncomeBalance.chat_id == CHAT_ID,
+                    func.date(IncomeBalance.income_date) == target.isoformat(),
+                )
+                .all()
+            )
+        return sorted(message_id for (message_id,) in rows)
+
+    def test_income_by_specific_date_matches_date_predicate(self):
+        income_service = IncomeService()
+        for target in TARGET_DATES:
+            with self.subTest(target=target):
+                rows = self.run_async(
+                    income_service.get_income_by_specific_date_and_chat_id(
+                        chat_id=CHAT_ID, target_date=datetime.combine(target, datetime.min.time())
+                    )
+                )
+                self.assertEqual(sorted(row.message_id for row in rows), self.expected_income_ids(target))
+                self.assertTrue(rows)
+
+    def test_last_yesterday_message_matches_date_predicate(self):
+        income_service = IncomeService()
+        for target in TARGET_DATES:
+            with self.subTest(target=target):
+                income = self.run_async(
+                    income_service.get_last_yesterday_message(datetime.combine(target, datetime.min.time()))
+                )
+                self.assertEqual(income.message_id, max(self.expected_income_ids(target)))
+
+    def expected_shift_numbers(self, target: date) -> list[int]:
+        with database_config.get_db_session() as db:
+            rows = (
+                db.query(Shift.number)
+                .filter(Shift.chat_id == CHAT_ID, func.date(Shift.end_time) == target.isoformat())
+                .order_by(Shift.number)
+                .all()
+            )
+        return [number for (number,) in rows]
+
+    def test_shifts_by_end_date_matches_date_predicate(self):
+        shift_service = ShiftService()
+        for target in TARGET_DATES:
+            with self.subTest(target=target):
+                shifts = self.run_async(shift_service.get_shifts_by_end_date(CHAT_ID, target))
+                self.assertEqual([shift.number for shift in shifts], self.expected_shift_numbers(target))
+
+    def test_recent_end_dates_matches_distinct_dates(self):
+        shift_service = ShiftService()
+        expected = sorted({moment.date() for moment in BOUNDARY_TIMES}, reverse=True)
+        for days in (1, 3, len(expected), len(expected) + 2):
+            with self.subTest(days=days):
+                dates = self.run_async(shift_service.get_recent_end_dates_with_shifts(CHAT_ID, days))
+                self.assertEqual(dates, expected[:days])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,113 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.pool import StaticPool
+
+from common.enums import IncomeWriteStatus
+from config import database_config
+from helper import DateUtils
+from models import BaseModel, Chat, IncomeBalance
+from services.income_batch_writer import IncomeBatchWriter, PendingIncome
+
+CHAT_ID = -100
+
+
+class TestIncomeBatchWriter(unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+        )
+        BaseModel.metadata.create_all(self.engine)
+        self.original_bind = database_config.SessionLocal.kw["bind"]
+        database_config.SessionLocal.configure(bind=self.engine)
+
+        with database_config.get_db_session() as db:
+            db.add(Chat(chat_id=CHAT_ID, group_name="Shop", is_active=True,
+                        created_at=datetime.now() - timedelta(days=1)))
+            db.commit()
+
+    def tearDown(self):
+        database_config.SessionLocal.configure(bind=self.original_bind)
+        self.engine.dispose()
+
+    @staticmethod
+    def row(message_id: int, amount: float):
+        return (CHAT_ID, amount, "USD", amount, message_id, f"Received {amount} USD", None,
+                "PayWayByABA_bot", DateUtils.now())
+
+    def write(self, rows):
+        async def scenario():
+            # Long flush interval so every row lands in one batch
+            writer = IncomeBatchWriter(flush_interval=0.2)
+            try:
+                return await asyncio.gather(*(writer.submit(*row) for row in rows), return_exceptions=True)
+            finally:
+                await writer.stop()
+
+        return asyncio.run(scenario())
+
+    def stored(self):
+        with database_config.get_db_session() as db:
+            return sorted(db.query(IncomeBalance.message_id, IncomeBalance.amount).all())
+
+    def test_bad_row_does_not_fail_its_batch(self):
+        original = IncomeBatchWriter._insert_ignore
+
+        def reject_message_2(db, rows):
+            if any(row["message_id"] == 2 for row in rows):
+                raise ValueError("bad row")
+            return original(db, rows)
+
+        with patch.object(IncomeBatchWriter, "_insert_ignore", side_effect=reject_message_2):
+            results = self.write([self.row(1, 10), self.row(2, 20), self.row(3, 5)])
+
+        self.assertEqual(results[0], IncomeWriteStatus.INSERTED)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], IncomeWriteStatus.INSERTED)
+        self.assertEqual(self.stored(), [(1, 10), (3, 5)])
+
+    def test_rows_stored_concurrently_are_reported_as_duplicates(self):
+        original = IncomeBatchWriter._insert_ignore
+
+        def insert_after_concurrent_writer(db, rows):
+            if len(rows) > 1:
+                # The verification scheduler stores message 2 after the duplicate query
+                db.execute(insert(IncomeBalance).values(
+                    chat_id=CHAT_ID, origin_chat_id=CHAT_ID, message_id=2, amount=99, original_amount=99,
+                    currency="USD", message="recovered", income_date=DateUtils.now().replace(tzinfo=None),
+                ))
+                db.commit()
+            return original(db, rows)
+
+        with patch.object(IncomeBatchWriter, "_insert_ignore", side_effect=insert_after_concurrent_writer):
+            results = self.write([self.row(1, 10), self.row(2, 20), self.row(3, 5)])
+
+        self.assertEqual(
+            results, [IncomeWriteStatus.INSERTED, IncomeWriteStatus.DUPLICATE, IncomeWriteStatus.INSERTED]
+        )
+        self.assertEqual(self.stored(), [(1, 10), (2, 99), (3, 5)])
+
+    def test_queued_incomes_survive_a_worker_restart(self):
+        async def scenario():
+            writer = IncomeBatchWriter()
+            try:
+                await writer.submit(*self.row(1, 10))
+                writer._worker.cancel()
+                await asyncio.gather(writer._worker, return_exceptions=True)
+                # Queued while the worker was down
+                orphan = asyncio.get_running_loop().create_future()
+                writer._queue.put_nowait(PendingIncome(*self.row(2, 20), orphan))
+                restarted = await writer.submit(*self.row(3, 5))
+                return await orphan, restarted
+            finally:
+                await writer.stop()
+
+        self.assertEqual(asyncio.run(scenario()), (IncomeWriteStatus.INSERTED, IncomeWriteStatus.INSERTED))
+        self.assertEqual(self.stored(), [(1, 10), (2, 20), (3, 5)])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,6 +1,12 @@
 import unittest
 
-from helper.message_parser import extract_amount_and_currency, extract_trx_id
+from helper.message_parser import (
+    BANK_PROFILES,
+    DEFAULT_PROFILE,
+    extract_amount_and_currency,
+    extract_trx_id,
+    parse_bank_message,
+)
 
 
 class TestMessageParser(unittest.TestCase):
@@ -209,6 +215,118 @@ Hash: 74f576d0""", '$', 16.0)
                 self.assertEqual(amount, expected_amount)
                 self.assertEqual(trx_id, expected_trx_id)
 
+    def test_parse_bank_message_with_sender_profile(self):
+        """Test single-pass parsing with the sender bot's profile"""
+        test_cases = [
+            ("PayWayByABA_bot",
+             "៛6,500 ត្រូវបានបង់ដោយ CHHE SOKHEAP (*503) នៅថ្ងៃទី 9 ខែកក្កដា ឆ្នាំ 2025 ម៉ោង 16:14 តាម ABA PAY នៅ LONGVEK by K.PHA។ លេខប្រតិបត្តិការ: 175205247086840។ APV: 773843។",
+             '៛', 6500, '175205247086840'),
+            ("PayWayByABA_bot",
+             "10.00 USD was paid to your account: INCOME TENGLAY DEPOT 698594011 on 09 JUL 2025 at 16:01:59 from  Advanced Bank of Asia Ltd. Acc: SAPUTHY KIM 001XXXXXXXX3633 with Ref: FT25190GHKVC, Txn Hash: b117ffd9",
+             '$', 10.0, 'b117ffd9'),
+            ("ACLEDABankBot",
+             "Received 5,500 KHR from 010 574 279 Pen Chamnab, 10-Jul-2025 07:50AM. Ref.ID: 51910666401, at MIK YEK NEA.",
+             '៛', 5500, '51910666401'),
+            ("CanadiaMerchant_bot",
+             "លោកអ្នកបានទទួលប្រាក់ចំនួន 23.25 ដុល្លារ  ពីឈ្មោះ PANH BORA ធនាគារ Canadia Bank Plc តាមការស្កេន  KHQR ថ្ងៃទី ១២ កក្កដា ២០២៥​ ម៉ោង ០៩:០៧ល្ងាច នៅ អាហារដ្ឋានសុនិសា168, SMART-PAY:00060050180 (Hash. 6c648d8",
+             '$', 23.25, '6c648d8'),
+            ("vattanac_bank_merchant_prod_bot",
+             "USD 16.00 is paid by CHANTARY MUNY (ABA Bank) via KHQR on 08/07/2025 07:49 PM at HOUSE 59 BY S.MEL",
+             '$', 16.0, None),
+            ("SathapanaBank_bot",
+             "The amount 10.50 USD is paid from TIA PHALLA, ACLEDA Bank Plc., Bill No.: 52081784162 | KHQR on 2025-07-27 11.33.00 AM with Transaction ID: 099QORT252080682, Hash: bf3c3602, Shop-name: Dariya Restaurant",
+             '$', 10.5, '099QORT252080682'),
+            ("s7pos_bot", "វិក្កយបត្រ #12\nសរុបចុងក្រោយ: 63.00 $", '$', 63.0, None),
+            ("s7pos_bot", "Subtotal: $ 70.00", None, None, None),
+            ("UnknownBot", "QRPay: Received KHR 22900.00 on Jul 10, 2025 07:04:44 AM paid by SAMAN LY with Transaction Hash: 371f33fe.",
+             '៛', 22900.0, '371f33fe'),
+            (None, "", None, None, None),
+        ]
+
+        for sender, message, expected_currency, expected_amount, expected_trx_id in test_cases:
+            with self.subTest(sender=sender, message=message):
+                currency, amount, trx_id = parse_bank_message(message, sender)
+                self.assertEqual(currency, expected_currency)
+                self.assertEqual(amount, expected_amount)
+                self.assertEqual(trx_id, expected_trx_id)
+
+    def test_parse_bank_message_without_sender(self):
+        """Test parsing each bank's notifications when the sender is unknown"""
+        test_cases = [
+            # ABA
+            ("៛6,500 ត្រូវបានបង់ដោយ CHHE SOKHEAP (*503) នៅថ្ងៃទី 9 ខែកក្កដា ឆ្នាំ 2025 ម៉ោង 16:14 តាម ABA PAY នៅ LONGVEK by K.PHA។ លេខប្រតិបត្តិការ: 175205247086840។ APV: 773843។",
+             '៛', 6500, '175205247086840'),
+            ("10.00 USD was paid to your account: INCOME TENGLAY DEPOT 698594011 on 09 JUL 2025 at 17:11:40 from  Advanced Bank of Asia Ltd. Acc: THAVY HONG 001XXXXXXXX2169 with Ref: FT25190WZFTL, Txn Hash: cba162a9",
+             '$', 10.0, 'cba162a9'),
+            # ACLEDA
+            ("លោកអ្នកបានទទួលប្រាក់ចំនួន 11,500 រៀល ពីឈ្មោះ SAREACH YUN", '៛', 11500.0, None),
+            ("Received 1.38 USD from 015 738 813 Mom Soman, 09-Jul-2025 03:08PM. Ref.ID: 51903055598, at MIK YEK NEA.",
+             '$', 1.38, '51903055598'),
+            # Canadia
+            ("លោកអ្នកបានទទួលប្រាក់ចំនួន 23.25 ដុល្លារ  ពីឈ្មោះ PANH BORA ធនាគារ Canadia Bank Plc តាមការស្កេន  KHQR ថ្ងៃទី ១២ កក្កដា ២០២៥​ ម៉ោង ០៩:០៧ល្ងាច នៅ អាហារដ្ឋានសុនិសា168, SMART-PAY:00060050180 (Hash. 6c648d8",
+             '$', 23.25, '6c648d8'),
+            # Vattanac
+            ("USD 16.00 is paid by CHANTARY MUNY (ABA Bank) via KHQR on 08/07/2025 07:49 PM at HOUSE 59 BY S.MEL",
+             '$', 16.0, None),
+            # Sathapana
+            ("The amount 10.50 USD is paid from TIA PHALLA, ACLEDA Bank Plc., Bill No.: 52081784162 | KHQR on 2025-07-27 11.33.00 AM with Transaction ID: 099QORT252080682, Hash: bf3c3602, Shop-name: Dariya Restaurant",
+             '$', 10.5, '099QORT252080682'),
+            # QRPay
+            ("QRPay: Received KHR 22900.00 on Jul 10, 2025 07:04:44 AM paid by SAMAN LY with Transaction Hash: 371f33fe.",
+             '៛', 22900.0, '371f33fe'),
+            ("Invalid amount: $ abc", None, None, None),
+            ("This is just a regular message", None, None, None),
+        ]
+
+        for message, expected_currency, expected_amount, expected_trx_id in test_cases:
+            with self.subTest(message=message):
+                currency, amount, trx_id = parse_bank_message(message)
+                self.assertEqual(currency, expected_currency)
+                self.assertEqual(amount, expected_amount)
+                self.assertEqual(trx_id, expected_trx_id)
+
+    def test_bank_profiles_keep_the_default_rule_order(self):
+        """Test every profile runs a subset of the default cascade in its order"""
+        for sender, profile in BANK_PROFILES.items():
+            if not profile.fallback:
+                continue
+            with self.subTest(sender=sender):
+                self.assertEqual(
+                    profile.amount_rules, DEFAULT_PROFILE.amount_rules[:len(profile.amount_rules)]
+                )
+                self.assertEqual(
+                    list(profile.trx_rules),
+                    [name for name in DEFAULT_PROFILE.trx_rules if name in profile.trx_rules],
+                )
+
+    def test_bank_profiles_match_the_default_cascade(self):
+        """Test each sender's profile gives the same result as the default cascade"""
+        messages = [
+            "៛6,500 ត្រូវបានបង់ដោយ CHHE SOKHEAP (*503) នៅថ្ងៃទី 9 ខែកក្កដា ឆ្នាំ 2025 ម៉ោង 16:14 តាម ABA PAY នៅ LONGVEK by K.PHA។ លេខប្រតិបត្តិការ: 175205247086840។ APV: 773843។",
+            "៛6,500 Trx. ID: 55 លេខប្រតិបត្តិការ: 66",
+            "10.00 USD was paid to your account: INCOME TENGLAY DEPOT 698594011 on 09 JUL 2025 at 16:01:59 from  Advanced Bank of Asia Ltd. Acc: SAPUTHY KIM 001XXXXXXXX3633 with Ref: FT25190GHKVC, Txn Hash: b117ffd9",
+            "លោកអ្នកបានទទួលប្រាក់ចំនួន 11,500 រៀល ពីឈ្មោះ SAREACH YUN លេខយោង 987654",
+            "Received 1.38 USD from 015 738 813 Mom Soman, 09-Jul-2025 03:08PM. Ref.ID: 51903055598, at MIK YEK NEA.",
+            "Received $5 = 20,000 KHR",
+            "លោកអ្នកបានទទួលប្រាក់ចំនួន 23.25 ដុល្លារ  ពីឈ្មោះ PANH BORA ធនាគារ Canadia Bank Plc តាមការស្កេន  KHQR ថ្ងៃទី ១២ កក្កដា ២០២៥​ ម៉ោង ០៩:០៧ល្ងាច នៅ អាហារដ្ឋានសុនិសា168, SMART-PAY:00060050180 (Hash. 6c648d8",
+            "USD 16.00 is paid by CHANTARY MUNY (ABA Bank) via KHQR on 08/07/2025 07:49 PM at HOUSE 59 BY S.MEL",
+            "USD 16.00 is paid (fee 0.50 USD)",
+            "The amount 10.50 USD is paid from TIA PHALLA, ACLEDA Bank Plc., Bill No.: 52081784162 | KHQR on 2025-07-27 11.33.00 AM with Transaction ID: 099QORT252080682, Hash: bf3c3602, Shop-name: Dariya Restaurant",
+            "QRPay: Received KHR 22900.00 on Jul 10, 2025 07:04:44 AM paid by SAMAN LY with Transaction Hash: 371f33fe.",
+            "Invalid amount: $ abc",
+            "This is just a regular message",
+        ]
+
+        for sender, profile in BANK_PROFILES.items():
+            if not profile.fallback:
+                continue
+            for message in messages:
+                with self.subTest(sender=sender, message=message):
+                    currency, amount = extract_amount_and_currency(message)
+                    self.assertEqual(
+                        parse_bank_message(message, sender), (currency, amount, extract_trx_id(message))
+                    )
+
 
 if __name__ == '__main__':
     # Run with verbose output
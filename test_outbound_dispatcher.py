@@ -0,0 +1,123 @@
+import asyncio
+import unittest
+
+from telegram.error import BadRequest, RetryAfter
+
+from helper.rate_limiter import BotApiRateLimiter
+from services.outbound_dispatcher import DispatcherRateLimiter, OutboundDispatcher, Priority
+
+
+def make_dispatcher() -> OutboundDispatcher:
+    # One global token at a time so the order of sends shows the lane order
+    limiter = BotApiRateLimiter("test", rate=50, capacity=1, chat_rate=100, chat_capacity=100)
+    return OutboundDispatcher("test", limiter)
+
+
+class TestOutboundDispatcher(unittest.TestCase):
+    def test_interactive_overtakes_queued_broadcasts(self):
+        async def scenario():
+            dispatcher = make_dispatcher()
+            order = []
+
+            async def send(tag):
+                order.append(tag)
+
+            tasks = [
+                asyncio.create_task(dispatcher.send(n, send, f"broadcast{n}", priority=Priority.BROADCAST))
+                for n in range(4)
+            ]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.create_task(dispatcher.send(100, send, "reply")))
+            await asyncio.gather(*tasks)
+            return order
+
+        order = asyncio.run(scenario())
+        self.assertLess(order.index("reply"), order.index("broadcast2"))
+        self.assertEqual(len(order), 5)
+
+    def test_interactive_overtakes_broadcasts_to_the_same_chat(self):
+        async def scenario():
+            # One message per chat at a time, the global bucket is not the limit
+            limiter = BotApiRateLimiter("test", rate=1000, capacity=1000, chat_rate=50, chat_capacity=1)
+            dispatcher = OutboundDispatcher("test", limiter)
+            order = []
+
+            async def send(tag):
+                order.append(tag)
+
+            tasks = [
+                asyncio.create_task(dispatcher.send(1, send, f"broadcast{n}", priority=Priority.BROADCAST))
+                for n in range(4)
+            ]
+            await asyncio.sleep(0)
+            tasks.append(asyncio.create_task(dispatcher.send(1, send, "reply")))
+            await asyncio.gather(*tasks)
+            return order
+
+        order = asyncio.run(scenario())
+        self.assertLess(order.index("reply"), order.index("broadcast2"))
+        self.assertEqual(len(order), 5)
+
+    def test_chat_retry_after_does_not_pause_other_chats(self):
+        limiter = BotApiRateLimiter("test", rate=50, capacity=1, chat_rate=100, chat_capacity=100)
+        limiter.on_retry_after(1, 30)
+        self.assertEqual(limiter.global_bucket.flood_waits, 0)
+        self.assertEqual(limiter._chat_bucket(1).flood_waits, 1)
+        limiter.on_retry_after(None, 30)
+        limiter.on_retry_after(2, 30, global_limit=True)
+        self.assertEqual(limiter.global_bucket.flood_waits, 2)
+
+    def test_retry_after_is_retried_and_counted(self):
+        async def scenario():
+            dispatcher = make_dispatcher()
+            calls = []
+
+            async def flaky():
+                calls.append(1)
+                if len(calls) == 1:
+                    raise RetryAfter(0)
+                return "sent"
+
+            result = await dispatcher.send(1, flaky, priority=Priority.NOTIFICATION)
+            return result, len(calls), dispatcher.metrics["notification"]
+
+        result, calls, metrics = asyncio.run(scenario())
+        self.assertEqual(result, "sent")
+        self.assertEqual(calls, 2)
+        self.assertEqual(metrics["retry_after"], 1)
+        self.assertEqual(metrics["sent"], 1)
+
+    def test_other_errors_propagate(self):
+        async def scenario():
+            dispatcher = make_dispatcher()
+
+            async def rejected():
+                raise BadRequest("Chat not found")
+
+            with self.assertRaises(BadRequest):
+                await dispatcher.send(1, rejected)
+            return dispatcher.metrics["interactive"]["failed"]
+
+        self.assertEqual(asyncio.run(scenario()), 1)
+
+    def test_ptb_requests_default_to_interactive(self):
+        async def scenario():
+            dispatcher = make_dispatcher()
+            rate_limiter = DispatcherRateLimiter(dispatcher)
+
+            async def callback(*args, **kwargs):
+                return {"ok": True}
+
+            await rate_limiter.process_request(callback, (), {}, "sendMessage", {"chat_id": 5, "text": "hi"}, None)
+            await rate_limiter.process_request(
+                callback, (), {}, "sendMessage", {"chat_id": "@channel", "text": "hi"}, Priority.BROADCAST
+            )
+            return dispatcher.metrics
+
+        metrics = asyncio.run(scenario())
+        self.assertEqual(metrics["interactive"]["sent"], 1)
+        self.assertEqual(metrics["broadcast"]["sent"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
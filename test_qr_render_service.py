@@ -0,0 +1,85 @@
+import asyncio
+import io
+import unittest
+import zipfile
+from unittest.mock import patch
+
+from helper.qr_generator import QRGenerator
+from services.qr_render_service import QRRenderService
+from services.telegram_utils_bot_service import parse_wifi_networks
+
+
+class TestQRRenderService(unittest.TestCase):
+    def test_cache_key_depends_on_content_and_layout(self):
+        key = QRRenderService.cache_key("png", "Office", "secret")
+        self.assertEqual(key, QRRenderService.cache_key("png", "Office", "secret"))
+        self.assertNotEqual(key, QRRenderService.cache_key("pdf", "Office", "secret"))
+        self.assertNotEqual(key, QRRenderService.cache_key("png", "Office", "secret2"))
+        self.assertNotIn("secret", key)
+        self.assertNotEqual(
+            QRRenderService.cache_key("pdf", "Office", b"png-1"), QRRenderService.cache_key("pdf", "Office", b"png-2")
+        )
+        with patch.object(QRGenerator, "LAYOUT_VERSION", QRGenerator.LAYOUT_VERSION + 1):
+            self.assertNotEqual(key, QRRenderService.cache_key("png", "Office", "secret"))
+
+    def test_cache_evicts_least_recently_used_by_size(self):
+        service = QRRenderService(max_workers=1, max_cache_bytes=10)
+        service._cache_put("a", b"1234")
+        service._cache_put("b", b"1234")
+        service._cache_get("a")
+        service._cache_put("c", b"1234")
+        self.assertEqual(list(service._cache), ["a", "c"])
+        self.assertEqual(service.stats()["bytes"], 8)
+        service._cache_put("huge", b"x" * 11)
+        self.assertNotIn("huge", service._cache)
+
+    def test_concurrent_requests_share_one_render(self):
+        async def scenario():
+            service = QRRenderService(max_workers=1)
+            try:
+                results = await asyncio.gather(*(service.render_wifi_png("Office", "secret") for _ in range(3)))
+                pdf = await service.render_wifi_pdf("Office", results[0])
+                return results, pdf, service.stats()
+            finally:
+                service.shutdown()
+
+        results, pdf, stats = asyncio.run(scenario())
+        self.assertTrue(results[0].startswith(b"\x89PNG"))
+        self.assertEqual(len(set(results)), 1)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        # One PNG render and one PDF build
+        self.assertEqual(stats["misses"], 2)
+
+    def test_bulk_pdf_and_zip_have_one_entry_per_network(self):
+        networks = [("Lobby", "lobby-pass"), ("Floor 2", "floor2-pass"), ("Lobby", "other-pass")]
+
+        async def scenario():
+            service = QRRenderService(max_workers=1)
+            try:
+                return await service.render_wifi_bulk_pdf(networks), await service.render_wifi_bulk_zip(networks)
+            finally:
+                service.shutdown()
+
+        pdf, archive = asyncio.run(scenario())
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertEqual(pdf.count(b"/Type /Page\n"), 3)
+        with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+            self.assertEqual(
+                zf.namelist(), ["Wifi-QR-Lobby.png", "Wifi-QR-Floor_2.png", "Wifi-QR-Lobby-2.png"]
+            )
+
+
+class TestParseWifiNetworks(unittest.TestCase):
+    def test_lines_and_csv(self):
+        networks, invalid = parse_wifi_networks('ssid,password\nLobby,pa,ss\n\n"Floor, 2",x\n')
+        self.assertEqual(networks, [("Lobby", "pa,ss"), ("Floor, 2", "x")])
+        self.assertEqual(invalid, [])
+
+    def test_tab_separated_and_invalid_lines(self):
+        networks, invalid = parse_wifi_networks("Lobby\tsecret\nNoPassword\n\tmissing-name\n")
+        self.assertEqual(networks, [("Lobby", "secret")])
+        self.assertEqual(invalid, [2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
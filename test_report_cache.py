@@ -0,0 +1,174 @@
+import asyncio
+import unittest
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from config import database_config
+from helper import DateUtils
+from models import BaseModel, Chat
+from services import ChatService
+from services.income_batch_writer import IncomeBatchWriter
+from services.income_rollup_service import IncomeRollupService
+from services.income_summary_service import IncomeSummaryService
+from services.report_cache import ReportSnapshotCache
+
+OLD_CHAT_ID = -100
+NEW_CHAT_ID = -1001000000100
+
+
+class TestReportSnapshotCache(unittest.TestCase):
+    def setUp(self):
+        self.versions = {}
+        self.cache = ReportSnapshotCache("test", self.load_version)
+        self.loads = []
+
+    async def load_version(self, chat_id):
+        return self.versions.get(chat_id, 0)
+
+    async def load(self, chat_id, start_day, end_day):
+        self.loads.append((chat_id, start_day, end_day))
+        return [f"rows {len(self.loads)}"]
+
+    def get(self, chat_id, start_day, end_day, kind="by_day"):
+        return asyncio.run(self.cache.get_or_load(chat_id, kind, start_day, end_day, self.load))
+
+    def test_repeat_reads_are_served_from_cache(self):
+        first = self.get(1, date(2025, 10, 1), date(2025, 11, 1))
+        second = self.get(1, date(2025, 10, 1), date(2025, 11, 1))
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.loads), 1)
+        self.get(1, date(2025, 10, 1), date(2025, 11, 1), kind="period")
+        self.get(2, date(2025, 10, 1), date(2025, 11, 1))
+        self.assertEqual(len(self.loads), 3)
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_new_version_reloads_only_that_chat(self):
+        self.get(1, date(2025, 10, 1), date(2025, 11, 1))
+        self.get(2, date(2025, 10, 1), date(2025, 11, 1))
+
+        self.versions[1] = 1
+
+        self.get(1, date(2025, 10, 1), date(2025, 11, 1))
+        self.get(2, date(2025, 10, 1), date(2025, 11, 1))
+        self.assertEqual(len(self.loads), 3)
+        self.assertEqual(self.loads[-1], (1, date(2025, 10, 1), date(2025, 11, 1)))
+
+    def test_load_overlapping_a_write_is_reloaded(self):
+        async def load_then_write(chat_id, start_day, end_day):
+            rows = await self.load(chat_id, start_day, end_day)
+            # The write commits after the query read the old totals
+            self.versions[chat_id] = self.versions.get(chat_id, 0) + 1
+            return rows
+
+        asyncio.run(self.cache.get_or_load(1, "by_day", date(2025, 10, 1), date(2025, 11, 1), load_then_write))
+        self.get(1, date(2025, 10, 1), date(2025, 11, 1))
+        self.get(1, date(2025, 10, 1), date(2025, 11, 1))
+        self.assertEqual(len(self.loads), 2)
+
+
+class TestReportCacheAcrossProcesses(unittest.TestCase):
+    """Incomes are written by the Telethon process, reports are read in the bots process"""
+
+    def setUp(self):
+        self.engine = create_engine(
+            "sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}
+        )
+        BaseModel.metadata.create_all(self.engine)
+        self.original_bind = database_config.SessionLocal.kw["bind"]
+        database_config.SessionLocal.configure(bind=self.engine)
+
+        with database_config.get_db_session() as db:
+            db.add(Chat(chat_id=OLD_CHAT_ID, group_name="Shop", is_active=True,
+                        created_at=datetime.now() - timedelta(days=1)))
+            db.commit()
+
+        # One cache per process, sharing only the database
+        self.writer_cache = ReportSnapshotCache("telethon", IncomeRollupService.get_chat_version)
+        self.reader_cache = ReportSnapshotCache("bots", IncomeRollupService.get_chat_version)
+        self.loads = []
+
+    def tearDown(self):
+        database_config.SessionLocal.configure(bind=self.original_bind)
+        self.engine.dispose()
+
+    async def load(self, chat_id, start_day, end_day):
+        self.loads.append(chat_id)
+        return await IncomeSummaryService._load_aggregates_for_period(chat_id, start_day, end_day)
+
+    async def totals(self, cache: ReportSnapshotCache, chat_id: int):
+        today = DateUtils.now().date()
+        rows = await cache.get_or_load(
+            chat_id, "period", today - timedelta(days=1), today + timedelta(days=1), self.load
+        )
+        return [(row.total, row.count) for row in rows]
+
+    @staticmethod
+    async def submit(writer: IncomeBatchWriter, chat_id: int, message_id: int, amount: float):
+        return await writer.submit(
+            chat_id, amount, "USD", amount, message_id, f"Received {amount} USD", None,
+            "PayWayByABA_bot", DateUtils.now(),
+        )
+
+    def test_writes_from_another_process_reach_the_reader(self):
+        async def scenario():
+            writer = IncomeBatchWriter()
+            try:
+                await self.submit(writer, OLD_CHAT_ID, 1, 10)
+                await self.totals(self.writer_cache, OLD_CHAT_ID)
+                first = await self.totals(self.reader_cache, OLD_CHAT_ID)
+                repeat = await self.totals(self.reader_cache, OLD_CHAT_ID)
+                loads_before_write = len(self.loads)
+                await self.submit(writer, OLD_CHAT_ID, 2, 5)
+                after_write = await self.totals(self.reader_cache, OLD_CHAT_ID)
+            finally:
+                await writer.stop()
+            return first, repeat, loads_before_write, after_write
+
+        first, repeat, loads_before_write, after_write = asyncio.run(scenario())
+        self.assertEqual(first, [(10, 1)])
+        self.assertEqual(repeat, [(10, 1)])
+        # The repeat tap skipped the aggregate query
+        self.assertEqual(loads_before_write, 2)
+        self.assertEqual(after_write, [(15, 2)])
+        self.assertEqual(len(self.loads), 3)
+
+    def test_chat_migration_reloads_both_chats(self):
+        async def scenario():
+            writer = IncomeBatchWriter()
+            try:
+                await self.submit(writer, OLD_CHAT_ID, 1, 10)
+            finally:
+                await writer.stop()
+            before = (await self.totals(self.reader_cache, OLD_CHAT_ID),
+                      await self.totals(self.reader_cache, NEW_CHAT_ID))
+            await ChatService.migrate_chat_id(OLD_CHAT_ID, NEW_CHAT_ID)
+            after = (await self.totals(self.reader_cache, OLD_CHAT_ID),
+                     await self.totals(self.reader_cache, NEW_CHAT_ID))
+            return before, after
+
+        before, after = asyncio.run(scenario())
+        self.assertEqual(before, ([(10, 1)], []))
+        self.assertEqual(after, ([], [(10, 1)]))
+        self.assertEqual(len(self.loads), 4)
+
+    def test_rebuild_reloads_the_chat(self):
+        async def scenario():
+            writer = IncomeBatchWriter()
+            try:
+                await self.submit(writer, OLD_CHAT_ID, 1, 10)
+            finally:
+                await writer.stop()
+            await self.totals(self.reader_cache, OLD_CHAT_ID)
+            with database_config.get_db_session() as db:
+                IncomeRollupService.rebuild(db)
+                db.commit()
+            return await self.totals(self.reader_cache, OLD_CHAT_ID)
+
+        self.assertEqual(asyncio.run(scenario()), [(10, 1)])
+        self.assertEqual(len(self.loads), 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
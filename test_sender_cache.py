@@ -0,0 +1,30 @@
+import unittest
+
+from services.sender_cache import ALLOWED_BANK_BOTS, VERIFIED_BANK_BOTS, SenderCache
+
+
+class TestSenderCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = SenderCache()
+        # As if seed() resolved every allowed bot
+        self.cache.allowed_ids = {index: username for index, username in enumerate(sorted(ALLOWED_BANK_BOTS))}
+        self.ids = {username: index for index, username in self.cache.allowed_ids.items()}
+
+    def test_listener_accepts_every_allowed_bot(self):
+        for username in ALLOWED_BANK_BOTS:
+            with self.subTest(username=username):
+                self.assertTrue(self.cache.is_allowed(self.ids[username]))
+
+    def test_verification_scheduler_keeps_its_previous_bots(self):
+        self.assertEqual(VERIFIED_BANK_BOTS, ALLOWED_BANK_BOTS - {"AMKPlc_bot"})
+        self.assertFalse(self.cache.is_allowed(self.ids["AMKPlc_bot"], VERIFIED_BANK_BOTS))
+        self.assertTrue(self.cache.is_allowed(self.ids["PayWayByABA_bot"], VERIFIED_BANK_BOTS))
+
+    def test_other_senders_are_rejected(self):
+        self.cache.remember(1000, "SomeUser")
+        self.assertFalse(self.cache.is_allowed(1000))
+        self.assertFalse(self.cache.is_allowed(1001, VERIFIED_BANK_BOTS))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)